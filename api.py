@@ -1,12 +1,32 @@
-from flask import Flask, request, jsonify, session, send_from_directory, redirect, url_for
+import startup # First, so the import timing covers everything below
+from flask import Flask, Response, request, jsonify, session, send_from_directory, redirect, url_for, stream_with_context, g
+from botocore.exceptions import ClientError
 from flask_cors import CORS
+import contextvars
+import hashlib
 import logging
+import math
 import os
+import re
+import time
+from typing import Any, Dict, Optional, Tuple
+import uuid
 
 # Assuming dynamodb_operations.py is in the same directory and has all the functions
 import dynamodb_operations as ddb
+from background_jobs import jobs
+import event_bus
+import metrics
+from password_pool import PasswordPoolBusy
+import rate_limit
+import serialization
+import storage_resilience
+import structured_logging
 
 app = Flask(__name__)
+# --- Response Encoding (fast JSON, MessagePack, gzip/brotli; see serialization.py) ---
+app.json = serialization.FastJSONProvider(app)
+app.after_request(serialization.finalize_response)
 
 # --- Secret Key for Session Management ---
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'your-super-secret-and-random-dev-key-123!') # CHANGE THIS!
@@ -14,17 +34,165 @@ app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'your-super-secret-and-rando
 # --- CORS Configuration ---
 CORS(
     app,
-    supports_credentials=True # Important for session cookies if frontend/backend are different origins
+    supports_credentials=True, # Important for session cookies if frontend/backend are different origins
+    expose_headers=["ETag", "X-Request-ID", "Retry-After"] # ETag and Retry-After are read by fetchData
 )
 
-# --- Logging Configuration ---
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+# --- Logging Configuration (queue-backed structured logging, see structured_logging.py) ---
+structured_logging.configure_logging()
 # Use app.logger for Flask-specific logging
 app.logger.setLevel(logging.INFO)
 
 
+# --- Request IDs (tie log records to a request; see structured_logging.py) ---
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._-]{1,128}") # An inbound X-Request-ID is reused only if it matches
+
+@app.before_request
+def _bind_request_id():
+    request_id = request.headers.get("X-Request-ID", "")
+    if not REQUEST_ID_PATTERN.fullmatch(request_id):
+        request_id = uuid.uuid4().hex
+    g.request_id = request_id
+    g.request_id_token = structured_logging.bind_request_id(request_id)
+
+@app.after_request
+def _echo_request_id(response):
+    if "request_id" in g:
+        response.headers["X-Request-ID"] = g.request_id
+    return response
+
+@app.teardown_request
+def _unbind_request_id(exc):
+    token = g.pop("request_id_token", None)
+    if token is not None:
+        structured_logging.reset_request_id(token)
+
+
+# --- Client IDs (a page's changes are not pushed back to its own event stream; see event_bus.py) ---
+CLIENT_ID_PATTERN = re.compile(r"[A-Za-z0-9._-]{1,64}") # X-Client-ID header and /api/events?clientId=
+
+@app.before_request
+def _bind_event_origin():
+    client_id = request.headers.get("X-Client-ID", "")
+    if CLIENT_ID_PATTERN.fullmatch(client_id):
+        g.event_origin_token = event_bus.bind_origin(client_id)
+
+@app.teardown_request
+def _unbind_event_origin(exc):
+    token = g.pop("event_origin_token", None)
+    if token is not None:
+        event_bus.reset_origin(token)
+
+
+# --- Request Metrics (per route; storage calls are measured in storage_metrics.py) ---
+HTTP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+REQUEST_PHASES = ("storage", "encode", "compress")
+request_seconds = metrics.registry.histogram(
+    "taskhive_http_request_seconds", "Time to produce each response, by route template and method.",
+    ("route", "method"), buckets=HTTP_BUCKETS
+)
+request_phase_seconds = metrics.registry.histogram(
+    "taskhive_http_request_phase_seconds",
+    "Per-request time by phase: storage calls, JSON/MessagePack encoding, compression, and the rest ('app').",
+    ("route", "method", "phase"), buckets=HTTP_BUCKETS
+)
+responses_total = metrics.registry.counter(
+    "taskhive_http_responses_total", "Responses by route template, method and status code.", ("route", "method", "status")
+)
+
+# Per-request state: [started, phases token, status]. A context variable rather than flask.g,
+# whose proxy lookups would cost more than the measurements themselves.
+_request_metrics: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("request_metrics", default=None)
+_route_metrics: Dict[Tuple[str, str], Tuple[Any, Dict[str, Any]]] = {}
+
+def _bind_route_metrics(route: str, method: str) -> Tuple[Any, Dict[str, Any]]:
+    phases = {phase: request_phase_seconds.labels(route, method, phase) for phase in REQUEST_PHASES + ("app",)}
+    return _route_metrics.setdefault((route, method), (request_seconds.labels(route, method), phases))
+
+@app.before_request
+def _start_request_metrics():
+    _request_metrics.set([time.perf_counter(), metrics.begin_request_phases(), 500])
+
+@app.after_request
+def _record_response_status(response):
+    state = _request_metrics.get()
+    if state is not None:
+        state[2] = response.status_code
+    return response
+
+@app.teardown_request
+def _record_request_metrics(exc):
+    # Teardown runs after every after_request hook, so compression is included.
+    state = _request_metrics.get()
+    if state is None:
+        return
+    _request_metrics.set(None)
+    started, token, status = state
+    elapsed = time.perf_counter() - started
+    phases = metrics.end_request_phases(token)
+    current = request._get_current_object()
+    key = (current.url_rule.rule if current.url_rule else "unmatched", current.method)
+    duration, phase_histograms = _route_metrics.get(key) or _bind_route_metrics(*key)
+    duration.observe(elapsed)
+    responses_total.labels(key[0], key[1], str(status)).inc()
+    accounted = 0.0
+    for phase, seconds in phases.items():
+        if phase in phase_histograms:
+            phase_histograms[phase].observe(seconds)
+            accounted += seconds
+    phase_histograms["app"].observe(max(0.0, elapsed - accounted))
+
+
+# --- Cold-Start Timing (see startup.py) ---
+@app.before_request
+def _claim_first_request():
+    g.first_request_started = startup.claim_first_request()
+
+@app.teardown_request
+def _finish_first_request(exc):
+    started = g.pop("first_request_started", None)
+    if started is not None:
+        startup.first_request_finished(started)
+
+
+# --- Rate Limiting (per user and route class; see rate_limit.py) ---
+# Registered after the metrics hooks, so refused requests are still counted per route.
+RATE_LIMIT_ROUTE_CLASSES = { # endpoint -> route class; other endpoints are not limited
+    "api_bootstrap": "read", "api_sync": "read", "api_get_tabs": "read", "api_get_job": "read", "api_get_active_tab": "read",
+    "api_get_tasks_for_tab": "read", "api_get_single_task": "read", "api_search_tasks": "read",
+    "api_add_tab": "write", "api_reorder_tabs": "write", "api_set_active_tab": "write",
+    "api_add_task": "write", "api_update_task": "write", "api_delete_task": "write",
+    "api_delete_tab": "bulk", "api_bulk_add_tasks": "bulk", "api_task_batch": "bulk", "api_export": "bulk",
+}
+
+@app.before_request
+def _enforce_rate_limit():
+    route_class = RATE_LIMIT_ROUTE_CLASSES.get(request.endpoint)
+    user_id = session.get("user_id") if route_class else None
+    if not user_id:
+        return None # Unauthenticated requests are refused by the route itself
+    wait = rate_limit.acquire(route_class, user_id)
+    if wait:
+        app.logger.warning(f"Rate limit ({route_class}) exceeded by user {user_id} on {request.endpoint}.")
+        response = jsonify({"error": "Too many requests; retry later"})
+        response.headers["Retry-After"] = str(max(1, math.ceil(min(wait, rate_limit.RATE_LIMIT_MAX_RETRY_AFTER_SECONDS))))
+        return response, 429
+    return None
+
+
+# --- Storage Back-Pressure (see storage_resilience.py) ---
+@app.errorhandler(ClientError)
+def handle_storage_error(e):
+    """ Storage errors that escape a route: throttling and an open circuit breaker become 503 with Retry-After. """
+    code = e.response.get("Error", {}).get("Code", "Unknown")
+    app.logger.error(f"Unhandled storage error on {request.endpoint}: {code}")
+    if code == "CircuitOpen" or storage_resilience.retry_reason(e) == "throttle":
+        response = jsonify({"error": "Storage is busy; retry later"})
+        response.headers["Retry-After"] = str(max(1, math.ceil(storage_resilience.STORAGE_BREAKER_RESET_SECONDS if code == "CircuitOpen" else 1)))
+        return response, 503
+    return jsonify({"error": "Storage error"}), 500
+
+
 # --- Static File Serving & Basic Page Routes ---
 @app.route('/static/<path:filename>')
 def serve_static(filename):
@@ -39,11 +207,18 @@ def index_page():
     if 'user_id' not in session:
         app.logger.info("User not in session, redirecting to login.")
         return redirect(url_for('login_page'))
-    app.logger.info(f"User {session.get('username')} in session, serving index.html.")
+    app.logger.info("User %s in session, serving index.html.", session.get('username'))
     return send_from_directory(app.root_path, 'index.html')
 
 
 # --- Authentication Endpoints ---
+@app.errorhandler(PasswordPoolBusy)
+def handle_password_pool_busy(e):
+    app.logger.warning("Password pool at capacity, shedding auth request.")
+    response = jsonify({"success": False, "message": "Server busy, please retry shortly."})
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, 503
+
 @app.route("/api/auth/register", methods=["POST"])
 def api_register_user():
     data = request.get_json()
@@ -52,7 +227,7 @@ def api_register_user():
     password = data.get("password")
     if not all([username, password]): return jsonify({"error": "Username and password are required"}), 400
     
-    app.logger.info(f"Registration attempt for username: {username}")
+    app.logger.info("Registration attempt for username: %s", username)
     result = ddb.register_user(username, password)
     if result.get("success"):
         return jsonify(result), 201
@@ -68,12 +243,12 @@ def api_login_user():
     password = data.get("password")
     if not all([username, password]): return jsonify({"error": "Username and password are required"}), 400
 
-    app.logger.info(f"Login attempt for username: {username}")
+    app.logger.info("Login attempt for username: %s", username)
     result = ddb.login_user(username, password)
     if result.get("success"):
         session["user_id"] = result.get("userId")
         session["username"] = result.get("username")
-        app.logger.info(f"User {session['username']} (ID: {session['user_id']}) logged in, session set.")
+        app.logger.info("User %s (ID: %s) logged in, session set.", session['username'], session['user_id'])
         return jsonify(result), 200
     else:
         return jsonify(result), 401
@@ -83,7 +258,7 @@ def api_logout_user():
     user_id = session.pop("user_id", None)
     username = session.pop("username", None) # Also pop username
     if user_id:
-        app.logger.info(f"User {username} (ID: {user_id}) logged out.")
+        app.logger.info("User %s (ID: %s) logged out.", username, user_id)
         return jsonify({"message": "Logged out successfully"}), 200
     else:
         app.logger.info("Logout attempt with no active session.")
@@ -92,7 +267,7 @@ def api_logout_user():
 @app.route("/api/auth/status", methods=["GET"])
 def api_auth_status():
     if "user_id" in session and "username" in session:
-        app.logger.debug(f"Auth status: Logged in as {session['username']} (ID: {session['user_id']})")
+        app.logger.debug("Auth status: Logged in as %s (ID: %s)", session['username'], session['user_id'])
         return jsonify({
             "isLoggedIn": True, "userId": session["user_id"], "username": session["username"]
         }), 200
@@ -100,6 +275,23 @@ def api_auth_status():
         app.logger.debug("Auth status: Not logged in.")
         return jsonify({"isLoggedIn": False}), 200
 
+# --- Health Checks ---
+@app.route("/healthz", methods=["GET"])
+def api_health():
+    """ Liveness: the process is serving requests. Never touches storage. """
+    return jsonify({"status": "ok"}), 200
+
+@app.route("/readyz", methods=["GET"])
+def api_ready():
+    """ Readiness: both tables answer a read. 503 takes the instance out of the load balancer. """
+    readiness = ddb.check_storage_ready()
+    return jsonify(readiness), 200 if readiness["ready"] else 503
+
+# --- Metrics ---
+@app.route("/metrics", methods=["GET"])
+def api_metrics():
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
 # --- Helper for Authenticated Routes ---
 def get_authenticated_user_id():
     user_id = session.get("user_id")
@@ -107,15 +299,145 @@ def get_authenticated_user_id():
         app.logger.warning("Attempt to access protected route without authentication.")
     return user_id
 
+# --- Conditional GET (ETag) Helpers ---
+def _make_etag(user_id: str, *parts) -> str:
+    """ Strong ETag for a user's view of a resource version. The user id keeps a shared browser cache from mixing accounts. """
+    return hashlib.sha256(":".join(str(p) for p in (user_id,) + parts).encode("utf-8")).hexdigest()[:32]
+
+def _with_etag(response: Response, etag: str) -> Response:
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache" # Cacheable, but always revalidated
+    response.vary.update(("Cookie", "Accept"))
+    return response
+
+def _not_modified(etag: str):
+    """
+    Returns a 304 response if the request's If-None-Match has `etag` in any representation
+    (compressed or MessagePack variants carry a suffix), else None.
+    """
+    if request.if_none_match.star_tag:
+        return _with_etag(Response(status=304), etag)
+    for tag in request.if_none_match.as_set():
+        if serialization.etag_base(tag) == etag:
+            return _with_etag(Response(status=304), tag) # Echo the representation the client holds
+    return None
+
+# --- BOOTSTRAP ENDPOINT ---
+BOOTSTRAP_TASK_PAGE_SIZE = 100
+
+@app.route('/api/bootstrap', methods=['GET'])
+def api_bootstrap():
+    """ Everything needed for the first render in one round trip: user, tabs, active tab and its first task page. """
+    user_id = get_authenticated_user_id()
+    if not user_id: return jsonify({"error": "Unauthorized"}), 401
+
+    limit = request.args.get("limit", default=BOOTSTRAP_TASK_PAGE_SIZE, type=int)
+    if limit <= 0: return jsonify({"error": "limit must be a positive integer"}), 400
+    try:
+        fields, summary = _task_view_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    app.logger.info("Bootstrap for user_id: %s", user_id)
+    data = ddb.get_user_bootstrap(user_id, limit, fields)
+    data["tasks"] = [ddb.shape_task(task, fields, summary) for task in data["tasks"]]
+    data.update({"userId": user_id, "username": session.get("username")})
+    return jsonify(data), 200
+
+# --- DELTA SYNC ENDPOINT ---
+@app.route('/api/sync', methods=['GET'])
+def api_sync():
+    """
+    Changes since ?since=<syncToken> (from /api/bootstrap or a previous sync): changed tasks,
+    tombstones for deleted ones, tabs to reload and the tab list if it changed. Call again
+    with the returned syncToken while hasMore is true. {"reset": true} means reload everything.
+    """
+    user_id = get_authenticated_user_id()
+    if not user_id: return jsonify({"error": "Unauthorized"}), 401
+    since = request.args.get("since")
+    if not since: return jsonify({"error": "since is required"}), 400
+
+    try:
+        changes = ddb.get_changes_since(user_id, since)
+    except ValueError:
+        return jsonify({"error": "Invalid sync token"}), 400
+    except ClientError as e:
+        app.logger.error(f"Error syncing changes for user {user_id}: {e.response['Error']['Message']}")
+        return jsonify({"error": "Failed to sync changes"}), 500
+    return jsonify(changes), 200
+
+# --- LIVE EVENTS (Server-Sent Events) ---
+EVENTS_HEARTBEAT_SECONDS = float(os.environ.get("EVENTS_HEARTBEAT_SECONDS", "15")) # Comment lines that keep idle streams open through proxies
+EVENTS_STREAM_MAX_SECONDS = float(os.environ.get("EVENTS_STREAM_MAX_SECONDS", "300")) # Streams are closed after this and the browser reconnects, freeing the worker thread
+EVENTS_RETRY_MS = 3000 # Reconnect delay suggested to EventSource
+
+def _stream_events(subscription: event_bus.Subscription):
+    """ Generator for /api/events: "change" events, "resync" after an overflow, and heartbeats until the stream's time is up. """
+    yield f"retry: {EVENTS_RETRY_MS}\nevent: hello\ndata: {{}}\n\n"
+    deadline = time.monotonic() + EVENTS_STREAM_MAX_SECONDS
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        data = subscription.get(timeout=min(EVENTS_HEARTBEAT_SECONDS, remaining))
+        if data is None:
+            yield ": heartbeat\n\n"
+        elif data == event_bus.RESYNC_MESSAGE:
+            yield "event: resync\ndata: {}\n\n"
+        else:
+            yield b"event: change\ndata: " + data + b"\n\n"
+
+@app.route('/api/events', methods=['GET'])
+def api_events():
+    """
+    Server-Sent Events stream of the user's task and tab changes, each a /api/sync-style delta
+    ("change" events). Changes made by the client named by ?clientId= are left out. On "hello"
+    (every connect) and "resync" (the client fell behind and events were dropped), clients run a
+    delta sync. The server ends each stream after EVENTS_STREAM_MAX_SECONDS; EventSource reconnects.
+    """
+    user_id = get_authenticated_user_id()
+    if not user_id: return jsonify({"error": "Unauthorized"}), 401
+    client_id = request.args.get("clientId", "")
+    if client_id and not CLIENT_ID_PATTERN.fullmatch(client_id): return jsonify({"error": "Invalid clientId"}), 400
+
+    subscription = event_bus.bus.subscribe(user_id, client_id or None)
+    if subscription is None:
+        app.logger.warning(f"Event stream refused for user {user_id}: subscriber limit reached.")
+        response = jsonify({"error": "Too many open event streams; retry later"})
+        response.headers["Retry-After"] = "30"
+        return response, 503
+    app.logger.info("Event stream opened for user %s (client %s)", user_id, client_id or "-")
+    response = Response(stream_with_context(_stream_events(subscription)), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no" # Tell nginx not to buffer the stream
+    response.call_on_close(lambda: event_bus.bus.unsubscribe(subscription)) # Also runs if the client leaves before the first event
+    return response
+
 # --- TAB MANAGEMENT ENDPOINTS ---
 @app.route('/api/tabs', methods=['GET'])
 def api_get_tabs():
+    """ The ordered tab list. With ?withCounts=1 each tab also carries its taskCount and completedCount. """
     user_id = get_authenticated_user_id()
     if not user_id: return jsonify({"error": "Unauthorized"}), 401
     
-    app.logger.info(f"Fetching tabs for user_id: {user_id}")
-    tabs = ddb.get_user_tabs(user_id) # This function needs to be in ddb
-    return jsonify(tabs), 200
+    app.logger.info("Fetching tabs for user_id: %s", user_id)
+    tabs, version = ddb.get_user_tabs_with_version(user_id)
+    if request.args.get("withCounts") not in ("1", "true"):
+        etag = _make_etag(user_id, "tabs", version)
+        not_modified = _not_modified(etag)
+        if not_modified: return not_modified
+        return _with_etag(jsonify(tabs), etag), 200
+
+    try:
+        counts = ddb.get_tab_counts(user_id, [t["tabId"] for t in tabs])
+    except ClientError as e:
+        app.logger.error(f"Error reading tab counts for user {user_id}: {e.response['Error']['Message']}")
+        return jsonify({"error": "Failed to read tab counts"}), 500
+    # Every counter change bumps its tab's version, so the versions identify this representation.
+    etag = _make_etag(user_id, "tabs", version, "counts", *(f"{t['tabId']}:{counts[t['tabId']]['version']}" for t in tabs))
+    not_modified = _not_modified(etag)
+    if not_modified: return not_modified
+    tabs_with_counts = [{**t, "taskCount": counts[t["tabId"]]["taskCount"], "completedCount": counts[t["tabId"]]["completedCount"]} for t in tabs]
+    return _with_etag(jsonify(tabs_with_counts), etag), 200
 
 @app.route('/api/tabs', methods=['POST'])
 def api_add_tab():
@@ -127,7 +449,7 @@ def api_add_tab():
         return jsonify({"error": "Missing or empty tabName"}), 400
     
     tab_name = data['tabName'].strip()
-    app.logger.info(f"Adding tab '{tab_name}' for user_id: {user_id}")
+    app.logger.info("Adding tab '%s' for user_id: %s", tab_name, user_id)
     new_tab = ddb.add_user_tab(user_id, tab_name) # This function needs to be in ddb
     
     if new_tab and new_tab.get("tabId"): # Check if tabId was successfully generated/returned
@@ -141,16 +463,67 @@ def api_add_tab():
     else: # Should have tabId if successful
         return jsonify(new_tab), 201
 
+@app.route('/api/tabs/order', methods=['PUT'])
+def api_reorder_tabs():
+    """
+    Reorders the tabs: {"tabOrder": [tabId, ...]}. Tabs not listed (e.g. added meanwhile on
+    another device) follow the listed ones; unknown ids are ignored. Returns the ordered tab list.
+    """
+    user_id = get_authenticated_user_id()
+    if not user_id: return jsonify({"error": "Unauthorized"}), 401
+
+    data = request.get_json(silent=True)
+    tab_order = data.get("tabOrder") if isinstance(data, dict) else None
+    if not isinstance(tab_order, list) or not all(isinstance(t, str) for t in tab_order):
+        return jsonify({"error": "tabOrder must be a list of tab ids"}), 400
+
+    app.logger.info("Reordering %s tabs for user_id: %s", len(tab_order), user_id)
+    try:
+        tabs = ddb.reorder_user_tabs(user_id, tab_order)
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'TabListConflict':
+            return jsonify({"error": "Tabs are being changed elsewhere; retry"}), 409
+        app.logger.error(f"Error reordering tabs for user_id {user_id}: {e.response['Error']['Message']}")
+        return jsonify({"error": "Failed to reorder tabs"}), 500
+    if tabs is None: return jsonify({"error": "Profile not found"}), 404
+    return jsonify(tabs), 200
+
+
+ASYNC_TAB_DELETE_THRESHOLD = int(os.environ.get("ASYNC_TAB_DELETE_THRESHOLD", "500")) # Tabs with more tasks are deleted in the background
 
 @app.route('/api/tabs/<string:tab_id_to_delete>', methods=['DELETE'])
 def api_delete_tab(tab_id_to_delete):
+    """
+    Deletes a tab and its tasks. Small tabs are deleted inline (200). Tabs with more than
+    ASYNC_TAB_DELETE_THRESHOLD tasks, or any tab with ?async=1, are removed from the profile
+    immediately and their tasks are deleted by a background job (202 + job id).
+    """
     user_id = get_authenticated_user_id()
     if not user_id: return jsonify({"error": "Unauthorized"}), 401
 
     if tab_id_to_delete == "main":
         return jsonify({"error": "Cannot delete the main tab"}), 400
-        
-    app.logger.info(f"Deleting tab '{tab_id_to_delete}' for user_id: {user_id}")
+
+    try:
+        run_async = request.args.get("async") == "1" or \
+            ddb.count_tab_tasks(user_id, tab_id_to_delete, ASYNC_TAB_DELETE_THRESHOLD) > ASYNC_TAB_DELETE_THRESHOLD
+    except ClientError as e:
+        app.logger.error(f"Error sizing tab '{tab_id_to_delete}' for user_id {user_id}: {e.response['Error']['Message']}")
+        return jsonify({"error": "Failed to delete tab"}), 500
+
+    if run_async:
+        app.logger.info("Deleting tab '%s' for user_id: %s in the background", tab_id_to_delete, user_id)
+        if not ddb.remove_tab_from_profile(user_id, tab_id_to_delete):
+            return jsonify({"error": "Failed to delete tab or tab not found"}), 404
+        job = jobs.submit(
+            user_id, "delete_tab",
+            lambda report: {"deleted": ddb.delete_tab_tasks(user_id, tab_id_to_delete, lambda n: report({"deleted": n}))},
+            details={"tabId": tab_id_to_delete}
+        )
+        status_url = url_for('api_get_job', job_id=job["jobId"])
+        return jsonify({"message": "Tab deletion started", **job, "statusUrl": status_url}), 202, {"Location": status_url}
+
+    app.logger.info("Deleting tab '%s' for user_id: %s", tab_id_to_delete, user_id)
     success = ddb.delete_user_tab_and_tasks(user_id, tab_id_to_delete) # This function needs to be in ddb
     
     if success:
@@ -158,13 +531,22 @@ def api_delete_tab(tab_id_to_delete):
     else:
         return jsonify({"error": "Failed to delete tab or tab not found"}), 404 # or 500
 
+# --- BACKGROUND JOB ENDPOINTS ---
+@app.route('/api/jobs/<string:job_id>', methods=['GET'])
+def api_get_job(job_id):
+    user_id = get_authenticated_user_id()
+    if not user_id: return jsonify({"error": "Unauthorized"}), 401
+    job = jobs.get(job_id, user_id)
+    if not job: return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
 # --- USER PREFERENCES ENDPOINTS ---
 @app.route('/api/user/preferences/active-tab', methods=['GET'])
 def api_get_active_tab():
     user_id = get_authenticated_user_id()
     if not user_id: return jsonify({"error": "Unauthorized"}), 401
     
-    app.logger.info(f"Getting active tab preference for user_id: {user_id}")
+    app.logger.info("Getting active tab preference for user_id: %s", user_id)
     active_tab_id = ddb.get_user_active_tab_preference(user_id) # This function needs to be in ddb
     return jsonify({"activeTabId": active_tab_id}), 200
 
@@ -178,7 +560,7 @@ def api_set_active_tab():
         return jsonify({"error": "Missing activeTabId"}), 400
         
     active_tab_id = data['activeTabId']
-    app.logger.info(f"Setting active tab to '{active_tab_id}' for user_id: {user_id}")
+    app.logger.info("Setting active tab to '%s' for user_id: %s", active_tab_id, user_id)
     success = ddb.set_user_active_tab_preference(user_id, active_tab_id) # This function needs to be in ddb
     
     if success:
@@ -196,30 +578,293 @@ def api_add_task():
     tab_id = data.get("tabId")
     task_text = data.get("text")
     task_description = data.get("description")
+    completed = bool(data.get("completed", False))
     if not all([tab_id, task_text]): return jsonify({"error": "Missing tabId or text"}), 400
-    app.logger.info(f"Add task for user {user_id}, tab {tab_id}: '{task_text}'")
-    new_task = ddb.add_task(user_id, tab_id, task_text, task_description or "")
+    app.logger.info("Add task for user %s, tab %s: '%s'", user_id, tab_id, task_text)
+    new_task = ddb.add_task(user_id, tab_id, task_text, task_description or "", completed)
     if new_task:
         return jsonify(new_task), 201
     else:
         return jsonify({"error": "Failed to add task"}), 500
 
+IMPORT_ESCAPES = {"\\": "\\", "|": "|", "n": "\n", "r": "\r"} # Backslash escapes in exported lines; others stay as written
+EXPORT_CSV_HEADER = "# taskhive-export v1" # First line of a pipe-delimited export; only files starting with it are read with IMPORT_ESCAPES
+
+def _split_import_line(line: str) -> list:
+    """ Splits a line of an exported file on '|', honouring the escapes written by _escape_import_field. """
+    if "\\" not in line:
+        return line.split('|')
+    parts, current, chars = [], [], iter(line)
+    for char in chars:
+        if char == "\\":
+            escaped = next(chars, "")
+            current.append(IMPORT_ESCAPES.get(escaped, "\\" + escaped))
+        elif char == "|":
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    parts.append("".join(current))
+    return parts
+
+def _escape_import_field(value: str) -> str:
+    """ Escapes backslashes, pipes and line breaks so `value` reads back as one field of one import line. """
+    return value.replace("\\", "\\\\").replace("|", "\\|").replace("\n", "\\n").replace("\r", "\\r")
+
+def _parse_import_line(line: str, line_number: int, completed: bool, escaped: bool = False) -> dict:
+    """
+    Parses one 'text|description' line of an import file; fields after the description are ignored.
+    Backslash escapes are only read from exported files (escaped=True); other lines are taken literally.
+    """
+    parts = [part.strip() for part in (_split_import_line(line) if escaped else line.split('|'))]
+    return {
+        "line": line_number, "text": parts[0],
+        "description": parts[1] if len(parts) > 1 else "", "completed": completed
+    }
+
+def _iter_import_stream(stream, completed: bool):
+    """ Lazily yields task dicts from a pipe-delimited upload, one line at a time. A file starting with EXPORT_CSV_HEADER is read with escapes. """
+    escaped = False
+    for line_number, raw_line in enumerate(stream, start=1):
+        line = raw_line.decode('utf-8', errors='replace') if isinstance(raw_line, bytes) else raw_line
+        if line_number == 1 and line.lstrip('\ufeff').startswith(EXPORT_CSV_HEADER):
+            escaped = True
+            continue
+        if line.strip():
+            yield _parse_import_line(line.strip('\r\n'), line_number, completed, escaped)
+
+def _iter_import_json(entries, completed: bool):
+    """ Yields task dicts from a JSON array of 'text|description' strings or task objects. """
+    for line_number, entry in enumerate(entries, start=1):
+        if isinstance(entry, str):
+            if entry.strip():
+                yield _parse_import_line(entry, line_number, completed)
+        elif isinstance(entry, dict):
+            yield {
+                "line": line_number, "text": str(entry.get("text") or ""),
+                "description": str(entry.get("description") or ""),
+                "completed": bool(entry.get("completed", completed))
+            }
+        else:
+            yield {"line": line_number, "text": ""}
+
+def _form_flag(value) -> bool:
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+@app.route("/api/tasks/bulk", methods=["POST"])
+def api_bulk_add_tasks():
+    """
+    Imports many tasks into one tab. Accepts either a multipart upload ('file', 'tabId',
+    'completed'), a raw pipe-delimited body with ?tabId=, a JSON array with ?tabId=, or a
+    JSON object {"tabId", "completed", "tasks": [...]}. Returns a result for every line.
+    """
+    user_id = get_authenticated_user_id()
+    if not user_id: return jsonify({"error": "Unauthorized"}), 401
+
+    if request.is_json:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            tab_id = data.get("tabId") or request.args.get("tabId")
+            completed = bool(data.get("completed", False))
+            entries = data.get("tasks")
+        else:
+            tab_id = request.args.get("tabId")
+            completed = _form_flag(request.args.get("completed", ""))
+            entries = data
+        if not isinstance(entries, list): return jsonify({"error": "Expected a JSON array of tasks"}), 400
+        tasks = _iter_import_json(entries, completed)
+    else:
+        tab_id = request.form.get("tabId") or request.args.get("tabId")
+        completed = _form_flag(request.form.get("completed") or request.args.get("completed", ""))
+        upload = request.files.get("file")
+        tasks = _iter_import_stream(upload.stream if upload else request.stream, completed)
+
+    if not tab_id: return jsonify({"error": "Missing tabId"}), 400
+    app.logger.info("Bulk add tasks for user %s, tab %s", user_id, tab_id)
+    results = ddb.add_tasks_bulk(user_id, tab_id, tasks)
+    if not results: return jsonify({"error": "No tasks to import"}), 400
+
+    imported = sum(1 for r in results if r.get("success"))
+    failed = len(results) - imported
+    body = {"tabId": tab_id, "imported": imported, "failed": failed, "results": results}
+    if failed == 0:
+        return jsonify(body), 201
+    elif imported > 0:
+        return jsonify(body), 207 # Partial success; see per-line results
+    elif all(r.get("error") == "Missing task text." for r in results):
+        return jsonify(body), 400
+    else:
+        return jsonify(body), 500
+
+TASK_BATCH_SERVER_ERRORS = {"Error writing task.", "Write throttled; retry limit reached.", "Server error: Table initialization."}
+
+@app.route("/api/tasks/<string:tab_id>/batch", methods=["POST"])
+def api_task_batch(tab_id):
+    """
+    Applies many task operations in one request: {"operations": [{"action": "update", "taskId",
+    "completed"|"text"|"description"}, {"action": "delete", "taskId"}, ...], "atomic": false}.
+    Returns a result per operation. With "atomic": true (or ?atomic=1) all operations apply or none do.
+    """
+    user_id = get_authenticated_user_id()
+    if not user_id: return jsonify({"error": "Unauthorized"}), 401
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict): return jsonify({"error": "Request body must be a JSON object"}), 400
+    operations = data.get("operations")
+    if not isinstance(operations, list) or not operations: return jsonify({"error": "operations must be a non-empty array"}), 400
+    if len(operations) > ddb.TASK_BATCH_MAX_OPERATIONS:
+        return jsonify({"error": f"At most {ddb.TASK_BATCH_MAX_OPERATIONS} operations per batch"}), 400
+    atomic = bool(data.get("atomic")) or _form_flag(request.args.get("atomic", ""))
+    if atomic and len(operations) > ddb.TASK_BATCH_ATOMIC_MAX_OPERATIONS:
+        return jsonify({"error": f"Atomic batches are limited to {ddb.TASK_BATCH_ATOMIC_MAX_OPERATIONS} operations"}), 400
+
+    app.logger.info("Task batch for user %s, tab %s: %s operations (atomic=%s)", user_id, tab_id, len(operations), atomic)
+    results = ddb.apply_task_batch(user_id, tab_id, operations, atomic)
+    succeeded = sum(1 for r in results if r.get("success"))
+    failed = len(results) - succeeded
+    body = {"tabId": tab_id, "atomic": atomic, "succeeded": succeeded, "failed": failed, "results": results}
+    if failed == 0:
+        return jsonify(body), 200
+    elif succeeded > 0:
+        return jsonify(body), 207 # Partial success; see per-operation results
+    elif any(r.get("error") in TASK_BATCH_SERVER_ERRORS for r in results):
+        return jsonify(body), 500
+    elif atomic and any(r.get("error") in ("Task not found.", "Task changed concurrently; retry.", "Transaction conflict; retry.") for r in results):
+        return jsonify(body), 409 # The transaction was cancelled
+    else:
+        return jsonify(body), 400
+
+def _wants_ndjson() -> bool:
+    if request.args.get("format") == "ndjson":
+        return True
+    return request.accept_mimetypes.best == "application/x-ndjson"
+
+def _task_view_args():
+    """
+    (fields, summary) from the ?fields= and ?view= parameters of the task GET routes. view=summary
+    reads only TASK_SUMMARY_FIELDS unless fields= says otherwise. Raises ValueError for bad values.
+    """
+    view = request.args.get("view", "full")
+    if view not in ("full", "summary"):
+        raise ValueError("view must be 'full' or 'summary'")
+    fields = ddb.parse_task_fields(request.args.get("fields"))
+    summary = view == "summary"
+    if summary and not fields:
+        fields = list(ddb.TASK_SUMMARY_FIELDS)
+    return fields, summary
+
+def _stream_tasks_ndjson(user_id: str, tab_id: str, page_size, fields=None, summary: bool = False):
+    """ Generator for the NDJSON listing: one task per line, fetched page by page so memory stays flat. """
+    try:
+        for page in ddb.iter_task_pages(user_id, tab_id, page_size, fields):
+            yield "".join(app.json.dumps(ddb.shape_task(task, fields, summary)) + "\n" for task in page)
+    except ClientError as e:
+        app.logger.error(f"Task stream for user {user_id}, tab {tab_id} aborted: {e.response['Error']['Message']}")
+        yield app.json.dumps({"error": "Task listing interrupted"}) + "\n"
+
 @app.route("/api/tasks/<string:tab_id>", methods=["GET"])
 def api_get_tasks_for_tab(tab_id):
+    """
+    Lists a tab's tasks. Without paging parameters this returns the full array, as before.
+    With ?limit= and/or ?cursor= it returns {"items", "nextCursor"} for one page, and with
+    ?format=ndjson (or Accept: application/x-ndjson) it streams every task as NDJSON.
+    ?fields=text,completed returns only those attributes (plus taskId), read with a projection;
+    ?view=summary returns the list view's fields with descriptions truncated.
+    """
     user_id = get_authenticated_user_id()
     if not user_id: return jsonify({"error": "Unauthorized"}), 401
-    app.logger.info(f"Get tasks for user {user_id}, tab {tab_id}")
-    tasks = ddb.get_tasks_for_tab(user_id, tab_id)
-    return jsonify(tasks), 200
+    limit = request.args.get("limit", type=int)
+    if limit is not None and limit <= 0: return jsonify({"error": "limit must be a positive integer"}), 400
+    cursor = request.args.get("cursor")
+    try:
+        fields, summary = _task_view_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # The tab's version is one small consistent read; when the client already has it, the task query is skipped.
+    try:
+        version = ddb.get_tab_version(user_id, tab_id)
+    except ClientError as e:
+        app.logger.error(f"Error fetching version of tab {tab_id} for user {user_id}: {e.response['Error']['Message']}")
+        return jsonify({"error": "Failed to fetch tasks"}), 500
+    etag = _make_etag(user_id, "tasks", tab_id, version, _wants_ndjson(), request.query_string.decode("latin-1"))
+    not_modified = _not_modified(etag)
+    if not_modified: return not_modified
+
+    if _wants_ndjson():
+        app.logger.info("Stream tasks for user %s, tab %s", user_id, tab_id)
+        response = Response(stream_with_context(_stream_tasks_ndjson(user_id, tab_id, limit, fields, summary)), mimetype="application/x-ndjson")
+        return _with_etag(response, etag)
+
+    if limit is None and not cursor:
+        app.logger.info("Get tasks for user %s, tab %s", user_id, tab_id)
+        tasks = ddb.get_tasks_for_tab(user_id, tab_id, fields)
+        return _with_etag(jsonify([ddb.shape_task(task, fields, summary) for task in tasks]), etag), 200
+
+    app.logger.info("Get task page for user %s, tab %s (limit=%s)", user_id, tab_id, limit)
+    try:
+        items, next_cursor = ddb.query_tasks_page(user_id, tab_id, limit, cursor, fields)
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    except ClientError as e:
+        app.logger.error(f"Error fetching task page for user {user_id}, tab {tab_id}: {e.response['Error']['Message']}")
+        return jsonify({"error": "Failed to fetch tasks"}), 500
+    items = [ddb.shape_task(task, fields, summary) for task in items]
+    return _with_etag(jsonify({"items": items, "nextCursor": next_cursor}), etag), 200
+
+@app.route("/api/search", methods=["GET"])
+def api_search_tasks():
+    """
+    Full-text search over the user's tasks in every tab: ?q= words match task text and
+    descriptions as prefixes, best match first. Returns {"items", "nextCursor", "truncated"};
+    pass nextCursor back as ?cursor= for the next page (?limit=, at most SEARCH_PAGE_MAX_LIMIT).
+    ?fields= and ?view= work as for the task list, and every item keeps its tabId and score.
+    If the user's index has not been built yet, a background job builds it (202 + job id).
+    """
+    user_id = get_authenticated_user_id()
+    if not user_id: return jsonify({"error": "Unauthorized"}), 401
+    query = request.args.get("q", "").strip()
+    if not query: return jsonify({"error": "q is required"}), 400
+    limit = request.args.get("limit", type=int)
+    if limit is not None and limit <= 0: return jsonify({"error": "limit must be a positive integer"}), 400
+    try:
+        fields, summary = _task_view_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if fields and "tabId" not in fields:
+        fields = fields + ["tabId"]
+
+    if ddb.get_search_index_status(user_id) != "ready":
+        if not ddb.claim_search_index_rebuild(user_id):
+            return jsonify({"message": "Search index is being built; retry shortly", "status": "building"}), 202
+        app.logger.info("Building search index for user_id: %s in the background", user_id)
+        job = jobs.submit(user_id, "search_index", lambda report: {"indexed": ddb.rebuild_search_index(user_id, lambda n: report({"indexed": n}))})
+        status_url = url_for('api_get_job', job_id=job["jobId"])
+        return jsonify({"message": "Search index build started", **job, "statusUrl": status_url}), 202, {"Location": status_url}
+
+    app.logger.info("Search tasks for user %s (limit=%s)", user_id, limit)
+    try:
+        result = ddb.search_tasks(user_id, query, limit, request.args.get("cursor"))
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    except ClientError as e:
+        app.logger.error(f"Error searching tasks for user {user_id}: {e.response['Error']['Message']}")
+        return jsonify({"error": "Failed to search tasks"}), 500
+    result["items"] = [{**ddb.shape_task(task, fields, summary), "score": task["score"]} for task in result["items"]]
+    return jsonify(result), 200
 
 @app.route("/api/tasks/<string:tab_id>/<string:task_id>", methods=["GET"])
 def api_get_single_task(tab_id, task_id):
+    """ One task; ?fields= limits the attributes returned, as for the task list. """
     user_id = get_authenticated_user_id()
     if not user_id: return jsonify({"error": "Unauthorized"}), 401
-    app.logger.info(f"Get single task for user {user_id}, tab {tab_id}, task {task_id}")
-    task = ddb.get_task(user_id, tab_id, task_id)
+    try:
+        fields = ddb.parse_task_fields(request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    app.logger.info("Get single task for user %s, tab %s, task %s", user_id, tab_id, task_id)
+    task = ddb.get_task(user_id, tab_id, task_id, fields)
     if task:
-        return jsonify(task), 200
+        return jsonify(ddb.shape_task(task, fields)), 200
     else:
         return jsonify({"error": "Task not found"}), 404
 
@@ -238,7 +883,7 @@ def api_update_task(tab_id, task_id):
     updates_to_send = {k: v for k, v in updates.items() if v is not None}
 
     if not updates_to_send: return jsonify({"error": "No update fields provided"}), 400
-    app.logger.info(f"Update task for user {user_id}, task {task_id} with: {updates_to_send}")
+    app.logger.info("Update task for user %s, task %s (fields: %s)", user_id, task_id, ", ".join(sorted(updates_to_send)))
     updated_task = ddb.update_task(user_id=user_id, tab_id=tab_id, task_id=task_id, **updates_to_send)
     if updated_task:
         return jsonify(updated_task), 200
@@ -249,7 +894,7 @@ def api_update_task(tab_id, task_id):
 def api_delete_task(tab_id, task_id):
     user_id = get_authenticated_user_id()
     if not user_id: return jsonify({"error": "Unauthorized"}), 401
-    app.logger.info(f"Delete task for user {user_id}, task {task_id}")
+    app.logger.info("Delete task for user %s, task %s", user_id, task_id)
     success = ddb.delete_task(user_id, tab_id, task_id)
     if success:
         return jsonify({"message": "Task deleted successfully"}), 200 # Or 204 No Content
@@ -257,6 +902,75 @@ def api_delete_task(tab_id, task_id):
         return jsonify({"error": "Failed to delete task or task not found"}), 404 # or 500
 
 
+# --- EXPORT ENDPOINT ---
+EXPORT_PAGE_SIZE = int(os.environ.get("EXPORT_PAGE_SIZE", "1000")) # Tasks per storage page; bounds the memory of one export
+EXPORT_FORMATS = {"ndjson": ("application/x-ndjson", "ndjson"), "csv": ("text/csv", "csv")} # format -> (mimetype, file extension)
+
+def _stream_export_ndjson(user_id: str, tabs: list, tab_id: Optional[str]):
+    """ Generator for the NDJSON export: tab records, then one record per task, then an end record with the count. """
+    yield "".join(app.json.dumps({"type": "tab", **tab}) + "\n" for tab in tabs)
+    exported = 0
+    try:
+        for page in ddb.iter_export_pages(user_id, tab_id, EXPORT_PAGE_SIZE):
+            exported += len(page)
+            yield "".join(app.json.dumps({"type": "task", **ddb.shape_task(task, ddb.TASK_FIELDS)}) + "\n" for task in page)
+    except ClientError as e:
+        app.logger.error(f"Export for user {user_id} aborted after {exported} tasks: {e.response['Error']['Message']}")
+        yield app.json.dumps({"type": "error", "error": "Export interrupted"}) + "\n"
+        return
+    yield app.json.dumps({"type": "end", "tabs": len(tabs), "tasks": exported}) + "\n"
+
+def _stream_export_csv(user_id: str, tabs: list, tab_id: Optional[str]):
+    """
+    Generator for the pipe-delimited export: an EXPORT_CSV_HEADER line, then
+    'text|description|completed|tabId|tabName' per task with fields escaped by _escape_import_field.
+    Import reads the first two fields and, seeing the header, the escapes, so the file (or one tab's) imports again.
+    """
+    tab_names = {tab["tabId"]: tab.get("tabName", "") for tab in tabs}
+    exported = 0
+    yield f"{EXPORT_CSV_HEADER} text|description|completed|tabId|tabName\n"
+    try:
+        for page in ddb.iter_export_pages(user_id, tab_id, EXPORT_PAGE_SIZE):
+            exported += len(page)
+            yield "".join("|".join((
+                _escape_import_field(str(task.get("text") or "")), _escape_import_field(str(task.get("description") or "")),
+                "true" if task.get("completed") else "false",
+                _escape_import_field(task["tabId"]), _escape_import_field(tab_names.get(task["tabId"], ""))
+            )) + "\n" for task in page)
+    except ClientError as e:
+        # There is no room for an error record in this format: abort the transfer rather than end it cleanly.
+        app.logger.error(f"Export for user {user_id} aborted after {exported} tasks: {e.response['Error']['Message']}")
+        raise
+
+@app.route("/api/export", methods=["GET"])
+def api_export():
+    """
+    Streams all of the user's tabs and tasks as a download, page by page so memory stays flat for
+    any account size. ?format=ndjson (default) or csv (the pipe-delimited import format); ?tabId=
+    exports one tab.
+    """
+    user_id = get_authenticated_user_id()
+    if not user_id: return jsonify({"error": "Unauthorized"}), 401
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS: return jsonify({"error": "format must be 'ndjson' or 'csv'"}), 400
+    tab_id = request.args.get("tabId") or None
+    tabs = ddb.get_user_tabs(user_id)
+    if tab_id:
+        tabs = [tab for tab in tabs if tab.get("tabId") == tab_id]
+        if not tabs: return jsonify({"error": "Tab not found"}), 404
+
+    app.logger.info("Export %s for user %s (tab %s)", export_format, user_id, tab_id or "all")
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    stream = _stream_export_csv if export_format == "csv" else _stream_export_ndjson
+    response = Response(stream_with_context(stream(user_id, tabs, tab_id)), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="taskhive-export.{extension}"'
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+startup.import_finished()
+
 if __name__ == "__main__":
-    app.logger.info("Starting TaskHive Flask development server...")
+    ddb.prewarm_storage()
+    app.logger.info("Starting TaskHive Flask development server (production: gunicorn -c gunicorn.conf.py)...")
     app.run(host="0.0.0.0", port=5000, debug=True) # debug=True is fine for EC2 dev
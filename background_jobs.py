@@ -0,0 +1,90 @@
+"""
+In-process background jobs for work too slow to finish inside an HTTP request.
+
+A job runs on a small shared thread pool and records its status and progress so clients can
+poll GET /api/jobs/<job_id>. Each job belongs to a user, and only that user can read it.
+Finished jobs are kept for JOB_RETENTION_SECONDS. The registry is per process, so with several
+worker processes the status endpoint must be served by the worker that accepted the job
+(sticky sessions), or it will answer 404 until the job's effects are visible.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from datetime import datetime
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+JOB_MAX_WORKERS = int(os.environ.get("JOB_MAX_WORKERS", "2"))
+JOB_RETENTION_SECONDS = float(os.environ.get("JOB_RETENTION_SECONDS", "3600"))
+
+logger = logging.getLogger(__name__)
+
+
+class JobRegistry:
+    def __init__(self, max_workers: int = JOB_MAX_WORKERS, retention_seconds: float = JOB_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="taskhive-job")
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._finished_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, owner_id: str, job_type: str, work: Callable[[Callable[[Dict[str, Any]], None]], Any],
+               details: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Queues `work(report_progress)`. work may call report_progress({...}) to publish progress;
+        its return value becomes the job's 'result'. Returns a snapshot of the new job.
+        """
+        job_id = str(uuid.uuid4())
+        job = {
+            "jobId": job_id, "type": job_type, "status": "queued", "progress": {},
+            "details": details or {}, "result": None, "error": None,
+            "createdAt": datetime.now().isoformat(), "finishedAt": None, "_owner": owner_id
+        }
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = job
+        # Run in a copy of the caller's context so the job's log records keep its request id.
+        self._pool.submit(contextvars.copy_context().run, self._run, job_id, work)
+        return self._snapshot(job)
+
+    def get(self, job_id: str, owner_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job["_owner"] != owner_id:
+                return None
+            return self._snapshot(job)
+
+    def _run(self, job_id: str, work: Callable) -> None:
+        def report_progress(progress: Dict[str, Any]) -> None:
+            with self._lock:
+                self._jobs[job_id]["progress"] = dict(progress)
+
+        self._update(job_id, status="running")
+        try:
+            result = work(report_progress)
+            self._update(job_id, status="succeeded", result=result, finishedAt=datetime.now().isoformat())
+        except Exception as e:
+            logger.exception(f"Background job {job_id} failed")
+            self._update(job_id, status="failed", error=str(e), finishedAt=datetime.now().isoformat())
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            self._jobs[job_id].update(fields)
+            if fields.get("finishedAt"):
+                self._finished_at[job_id] = time.monotonic()
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - self.retention_seconds
+        for job_id in [j for j, finished in self._finished_at.items() if finished < cutoff]:
+            del self._finished_at[job_id]
+            self._jobs.pop(job_id, None)
+
+    @staticmethod
+    def _snapshot(job: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in job.items() if not k.startswith("_")}
+
+
+jobs = JobRegistry()
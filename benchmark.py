@@ -0,0 +1,478 @@
+"""
+Reproducible per-endpoint benchmark and load generator for api.py.
+
+Every scenario drives real routes, either through the Flask test client (in-process, no
+sockets) or through a threaded WSGI server over HTTP with keep-alive connections. Storage is
+the local SQLite engine (sqlite_backend.py) with optional injected latency, so runs need no
+AWS and are repeatable for a given --seed.
+
+Examples:
+    python benchmark.py                                   # all scenarios, both drivers
+    python benchmark.py --driver wsgi --concurrency 16 --latency-ms 3
+    python benchmark.py --scenarios task_create,task_list_large --output bench.json
+    python benchmark.py --output new.json --compare old.json
+    python benchmark.py --accept-encoding br --accept application/msgpack --compare plain.json
+    python benchmark.py --driver wsgi --target 127.0.0.1:5000 --db /tmp/bench.db   # a running gunicorn
+
+With --target, requests go to an already running server instead of the in-process one. The
+server must use the same SQLite file (TASKHIVE_STORAGE=sqlite TASKHIVE_SQLITE_PATH=<--db>)
+and run with RATE_LIMIT_ENABLED=0, and its injected latency comes from TASKHIVE_SQLITE_LATENCY_MS; CPU and memory figures are
+then the client's, not the server's.
+
+Results are written as JSON: p50/p95/p99 latency, throughput, CPU and bytes on the wire per
+response and process memory per scenario, plus the git commit and parameters of the run.
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# The app picks its storage backend at import time; start on a throwaway local engine
+# and swap in the configured one below.
+os.environ.setdefault("TASKHIVE_STORAGE", "sqlite")
+os.environ.setdefault("TASKHIVE_SQLITE_PATH", ":memory:")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0") # Measure the routes, not the per-user limiter
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+import api
+import dynamodb_operations as ddb
+import serialization
+from sqlite_backend import SQLiteBackend
+
+BENCH_PASSWORD = "bench-password-1!"
+WORDS = ("plan", "review", "write", "ship", "fix", "test", "design", "call", "email", "refactor",
+         "deploy", "draft", "sync", "update", "clean", "measure", "profile", "document", "triage", "merge")
+
+Request = Tuple[str, str, Optional[Any]] # (method, path, json body)
+
+
+# --- Drivers ---
+class TestClientDriver:
+    """ Sends requests through Flask's test client: measures the app without network or server overhead. """
+    name = "test-client"
+
+    def __init__(self, app, headers: Optional[Dict[str, str]] = None):
+        self.client = app.test_client()
+        self.headers = headers or {}
+        self.last_headers: Dict[str, str] = {}
+
+    def request(self, method: str, path: str, body: Optional[Any] = None) -> Tuple[int, bytes]:
+        response = self.client.open(path, method=method, json=body, headers=self.headers)
+        self.last_headers = dict(response.headers)
+        return response.status_code, response.get_data()
+
+
+class HTTPDriver:
+    """ Sends requests over a keep-alive HTTP connection to the benchmark WSGI server. """
+    name = "wsgi"
+
+    def __init__(self, host: str, port: int, headers: Optional[Dict[str, str]] = None):
+        self.host, self.port = host, port
+        self.headers = headers or {}
+        self.last_headers: Dict[str, str] = {}
+        self.cookie: Optional[str] = None
+        self.connection = http.client.HTTPConnection(host, port, timeout=120)
+
+    def request(self, method: str, path: str, body: Optional[Any] = None) -> Tuple[int, bytes]:
+        headers = dict(self.headers)
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        for attempt in range(2):
+            try:
+                self.connection.request(method, path, body=payload, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                self.connection.close()
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=120)
+                if attempt:
+                    raise
+        self.last_headers = dict(response.getheaders())
+        set_cookie = response.getheader("Set-Cookie")
+        if set_cookie:
+            self.cookie = set_cookie.split(";", 1)[0]
+        return response.status, data
+
+
+class _KeepAliveHandler(WSGIRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class BenchmarkServer:
+    """ Threaded WSGI server on an ephemeral port, running in a background thread. """
+
+    def __init__(self, app):
+        self.server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=_KeepAliveHandler)
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "BenchmarkServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.thread.join()
+
+
+def decode_body(data: bytes, headers: Dict[str, str]) -> Any:
+    """ Undoes the Content-Encoding and content type the server negotiated, returning the payload. """
+    encoding = headers.get("Content-Encoding")
+    if encoding == "gzip":
+        data = zlib.decompress(data, 31)
+    elif encoding == "br":
+        data = serialization.brotli.decompress(data)
+    if headers.get("Content-Type", "").startswith(serialization.MSGPACK_MIMETYPE):
+        return serialization.msgpack.unpackb(data)
+    return json.loads(data)
+
+
+# --- Synthetic data ---
+def task_text(rng: random.Random) -> Tuple[str, str]:
+    text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6)))
+    description = " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 20)))
+    return text.capitalize(), description
+
+def seed_tasks(user_id: str, tab_id: str, count: int, rng: random.Random) -> None:
+    def generate():
+        for i in range(count):
+            text, description = task_text(rng)
+            yield {"line": i + 1, "text": text, "description": description, "completed": rng.random() < 0.3}
+    ddb.add_tasks_bulk(user_id, tab_id, generate())
+
+def seed_users(count: int, run_id: str) -> List[Dict[str, str]]:
+    users = []
+    for i in range(count):
+        username = f"bench-{run_id}-{i}"
+        result = ddb.register_user(username, BENCH_PASSWORD)
+        if not result.get("success"):
+            raise RuntimeError(f"Could not seed user {username}: {result}")
+        users.append({"userId": result["userId"], "username": username})
+    return users
+
+
+# --- Scenarios ---
+class Worker:
+    """ One load-generating thread: a logged-in driver plus the data it created. """
+
+    def __init__(self, index: int, user: Dict[str, str], driver, seed: int):
+        self.index = index
+        self.tag = "tc" if driver.name == "test-client" else "http" # Keeps ids unique across driver passes
+        self.user = user
+        self.driver = driver
+        self.rng = random.Random(seed * 1000 + index)
+        self.task_ids: List[str] = []
+        self.purge_tab_ids: List[str] = []
+        self.cursor: Optional[str] = None
+        self.sync_token = ddb.get_sync_token(user["userId"]) # Taken before any scenario writes, like a client going offline
+
+    @property
+    def tab_id(self) -> str:
+        return f"bench-{self.tag}-w{self.index}"
+
+    def login(self) -> Tuple[int, bytes]:
+        return self.driver.request("POST", "/api/auth/login", {"username": self.user["username"], "password": BENCH_PASSWORD})
+
+
+def _task_create(worker: Worker, i: int) -> Request:
+    text, description = task_text(worker.rng)
+    return ("POST", "/api/tasks", {"tabId": worker.tab_id, "text": text, "description": description})
+
+def _created_task(worker: Worker, i: int) -> str:
+    return worker.task_ids[i % len(worker.task_ids)]
+
+def _large_page(worker: Worker, i: int) -> Request:
+    path = "/api/tasks/large?limit=100" + (f"&cursor={worker.cursor}" if worker.cursor else "")
+    return ("GET", path, None)
+
+# name -> (request builder, heavy?)
+SCENARIOS: Dict[str, Tuple[Callable[[Worker, int], Request], bool]] = {
+    "login": (lambda w, i: ("POST", "/api/auth/login", {"username": w.user["username"], "password": BENCH_PASSWORD}), True),
+    "bootstrap": (lambda w, i: ("GET", "/api/bootstrap", None), False),
+    "tab_list": (lambda w, i: ("GET", "/api/tabs", None), False),
+    "active_tab_switch": (lambda w, i: ("PUT", "/api/user/preferences/active-tab", {"activeTabId": w.tab_id if i % 2 else "main"}), False),
+    "tab_create": (lambda w, i: ("POST", "/api/tabs", {"tabName": f"{w.tab_id} t{i}"}), False),
+    "tab_delete": (lambda w, i: ("DELETE", f"/api/tabs/{w.tab_id}-t{i}", None), False),
+    "task_create": (_task_create, False),
+    "task_get": (lambda w, i: ("GET", f"/api/tasks/{w.tab_id}/{_created_task(w, i)}", None), False),
+    "task_update": (lambda w, i: ("PUT", f"/api/tasks/{w.tab_id}/{_created_task(w, i)}", {"completed": i % 2 == 0}), False),
+    "task_batch_update": (lambda w, i: ("POST", f"/api/tasks/{w.tab_id}/batch",
+                                        {"operations": [{"action": "update", "taskId": t, "completed": i % 2 == 0} for t in w.task_ids]}), False),
+    "task_list_large": (lambda w, i: ("GET", "/api/tasks/large", None), True),
+    "task_list_large_paged": (_large_page, False),
+    "task_list_large_ndjson": (lambda w, i: ("GET", "/api/tasks/large?format=ndjson", None), True),
+    "task_list_large_summary": (lambda w, i: ("GET", "/api/tasks/large?view=summary", None), True),
+    "export_ndjson": (lambda w, i: ("GET", "/api/export", None), True),
+    "export_csv": (lambda w, i: ("GET", "/api/export?format=csv", None), True),
+    "search": (lambda w, i: ("GET", f"/api/search?q={WORDS[i % len(WORDS)][:4]}+{WORDS[(i * 7 + 3) % len(WORDS)]}", None), False),
+    "task_delete": (lambda w, i: ("DELETE", f"/api/tasks/{w.tab_id}/{_created_task(w, i)}", None), False),
+    "sync": (lambda w, i: ("GET", f"/api/sync?since={w.sync_token}", None), False),
+    "tab_delete_large": (lambda w, i: ("DELETE", f"/api/tabs/{w.purge_tab_ids[i]}", None), True),
+}
+DEFAULT_ORDER = list(SCENARIOS)
+
+
+def _prepare(name: str, workers: List[Worker], iterations: int, args, rng: random.Random) -> None:
+    """ Untimed setup a scenario needs before it runs. """
+    if name == "tab_delete_large":
+        for worker in workers:
+            worker.purge_tab_ids = []
+            for i in range(iterations):
+                tab = ddb.add_user_tab(worker.user["userId"], f"purge w{worker.index} i{i} {rng.randrange(10**9)}")
+                seed_tasks(worker.user["userId"], tab["tabId"], args.delete_tab_tasks, rng)
+                worker.purge_tab_ids.append(tab["tabId"])
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def run_scenario(name: str, workers: List[Worker], iterations_per_worker: int, args, rng: random.Random) -> Dict[str, Any]:
+    build_request, _ = SCENARIOS[name]
+    _prepare(name, workers, iterations_per_worker, args, rng)
+    if name in ("task_get", "task_update", "task_delete"):
+        for worker in workers:
+            worker.task_ids = [t["taskId"] for t in ddb.get_tasks_for_tab(worker.user["userId"], worker.tab_id)]
+            if not worker.task_ids:
+                return {"scenario": name, "skipped": "no tasks; run task_create first"}
+    if name == "task_delete":
+        iterations_per_worker = min(iterations_per_worker, min(len(w.task_ids) for w in workers))
+
+    latencies: List[float] = []
+    status_counts: Dict[str, int] = {}
+    total_bytes = 0
+    lock = threading.Lock()
+
+    def drive(worker: Worker) -> None:
+        nonlocal total_bytes
+        local_latencies: List[float] = []
+        local_status: Dict[str, int] = {}
+        local_bytes = 0
+        for i in range(iterations_per_worker):
+            method, path, body = build_request(worker, i)
+            started = time.perf_counter()
+            status, data = worker.driver.request(method, path, body)
+            local_latencies.append((time.perf_counter() - started) * 1000.0)
+            local_status[str(status)] = local_status.get(str(status), 0) + 1
+            local_bytes += len(data)
+            if name == "task_list_large_paged":
+                # Walk the large tab page by page, wrapping around at the end.
+                worker.cursor = decode_body(data, worker.driver.last_headers).get("nextCursor") if status == 200 else None
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_status.items():
+                status_counts[status] = status_counts.get(status, 0) + count
+            total_bytes += local_bytes
+
+    if args.trace_memory:
+        tracemalloc.start()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    cpu_before = time.process_time()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(workers)) as pool:
+        list(pool.map(drive, workers))
+    elapsed = time.perf_counter() - started
+    cpu_seconds = time.process_time() - cpu_before
+    result: Dict[str, Any] = {"scenario": name}
+    if args.trace_memory:
+        result["tracemalloc_peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+
+    latencies.sort()
+    count = len(latencies)
+    errors = sum(c for s, c in status_counts.items() if not s.startswith("2"))
+    result.update({
+        "requests": count,
+        "errors": errors,
+        "status_counts": status_counts,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 3), "p95": round(percentile(latencies, 0.95), 3),
+            "p99": round(percentile(latencies, 0.99), 3), "mean": round(sum(latencies) / count, 3) if count else 0.0,
+            "max": round(latencies[-1], 3) if count else 0.0,
+        },
+        "throughput_rps": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        "wall_seconds": round(elapsed, 3),
+        "cpu_ms_per_request": round(cpu_seconds * 1000.0 / count, 3) if count else 0.0,
+        "bytes_per_response": round(total_bytes / count, 1) if count else 0.0,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "rss_growth_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before,
+    })
+    return result
+
+
+# --- Orchestration ---
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_driver(driver_name: str, scenario_names: List[str], users: List[Dict[str, str]], args, rng: random.Random,
+               server: Optional[BenchmarkServer]) -> List[Dict[str, Any]]:
+    headers = {}
+    if args.accept:
+        headers["Accept"] = args.accept
+    if args.accept_encoding:
+        headers["Accept-Encoding"] = args.accept_encoding
+    workers = []
+    for index in range(args.concurrency):
+        if driver_name == "test-client":
+            driver = TestClientDriver(api.app, headers)
+        elif args.target:
+            host, port = args.target.rsplit(":", 1)
+            driver = HTTPDriver(host, int(port), headers)
+        else:
+            driver = HTTPDriver("127.0.0.1", server.port, headers)
+        worker = Worker(index, users[index % len(users)], driver, args.seed)
+        status, _ = worker.login()
+        if status != 200:
+            raise RuntimeError(f"Benchmark login failed with status {status}")
+        workers.append(worker)
+
+    results = []
+    for name in scenario_names:
+        _, heavy = SCENARIOS[name]
+        total = args.heavy_requests if heavy else args.requests
+        per_worker = max(1, total // args.concurrency)
+        result = run_scenario(name, workers, per_worker, args, rng)
+        result.update({"driver": driver_name, "concurrency": args.concurrency})
+        results.append(result)
+        latency = result.get("latency_ms", {})
+        print(f"[{driver_name}] {name:<24} p50={latency.get('p50', '-'):>9} ms  p95={latency.get('p95', '-'):>9} ms  "
+              f"p99={latency.get('p99', '-'):>9} ms  {result.get('throughput_rps', '-'):>9} req/s  errors={result.get('errors', '-')}",
+              file=sys.stderr)
+    return results
+
+
+def compare(current: List[Dict[str, Any]], baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = {(r["driver"], r["scenario"]): r for r in json.load(f)["results"] if "latency_ms" in r}
+    print(f"\nComparison against {baseline_path} (negative is faster):", file=sys.stderr)
+    for result in current:
+        old = baseline.get((result.get("driver"), result["scenario"]))
+        if not old or "latency_ms" not in result:
+            continue
+        deltas = []
+        for key in ("p50", "p95", "p99"):
+            before, after = old["latency_ms"][key], result["latency_ms"][key]
+            deltas.append(f"{key} {((after - before) / before * 100.0) if before else 0.0:+6.1f}%")
+        for key, label in (("cpu_ms_per_request", "cpu"), ("bytes_per_response", "bytes")):
+            before, after = old.get(key, 0.0), result.get(key, 0.0)
+            deltas.append(f"{label} {before:g} -> {after:g} ({((after - before) / before * 100.0) if before else 0.0:+6.1f}%)")
+        print(f"  [{result['driver']}] {result['scenario']:<24} " + "  ".join(deltas), file=sys.stderr)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--driver", choices=("test-client", "wsgi", "both"), default="both")
+    parser.add_argument("--scenarios", default=",".join(DEFAULT_ORDER), help="Comma-separated scenario names, run in order")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent client threads")
+    parser.add_argument("--users", type=int, default=2, help="Seeded users shared by the client threads")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per light scenario (split across threads)")
+    parser.add_argument("--heavy-requests", type=int, default=8, help="Requests per heavy scenario (login, large listings, large tab deletes)")
+    parser.add_argument("--large-tab-tasks", type=int, default=5000, help="Tasks seeded into each user's 'large' tab")
+    parser.add_argument("--delete-tab-tasks", type=int, default=2000, help="Tasks in each tab deleted by tab_delete_large")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Injected storage latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Extra random storage latency per call")
+    parser.add_argument("--db", default=None, help="SQLite path (default: a temporary file in WAL mode)")
+    parser.add_argument("--accept", default=None, help="Accept header sent with every request, e.g. application/msgpack")
+    parser.add_argument("--accept-encoding", default=None, help="Accept-Encoding header sent with every request, e.g. 'br, gzip'")
+    parser.add_argument("--target", default=None, help="HOST:PORT of a running server for the wsgi driver (needs --db)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--trace-memory", action="store_true", help="Report tracemalloc peaks (slows the run)")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", default=None, help="Write JSON results here (default: stdout)")
+    parser.add_argument("--compare", default=None, help="Earlier JSON results to compare against")
+    args = parser.parse_args(argv)
+    unknown = [s for s in args.scenarios.split(",") if s and s not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}. Choose from: {', '.join(SCENARIOS)}")
+    if args.target and (args.db is None or args.driver != "wsgi"):
+        parser.error("--target needs --driver wsgi and --db pointing at the server's SQLite file")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.getLogger().setLevel(args.log_level)
+    api.app.logger.setLevel(args.log_level)
+
+    temp_dir = None
+    db_path = args.db
+    if db_path is None:
+        temp_dir = tempfile.TemporaryDirectory(prefix="taskhive-bench-")
+        db_path = os.path.join(temp_dir.name, "bench.db")
+    backend = SQLiteBackend(db_path, ddb.USERS_TABLE_NAME, ddb.TODO_LIST_TABLE_NAME,
+                            latency_seconds=args.latency_ms / 1000.0, latency_jitter_seconds=args.jitter_ms / 1000.0)
+    ddb.use_storage_backend(backend)
+
+    rng = random.Random(args.seed)
+    run_id = f"{args.seed}-{int(time.time())}"
+    users = seed_users(max(1, args.users), run_id)
+    for user in users:
+        seed_tasks(user["userId"], "large", args.large_tab_tasks, rng)
+
+    scenario_names = [s for s in args.scenarios.split(",") if s]
+    drivers = ["test-client", "wsgi"] if args.driver == "both" else [args.driver]
+    results: List[Dict[str, Any]] = []
+    try:
+        for driver_name in drivers:
+            if driver_name == "wsgi" and not args.target:
+                with BenchmarkServer(api.app) as server:
+                    results += run_driver(driver_name, scenario_names, users, args, rng, server)
+            else:
+                results += run_driver(driver_name, scenario_names, users, args, rng, None)
+    finally:
+        ddb.use_storage_backend(None)
+        backend.close()
+        if temp_dir:
+            temp_dir.cleanup()
+
+    report = {
+        "meta": {
+            "commit": git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(), "platform": platform.platform(),
+            "parameters": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,57 +1,275 @@
-import bcrypt
-import boto3
 from boto3.dynamodb.conditions import Key # Ensure Key is imported for queries
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError
 
+import base64
+from collections import OrderedDict
+import contextlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import contextvars
+import copy
 from datetime import datetime
+import json
 import logging
-from typing import Optional, List, Dict, Any
+import os
+import random
+import threading
+import time
+from typing import Optional, List, Dict, Any, Callable, Iterable, Iterator, Tuple
 import uuid
 
+from metrics import registry
+from password_pool import PasswordPoolBusy, password_pool, rehashed_total
+import event_bus
+import search_index
+import startup
+from storage_backends import StorageBackend, create_storage_backend
+from storage_metrics import InstrumentedBackend, instrument_backend, storage_operation
+from storage_resilience import resilient_backend
+from write_behind import WriteBehindBuffer
+from structured_logging import configure_logging
+
 
 USERS_TABLE_NAME = 'taskhive-users'
 TODO_LIST_TABLE_NAME = "todo-list-data"
 AWS_REGION = "ap-southeast-1"
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+BATCH_WRITE_CHUNK_SIZE = 25 # BatchWriteItem hard limit
+BATCH_WRITE_MAX_RETRIES = 5 # Retries for UnprocessedItems before giving up on a chunk
+BATCH_WRITE_BASE_BACKOFF_SECONDS = 0.05
+TASK_PAGE_MAX_LIMIT = 1000 # Upper bound for a client-requested page size
+TASK_FIELDS = ("taskId", "tabId", "text", "description", "completed", "createdAt", "updatedAt") # Selectable with fields=
+TASK_SUMMARY_FIELDS = ("taskId", "text", "description", "completed", "updatedAt") # What the task list renders
+TASK_SUMMARY_DESCRIPTION_CHARS = int(os.environ.get("TASK_SUMMARY_DESCRIPTION_CHARS", "140"))
+TAB_DELETE_MAX_WORKERS = int(os.environ.get("TAB_DELETE_MAX_WORKERS", "4")) # Parallel BatchWriteItem calls per tab deletion
+PROFILE_CACHE_MAX_ENTRIES = int(os.environ.get("PROFILE_CACHE_MAX_ENTRIES", "10000"))
+PROFILE_CACHE_TTL_SECONDS = float(os.environ.get("PROFILE_CACHE_TTL_SECONDS", "30"))
+SYNC_CHANGE_RETENTION_SECONDS = int(os.environ.get("SYNC_CHANGE_RETENTION_SECONDS", str(7 * 24 * 3600))) # Lifetime of CHANGE# rows (DynamoDB TTL on 'expiresAt')
+SYNC_SETTLE_SECONDS = int(os.environ.get("SYNC_SETTLE_SECONDS", "30")) # After this, a missing change sequence number is treated as an abandoned write
+SYNC_MAX_CHANGES = 500 # Change rows returned per sync call; clients call again while hasMore is true
+BATCH_GET_MAX_KEYS = 100 # BatchGetItem hard limit
+TRANSACT_MAX_ITEMS = 100 # TransactWriteItems hard limit
+TASK_BATCH_ATOMIC_MAX_OPERATIONS = TRANSACT_MAX_ITEMS - 1 # One transaction slot is kept for the tab's counter update
+TASK_BATCH_MAX_OPERATIONS = 1000 # Operations accepted by one apply_task_batch call
+TAB_RECOUNT_MAX_ATTEMPTS = 3 # Conditional writes tried when initializing a tab's task counters
+TAB_UPDATE_MAX_ATTEMPTS = int(os.environ.get("TAB_UPDATE_MAX_ATTEMPTS", "5")) # Conditional PROFILE writes tried per tab-list change before giving up
+TAB_UPDATE_BASE_BACKOFF_SECONDS = 0.02
+TASK_BATCH_MAX_WORKERS = int(os.environ.get("TASK_BATCH_MAX_WORKERS", "8")) # Parallel update_item calls per batch
+ACTIVE_TAB_FLUSH_SECONDS = float(os.environ.get("ACTIVE_TAB_FLUSH_SECONDS", "2")) # Active tab preferences are written at most this long after being set; 0 writes immediately
+READINESS_CACHE_SECONDS = float(os.environ.get("READINESS_CACHE_SECONDS", "2")) # Probes within this window reuse the last check
+READINESS_PROBE_KEY = "__readiness_probe__" # Never a real username or UserID
+STORAGE_PREWARM_CONNECTIONS = int(os.environ.get("STORAGE_PREWARM_CONNECTIONS", "0")) # Pooled connections opened by prewarm_storage(); 0 only connects
+SEARCH_PAGE_DEFAULT_LIMIT = 20
+SEARCH_PAGE_MAX_LIMIT = 100
+SEARCH_PROBE_POSTINGS = BATCH_GET_MAX_KEYS # Postings read per term of a multi-word query before picking the rarest term; also its candidate round size
+SEARCH_REBUILD_STALE_SECONDS = int(os.environ.get("SEARCH_REBUILD_STALE_SECONDS", "900")) # A rebuild still 'building' after this is presumed dead and may be claimed again
+
+configure_logging() # Queue-backed JSON logging, see structured_logging.py
 logger = logging.getLogger(__name__) # General logger for tasks, tabs, prefs
 logger_auth = logging.getLogger(__name__ + "_auth") # Specific logger for auth functions
 
-# Initialize DynamoDB resources
+tab_list_conflicts_total = registry.counter(
+    "taskhive_tab_list_conflicts_total", "Conditional PROFILE writes of the tab list that lost a race and were retried."
+)
+
+# --- PROFILE CACHE ---
+class ProfileCache:
+    """
+    Bounded LRU cache of PROFILE items keyed by UserID, with a per-entry TTL.
+    Every PROFILE mutation in this module writes the new item through (or invalidates it),
+    so the TTL only bounds staleness from writes made by other processes.
+    Callers always get a deep copy, so mutating a returned profile never touches the cache.
+    """
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, profile = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+        return copy.deepcopy(profile)
+
+    def put(self, user_id: str, profile: Optional[Dict[str, Any]]) -> None:
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        if not profile:
+            self.invalidate(user_id)
+            return
+        entry = (time.monotonic() + self.ttl_seconds, copy.deepcopy(profile))
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "expirations": self.expirations, "size": len(self._entries), "maxEntries": self.max_entries
+            }
+
+profile_cache = ProfileCache(PROFILE_CACHE_MAX_ENTRIES, PROFILE_CACHE_TTL_SECONDS)
+
+def get_profile_cache_stats() -> Dict[str, Any]:
+    return profile_cache.stats()
+
+
+# --- STORAGE BACKEND ---
+# All functions below go through `users_table` / `todo_list_table` (boto3 Table API) and
+# `storage_backend` for service-level calls. TASKHIVE_STORAGE=sqlite swaps in the local engine.
+storage_backend: Optional[StorageBackend] = None
+users_table = None
+todo_list_table = None
+_readiness: Dict[str, Any] = {"checkedAt": 0.0, "result": None} # Last check_storage_ready() result
+_readiness_lock = threading.Lock()
+
+def use_storage_backend(backend: Optional[StorageBackend]) -> None:
+    """
+    Points every storage function at `backend` (None disables storage) and drops cached PROFILEs.
+    The backend is wrapped so each call is retried on throttles and transient failures
+    (see storage_resilience.py) and measured per operation (see storage_metrics.py).
+    """
+    global storage_backend, users_table, todo_list_table
+    if not isinstance(backend, InstrumentedBackend): # Already wrapped when called again after a fork
+        backend = instrument_backend(resilient_backend(backend))
+    storage_backend = backend
+    users_table = backend.users_table if backend else None
+    todo_list_table = backend.todo_list_table if backend else None
+    profile_cache.clear()
+    _readiness["result"] = None
+
 try:
-    dynamodb_resource = boto3.resource("dynamodb", region_name=AWS_REGION)
-    users_table = dynamodb_resource.Table(USERS_TABLE_NAME)
-    todo_list_table = dynamodb_resource.Table(TODO_LIST_TABLE_NAME)
-    logger.info(f"Successfully initialized DynamoDB tables: {USERS_TABLE_NAME}, {TODO_LIST_TABLE_NAME}")
+    use_storage_backend(create_storage_backend(AWS_REGION, USERS_TABLE_NAME, TODO_LIST_TABLE_NAME))
+    logger.info("Configured %s storage for tables %s, %s (connects on first use)", storage_backend.name, USERS_TABLE_NAME, TODO_LIST_TABLE_NAME)
 except Exception as e:
-    logger.error(f"Failed to initialize DynamoDB resource or table(s): {e}")
-    users_table = None
-    todo_list_table = None
+    logger.error(f"Failed to initialize storage backend or table(s): {e}")
+    use_storage_backend(None)
+
+def storage_after_fork() -> None:
+    """ Gives a forked worker process its own storage connections (gunicorn's post_fork hook calls this). """
+    global _readiness_lock
+    _readiness_lock = threading.Lock()
+    if storage_backend:
+        storage_backend.after_fork()
+        use_storage_backend(storage_backend)
+
+@storage_operation
+def prewarm_storage(connections: int = STORAGE_PREWARM_CONNECTIONS) -> None:
+    """
+    Connects the backend now and, with `connections` > 0, opens that many pooled connections by
+    running concurrent probe reads, so the first real requests skip TCP and TLS setup. Call it
+    where a process starts serving (gunicorn's post_fork, a serverless init phase); failures are
+    logged, not raised, since the first request would simply connect on its own.
+    """
+    if not storage_backend:
+        return
+    started = time.perf_counter()
+    try:
+        storage_backend.connect()
+        if connections > 0:
+            key = {"UserID": READINESS_PROBE_KEY, "SK": "PROFILE"}
+            with ThreadPoolExecutor(max_workers=connections) as pool:
+                list(pool.map(lambda _: todo_list_table.get_item(Key=key), range(connections)))
+    except Exception as e:
+        logger.warning(f"Storage prewarm failed: {e}")
+        return
+    startup.record("prewarm", time.perf_counter() - started)
+
+@storage_operation
+def check_storage_ready() -> Dict[str, Any]:
+    """
+    Readiness of both tables, checked with a consistent get_item of a key that never exists, so
+    it exercises credentials, network and table permissions at the cost of one read unit each.
+    Results are reused for READINESS_CACHE_SECONDS so frequent probes do not add load.
+    """
+    with _readiness_lock:
+        if _readiness["result"] and time.monotonic() - _readiness["checkedAt"] < READINESS_CACHE_SECONDS:
+            return _readiness["result"]
+        tables: Dict[str, Any] = {}
+        if not storage_backend:
+            result = {"ready": False, "backend": None, "tables": tables, "error": "Storage backend not initialized."}
+        else:
+            probes = ((USERS_TABLE_NAME, users_table, {"username": READINESS_PROBE_KEY}),
+                      (TODO_LIST_TABLE_NAME, todo_list_table, {"UserID": READINESS_PROBE_KEY, "SK": "PROFILE"}))
+            for table_name, table, key in probes:
+                started = time.perf_counter()
+                try:
+                    table.get_item(Key=key, ConsistentRead=True)
+                    tables[table_name] = {"ok": True, "latencyMs": round((time.perf_counter() - started) * 1000.0, 2)}
+                except Exception as e:
+                    logger.warning(f"Readiness check failed for table {table_name}: {e}")
+                    code = e.response["Error"]["Code"] if isinstance(e, ClientError) else type(e).__name__
+                    tables[table_name] = {"ok": False, "error": code}
+            result = {"ready": all(t["ok"] for t in tables.values()), "backend": storage_backend.name, "tables": tables}
+        _readiness.update(checkedAt=time.monotonic(), result=result)
+        return result
 
 
 # --- AUTHENTICATION FUNCTIONS ---
+# bcrypt runs on the bounded process pool in password_pool.py; both raise PasswordPoolBusy when it is full.
 def hash_password(password: str) -> bytes:
-    salt = bcrypt.gensalt()
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed_password
+    return password_pool.hash_password(password)
 
 def verify_password(plain_password: str, hashed_password_db: bytes) -> bool:
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password_db)
+    return password_pool.verify_password(plain_password, hashed_password_db)
+
+def _rehash_password_if_needed(username: str, password: str, stored_hash: bytes) -> None:
+    """
+    Re-hashes a just-verified password when it was stored with a different bcrypt cost.
+    Best effort: the login has already succeeded, so failures are logged and ignored. The
+    condition keeps a concurrent password change from being overwritten with the old password.
+    """
+    if not password_pool.needs_rehash(stored_hash):
+        return
+    try:
+        users_table.update_item(
+            Key={'username': username},
+            UpdateExpression="SET hashed_password = :new",
+            ConditionExpression="hashed_password = :old",
+            ExpressionAttributeValues={':new': hash_password(password), ':old': stored_hash}
+        )
+        rehashed_total.inc()
+        logger_auth.info("Upgraded password hash for '%s' to bcrypt cost %s.", username, password_pool.rounds)
+    except PasswordPoolBusy:
+        logger_auth.info("Skipped password rehash for '%s': password pool busy.", username)
+    except ClientError as e:
+        logger_auth.warning(f"Password rehash for '{username}' not saved: {e.response['Error']['Message']}")
+
+def _transaction_cancel_codes(error: ClientError) -> List[str]:
+    """ Per-action CancellationReasons codes of a TransactionCanceledException, in request order. """
+    return [reason.get("Code", "None") for reason in error.response.get("CancellationReasons", [])]
 
+@storage_operation
 def register_user(username: str, password: str) -> dict:
     if not users_table or not todo_list_table: # Check both tables
         logger_auth.error("One or more DynamoDB tables not initialized during registration.")
         return {"success": False, "message": "Server error: Table initialization."}
-    try:
-        response = users_table.get_item(Key={'username': username})
-        if 'Item' in response:
-            logger_auth.warning(f"Username '{username}' already exists.")
-            return {"success": False, "message": "Username already exists."}
-    except ClientError as e:
-        logger_auth.error(f"Error checking username {username}: {e.response['Error']['Message']}")
-        return {"success": False, "message": "Error checking username."}
 
     hashed_pw = hash_password(password)
     new_user_id = str(uuid.uuid4())
@@ -62,28 +280,40 @@ def register_user(username: str, password: str) -> dict:
         'hashed_password': hashed_pw, # Boto3 handles Python bytes type correctly for Binary
         'createdAt': timestamp
     }
+    # ALSO, create a default PROFILE item for this new user
+    profile_data = {
+        "UserID": new_user_id,
+        "SK": "PROFILE",
+        "activeTabId": "main",
+        "tabOrder": ["main"], # List of tabIds
+        "tabs": [{"tabId": "main", "tabName": "Main"}], # List of tab objects for easy retrieval
+        "searchIndexStatus": "ready", # No tasks yet, so the search index is complete from the start
+        "createdAt": timestamp,
+        "updatedAt": timestamp
+    }
+    # One round trip: the username check and the PROFILE write succeed or fail together,
+    # so concurrent registrations cannot both claim a name and no user is left without a profile.
     try:
-        users_table.put_item(Item=user_data)
-        # ALSO, create a default PROFILE item for this new user
-        profile_data = {
-            "UserID": new_user_id,
-            "SK": "PROFILE",
-            "activeTabId": "main",
-            "tabOrder": ["main"], # List of tabIds
-            "tabs": [{"tabId": "main", "tabName": "Main"}], # List of tab objects for easy retrieval
-            "createdAt": timestamp,
-            "updatedAt": timestamp
-        }
-        todo_list_table.put_item(Item=profile_data)
-        logger.info(f"Default PROFILE created for user {new_user_id}")
-
-        logger_auth.info(f"User '{username}' registered successfully with UserID: {new_user_id}.")
-        return {"success": True, "message": "User registered successfully.", "userId": new_user_id, "username": username}
+        storage_backend.transact_write_items(TransactItems=[
+            {"Put": {
+                "TableName": USERS_TABLE_NAME, "Item": user_data,
+                "ConditionExpression": "attribute_not_exists(username)"
+            }},
+            {"Put": {"TableName": TODO_LIST_TABLE_NAME, "Item": profile_data}}
+        ], ClientRequestToken=str(uuid.uuid4())) # A resent attempt is applied once, not refused as a taken name
     except ClientError as e:
-        # Potentially roll back user creation if profile creation fails, or handle differently
+        if e.response['Error']['Code'] == 'TransactionCanceledException' and _transaction_cancel_codes(e)[:1] == ['ConditionalCheckFailed']:
+            logger_auth.warning(f"Username '{username}' already exists.")
+            return {"success": False, "message": "Username already exists."}
         logger_auth.error(f"Error registering user {username} or creating profile: {e.response['Error']['Message']}")
         return {"success": False, "message": "Error registering user."}
 
+    profile_cache.put(new_user_id, profile_data)
+    logger.info("Default PROFILE created for user %s", new_user_id)
+    logger_auth.info("User '%s' registered successfully with UserID: %s.", username, new_user_id)
+    return {"success": True, "message": "User registered successfully.", "userId": new_user_id, "username": username}
+
+@storage_operation
 def login_user(username: str, password: str) -> dict:
     if not users_table:
         logger_auth.error("Users table not initialized.")
@@ -95,17 +325,12 @@ def login_user(username: str, password: str) -> dict:
             return {"success": False, "message": "Invalid username or password."}
 
         user_item = response['Item']
-        logger_auth.info(f"User item retrieved for {username}: {user_item}") # Log the whole item
 
         if 'hashed_password' not in user_item or not user_item.get('hashed_password'):
             logger_auth.error(f"Missing or empty hashed_password for username: {username}")
             return {"success": False, "message": "Authentication data error."}
 
         stored_hashed_password_raw = user_item['hashed_password']
-        
-        # --- ADD DETAILED LOGGING HERE ---
-        logger_auth.info(f"Type of stored_hashed_password_raw for {username}: {type(stored_hashed_password_raw)}")
-        logger_auth.info(f"Value of stored_hashed_password_raw for {username}: {stored_hashed_password_raw!r}") # !r shows representation
 
         # Boto3 resource should deserialize Binary (B) to `bytes`.
         # If it's already bytes, this 'if' block is fine.
@@ -115,23 +340,25 @@ def login_user(username: str, password: str) -> dict:
         final_hashed_password_bytes = None
         if isinstance(stored_hashed_password_raw, bytes):
             final_hashed_password_bytes = stored_hashed_password_raw
-            logger_auth.info(f"hashed_password for {username} is already BYTES.")
         elif hasattr(stored_hashed_password_raw, 'value') and isinstance(stored_hashed_password_raw.value, bytes):
             # This case is for when using the low-level Boto3 client, which returns a Binary object
             # The Resource API (which you are using with Table()) should directly return bytes.
             final_hashed_password_bytes = stored_hashed_password_raw.value
-            logger_auth.info(f"hashed_password for {username} was a Binary object, extracted .value as BYTES.")
+            logger_auth.debug("hashed_password for %s was a Binary object, extracted .value as BYTES.", username)
         else:
              logger_auth.error(f"hashed_password for {username} is NOT in expected bytes format. Actual type: {type(stored_hashed_password_raw)}")
              return {"success": False, "message": "Authentication data format error."}
 
         if verify_password(password, final_hashed_password_bytes):
-            logger_auth.info(f"User '{username}' logged in successfully.")
+            logger_auth.info("User '%s' logged in successfully.", username)
+            _rehash_password_if_needed(username, password, final_hashed_password_bytes)
             return {"success": True, "message": "Login successful.", "userId": user_item['UserID'], "username": user_item['username']}
         else:
             logger_auth.warning(f"Failed login attempt for username: {username}")
             return {"success": False, "message": "Invalid username or password."}
     # ... (rest of your except blocks) ...
+    except PasswordPoolBusy:
+        raise # Surfaced to the API as 503 + Retry-After
     except ClientError as e:
         logger_auth.error(f"ClientError during login for {username}: {e.response['Error']['Message']}")
         return {"success": False, "message": "Error during login (ClientError)."}
@@ -141,25 +368,46 @@ def login_user(username: str, password: str) -> dict:
         logger_auth.error(traceback.format_exc()) # Log full traceback for unexpected errors
         return {"success": False, "message": "An unexpected error occurred."}
 
-def get_user_profile(user_id: str) -> Optional[Dict[str, Any]]:
-    """Fetches the user's PROFILE item from todo_list_table."""
+@storage_operation
+def get_user_profile(user_id: str, use_cache: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Fetches the user's PROFILE item from todo_list_table, serving it from the profile cache when possible.
+    Pass use_cache=False for a strongly consistent read before a read-modify-write.
+    """
     if not todo_list_table:
         logger.error("Todo list table (for profile) not initialized.")
         return None
+    if use_cache:
+        cached_profile = profile_cache.get(user_id)
+        if cached_profile is not None:
+            return cached_profile
     try:
-        response = todo_list_table.get_item(Key={'UserID': user_id, 'SK': 'PROFILE'})
-        return response.get('Item')
+        response = todo_list_table.get_item(Key={'UserID': user_id, 'SK': 'PROFILE'}, ConsistentRead=not use_cache)
+        profile = response.get('Item')
+        profile_cache.put(user_id, profile)
+        return profile
     except ClientError as e:
         logger.error(f"Error fetching profile for user {user_id}: {e.response['Error']['Message']}")
         return None
 
+@storage_operation
 def get_user_tabs(user_id: str) -> List[Dict[str, str]]:
     """ Fetches tabs for a user from their PROFILE item. """
     if not todo_list_table:
         logger.error("Todo list table not initialized. Cannot get tabs.")
         return [{"tabId": "main", "tabName": "Main"}]
+    return _tabs_from_profile(user_id, get_user_profile(user_id))
 
+@storage_operation
+def get_user_tabs_with_version(user_id: str) -> Tuple[List[Dict[str, str]], int]:
+    """ Like get_user_tabs, plus the PROFILE version the tabs were read at (for ETags). """
+    if not todo_list_table:
+        return get_user_tabs(user_id), 0
     profile = get_user_profile(user_id)
+    return _tabs_from_profile(user_id, profile), get_profile_version(profile)
+
+def _tabs_from_profile(user_id: str, profile: Optional[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """ Returns the ordered tab list of an already-fetched PROFILE, creating a default PROFILE if it is missing. """
     if profile and 'tabs' in profile and isinstance(profile['tabs'], list):
         # Ensure 'main' tab is correctly represented if it exists in the list
         tabs_list = profile['tabs']
@@ -176,7 +424,7 @@ def get_user_tabs(user_id: str) -> List[Dict[str, str]]:
             ordered_tabs.extend(tab_map.values()) # Add any remaining tabs not in order
             tabs_list = ordered_tabs
 
-        logger.info(f"Fetched {len(tabs_list)} tabs for user {user_id} from profile.")
+        logger.info("Fetched %s tabs for user %s from profile.", len(tabs_list), user_id)
         return tabs_list
     else:
         logger.warning(f"No 'tabs' array in profile for user {user_id} or profile missing. Returning default.")
@@ -190,13 +438,41 @@ def get_user_tabs(user_id: str) -> List[Dict[str, str]]:
             }
             try:
                 todo_list_table.put_item(Item=default_profile_data)
-                logger.info(f"Created missing default PROFILE for user {user_id} during get_user_tabs.")
+                profile_cache.put(user_id, default_profile_data)
+                logger.info("Created missing default PROFILE for user %s during get_user_tabs.", user_id)
                 return default_profile_data["tabs"]
             except ClientError as e_profile:
                 logger.error(f"Failed to create missing default PROFILE for user {user_id}: {e_profile.response['Error']['Message']}")
         return [{"tabId": "main", "tabName": "Main"}]
 
 
+@storage_operation
+def get_user_bootstrap(user_id: str, task_limit: int, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Gathers everything the front end needs on page load from one PROFILE read and one task
+    query: ordered tabs, the active tab id and the first page of the active tab's tasks (only
+    `fields` of each, if given), plus a sync token for /api/sync taken before the snapshot is read.
+    """
+    try:
+        sync_token = get_sync_token(user_id)
+    except ClientError as e:
+        logger.error(f"Error fetching sync token for user {user_id}: {e.response['Error']['Message']}")
+        sync_token = None
+    profile = get_user_profile(user_id) if todo_list_table else None
+    tabs = _tabs_from_profile(user_id, profile) if todo_list_table else [{"tabId": "main", "tabName": "Main"}]
+    active_tab_id = active_tab_writes.pending(user_id) or (profile or {}).get('activeTabId', 'main')
+    if not any(t.get('tabId') == active_tab_id for t in tabs):
+        active_tab_id = 'main'
+    try:
+        tasks, next_cursor = query_tasks_page(user_id, active_tab_id, task_limit, fields=fields)
+    except ClientError as e:
+        logger.error(f"Error fetching bootstrap tasks for user {user_id} in tab {active_tab_id}: {e.response['Error']['Message']}")
+        tasks, next_cursor = [], None
+    logger.info("Bootstrap for user %s: %s tabs, %s tasks in active tab %s", user_id, len(tabs), len(tasks), active_tab_id)
+    return {"tabs": tabs, "activeTabId": active_tab_id, "tasks": tasks, "nextCursor": next_cursor, "syncToken": sync_token}
+
+
+@storage_operation
 def add_user_tab(user_id: str, tab_name: str) -> Optional[Dict[str, Any]]: # Changed return type hint
     if not todo_list_table:
         logger.error("Todo list table not initialized. Cannot add tab.")
@@ -211,41 +487,47 @@ def add_user_tab(user_id: str, tab_name: str) -> Optional[Dict[str, Any]]: # Cha
     new_tab_object = {"tabId": sanitized_tab_id, "tabName": tab_name.strip()}
 
     try:
-        # Atomically add to the 'tabs' list and 'tabOrder' list in the PROFILE item.
-        response = todo_list_table.update_item(
-            Key={'UserID': user_id, 'SK': 'PROFILE'},
-            UpdateExpression="SET #tabs_attr = list_append(if_not_exists(#tabs_attr, :empty_list), :new_tab_val_list), "
-                             "#tabOrder_attr = list_append(if_not_exists(#tabOrder_attr, :empty_list_order), :new_tab_id_list), "
-                             "#updatedAt = :ts",
-            ExpressionAttributeNames={
-                '#tabs_attr': 'tabs', # Use different placeholder if 'tabs' is a reserved word (it's not)
-                '#tabOrder_attr': 'tabOrder',
-                '#updatedAt': 'updatedAt'
-            },
-            ConditionExpression="attribute_exists(SK) AND SK = :profile_sk_val AND NOT contains(#tabOrder_attr, :check_tab_id_val)",
-            ExpressionAttributeValues={ # Need to redefine EAV for ConditionExpression if placeholders are shared
-                ':new_tab_val_list': [new_tab_object],
-                ':new_tab_id_list': [sanitized_tab_id],
-                ':empty_list': [],
-                ':empty_list_order': [],
-                ':ts': timestamp,
-                ':check_tab_id_val': sanitized_tab_id,
-                ':profile_sk_val': "PROFILE" # Value for SK check in condition
-            },
-            ReturnValues="UPDATED_NEW"
-        )
-        logger.info(f"Tab '{tab_name}' (id: {sanitized_tab_id}) added to profile for user {user_id}.")
+        with _change_for_write(user_id) as change:
+            # Atomically add to the 'tabs' list and 'tabOrder' list in the PROFILE item.
+            response = todo_list_table.update_item(
+                Key={'UserID': user_id, 'SK': 'PROFILE'},
+                UpdateExpression="SET #tabs_attr = list_append(if_not_exists(#tabs_attr, :empty_list), :new_tab_val_list), "
+                                 "#tabOrder_attr = list_append(if_not_exists(#tabOrder_attr, :empty_list_order), :new_tab_id_list), "
+                                 "#updatedAt = :ts ADD #version :one",
+                ExpressionAttributeNames={
+                    '#tabs_attr': 'tabs', # Use different placeholder if 'tabs' is a reserved word (it's not)
+                    '#tabOrder_attr': 'tabOrder',
+                    '#updatedAt': 'updatedAt',
+                    '#version': 'version'
+                },
+                ConditionExpression="attribute_exists(SK) AND SK = :profile_sk_val AND NOT contains(#tabOrder_attr, :check_tab_id_val)",
+                ExpressionAttributeValues={ # Need to redefine EAV for ConditionExpression if placeholders are shared
+                    ':new_tab_val_list': [new_tab_object],
+                    ':new_tab_id_list': [sanitized_tab_id],
+                    ':empty_list': [],
+                    ':empty_list_order': [],
+                    ':ts': timestamp,
+                    ':check_tab_id_val': sanitized_tab_id,
+                    ':profile_sk_val': "PROFILE", # Value for SK check in condition
+                    ':one': 1
+                },
+                ReturnValues="ALL_NEW"
+            )
+        profile_cache.put(user_id, response.get('Attributes'))
+        _record_change(user_id, change, "profile")
+        _publish_change(user_id, profile=response.get('Attributes'))
+        logger.info("Tab '%s' (id: %s) added to profile for user %s.", tab_name, sanitized_tab_id, user_id)
         # Return the object that was added to the list, which is new_tab_object
         return new_tab_object
     except ClientError as e:
         if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
             logger.warning(f"Conditional check failed for add_user_tab. Tab '{tab_name}' (id: {sanitized_tab_id}) might already exist or PROFILE missing for user {user_id}.")
-            # Attempt to fetch the profile to see if the tab is indeed there
-            profile = get_user_profile(user_id)
+            # Attempt to fetch the profile to see if the tab is indeed there (bypassing a possibly stale cache entry)
+            profile = get_user_profile(user_id, use_cache=False)
             if profile and 'tabs' in profile: # Check if profile and 'tabs' attribute exist
                 existing_tab = next((t for t in profile.get('tabs', []) if t.get('tabId') == sanitized_tab_id), None)
                 if existing_tab:
-                    logger.info(f"Tab '{sanitized_tab_id}' confirmed to exist for user {user_id}. Returning existing tab.")
+                    logger.info("Tab '%s' confirmed to exist for user %s. Returning existing tab.", sanitized_tab_id, user_id)
                     return existing_tab # Return the existing tab object
                 else:
                     logger.error(f"Tab '{sanitized_tab_id}' not found in profile despite conditional check fail for user {user_id}. This is unexpected.")
@@ -266,6 +548,208 @@ def add_user_tab(user_id: str, tab_name: str) -> Optional[Dict[str, Any]]: # Cha
         logger.error(traceback.format_exc())
         return {"success": False, "message": "Unexpected server error adding tab."}
 
+@storage_operation
+def remove_tab_from_profile(user_id: str, tab_id_to_delete: str) -> bool:
+    """
+    Removes a tab from the PROFILE's 'tabs' and 'tabOrder' lists (resetting activeTabId if needed)
+    with index-targeted REMOVEs, so a concurrent tab change is retried rather than overwritten.
+    Tasks are untouched.
+    """
+    if not todo_list_table:
+        logger.error("Todo list table not initialized.")
+        return False
+
+    def removal(profile: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        tab_index = next((i for i, t in enumerate(profile.get('tabs', [])) if t.get('tabId') == tab_id_to_delete), None)
+        order_index = next((i for i, tid in enumerate(profile.get('tabOrder', [])) if tid == tab_id_to_delete), None)
+        if tab_index is None and order_index is None:
+            return None # Already gone
+        removes = ([f"#tabs[{tab_index}]"] if tab_index is not None else []) + ([f"#tabOrder[{order_index}]"] if order_index is not None else [])
+        update: Dict[str, Any] = {
+            "UpdateExpression": f"SET #updatedAt = :ts REMOVE {', '.join(removes)}",
+            "ExpressionAttributeNames": {'#tabs': 'tabs', '#tabOrder': 'tabOrder', '#updatedAt': 'updatedAt'},
+            "ExpressionAttributeValues": {':ts': datetime.now().isoformat()}
+        }
+        if profile.get('activeTabId') == tab_id_to_delete: # If active tab was the one deleted, reset to 'main'
+            update["UpdateExpression"] = update["UpdateExpression"].replace("SET ", "SET #activeTab = :main, ", 1)
+            update["ConditionExpression"] = "#activeTab = :deleted" # The active tab is not versioned
+            update["ExpressionAttributeNames"]['#activeTab'] = 'activeTabId'
+            update["ExpressionAttributeValues"].update({':main': 'main', ':deleted': tab_id_to_delete})
+        return update
+
+    active_tab_writes.discard(user_id, tab_id_to_delete) # Stop serving it as pending here; write_active_tab_preference's condition stops any write
+    try:
+        _update_tab_list(user_id, removal)
+        logger.info("Tab '%s' removed from profile for user %s.", tab_id_to_delete, user_id)
+        return True
+    except ClientError as e:
+        logger.error(f"Error removing tab '{tab_id_to_delete}' from profile for user {user_id}: {e.response['Error']['Message']}")
+        return False
+
+@storage_operation
+def reorder_user_tabs(user_id: str, tab_order: List[str]) -> Optional[List[Dict[str, str]]]:
+    """
+    Puts the user's tabs in the order of `tab_order`. Ids of tabs that no longer exist are ignored,
+    and tabs missing from `tab_order` (e.g. just added on another device) keep their relative order
+    after the listed ones, so a concurrent change is never undone. Only the 'tabOrder' positions
+    that move are written. Returns the ordered tab list, or None without a PROFILE. Raises ClientError.
+    """
+    if not todo_list_table: return None
+
+    def reorder(profile: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        current = list(profile.get('tabOrder', []))
+        current += [t['tabId'] for t in profile.get('tabs', []) if t.get('tabId') not in current] # Tabs never placed in tabOrder
+        listed = [tab_id for tab_id in dict.fromkeys(tab_order) if tab_id in current]
+        desired = listed + [tab_id for tab_id in current if tab_id not in listed]
+        stored = profile.get('tabOrder', [])
+        if desired == stored:
+            return None
+        names = {'#tabOrder': 'tabOrder', '#updatedAt': 'updatedAt'}
+        values: Dict[str, Any] = {':ts': datetime.now().isoformat()}
+        if len(desired) == len(stored):
+            moved = [i for i, (old, new) in enumerate(zip(stored, desired)) if old != new]
+            assignments = [f"#tabOrder[{i}] = :tab{i}" for i in moved]
+            values.update({f":tab{i}": desired[i] for i in moved})
+        else:
+            assignments = ["#tabOrder = :order"]
+            values[':order'] = desired
+        return {"UpdateExpression": f"SET {', '.join(assignments)}, #updatedAt = :ts",
+                "ExpressionAttributeNames": names, "ExpressionAttributeValues": values}
+
+    profile = _update_tab_list(user_id, reorder)
+    if profile is None:
+        return None
+    logger.info("Reordered tabs for user %s.", user_id)
+    return _tabs_from_profile(user_id, profile)
+
+def _update_tab_list(user_id: str, plan: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """
+    Optimistic read-modify-write of the PROFILE's tab list. `plan` gets a strongly consistent read
+    of the PROFILE and returns update_item arguments for the change (None if there is nothing to
+    do). The update also bumps 'version' and only applies if 'version' is still the one read;
+    otherwise the PROFILE is read again and the change re-planned, up to TAB_UPDATE_MAX_ATTEMPTS
+    times. Returns the PROFILE after the change (None if it is missing); raises ClientError, with
+    code 'TabListConflict' when every attempt lost a race.
+    """
+    change = None
+    try:
+        for attempt in range(TAB_UPDATE_MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(TAB_UPDATE_BASE_BACKOFF_SECONDS * (2 ** (attempt - 1)) * (0.5 + random.random()))
+            profile = get_user_profile(user_id, use_cache=False)
+            if not profile:
+                return None
+            update = plan(profile)
+            if update is None:
+                return profile
+            names, values = update["ExpressionAttributeNames"], update["ExpressionAttributeValues"]
+            names['#version'] = 'version'
+            values[':one'] = 1
+            if 'version' in profile:
+                version_condition = "#version = :expectedVersion"
+                values[':expectedVersion'] = profile['version']
+            else:
+                version_condition = "attribute_not_exists(#version)" # Written before tab lists were versioned
+            condition = update.get("ConditionExpression")
+            if change is None:
+                change = _next_change_seq(user_id)
+            try:
+                response = todo_list_table.update_item(
+                    Key={'UserID': user_id, 'SK': 'PROFILE'},
+                    UpdateExpression=update["UpdateExpression"] + " ADD #version :one",
+                    ConditionExpression=f"{version_condition} AND {condition}" if condition else version_condition,
+                    ExpressionAttributeNames=names, ExpressionAttributeValues=values, ReturnValues="ALL_NEW"
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                tab_list_conflicts_total.inc()
+                continue
+            profile = response.get('Attributes')
+            profile_cache.put(user_id, profile)
+            _record_change(user_id, change, "profile")
+            change = None # Recorded
+            _publish_change(user_id, profile=profile)
+            return profile
+        logger.warning(f"Tab list of user {user_id} kept changing; gave up after {TAB_UPDATE_MAX_ATTEMPTS} attempts.")
+        raise ClientError({"Error": {"Code": "TabListConflict", "Message": "Tab list changed concurrently; retry limit reached"}}, "UpdateItem")
+    finally:
+        if change is not None:
+            _release_change(user_id, change) # Reserved, but no attempt was applied
+
+@storage_operation
+def count_tab_tasks(user_id: str, tab_id: str, up_to: int) -> int:
+    """ Counts a tab's tasks, stopping after `up_to` + 1 so the cost stays bounded for huge tabs. """
+    if not todo_list_table: return 0
+    response = todo_list_table.query(
+        KeyConditionExpression=Key("UserID").eq(user_id) & Key("SK").begins_with(f"TASK#{tab_id}#"),
+        Select="COUNT", Limit=up_to + 1
+    )
+    return response.get("Count", 0)
+
+@storage_operation
+def delete_tab_tasks(user_id: str, tab_id: str, on_progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Deletes every TASK#<tab_id># item, following LastEvaluatedKey across query pages.
+    Keys are fetched with a projection of the key, status and searchable text, and deleted in
+    25-item BatchWriteItem chunks spread over a bounded thread pool, each followed by the deletion
+    of its tasks' search postings. on_progress(deleted_so_far) is called after each chunk. Returns the number of tasks deleted; raises ClientError on failure.
+    """
+    if not todo_list_table: return 0
+    change = _next_change_seq(user_id)
+    deleted = deleted_completed = 0
+    lock = threading.Lock()
+
+    def delete_chunk(items: List[Dict[str, Any]]) -> None:
+        nonlocal deleted, deleted_completed
+        requests = [{"DeleteRequest": {"Key": {"UserID": user_id, "SK": item["SK"]}}} for item in items]
+        unprocessed = _batch_write_chunk(requests)
+        if unprocessed:
+            raise ClientError({"Error": {"Code": "UnprocessedItems", "Message": f"{len(unprocessed)} deletes left unprocessed"}}, "BatchWriteItem")
+        _update_search_index(user_id, [(item, None) for item in items])
+        with lock: # Reported under the lock so progress never goes backwards
+            deleted += len(items)
+            deleted_completed += sum(1 for item in items if item.get("completed"))
+            if on_progress:
+                on_progress(deleted)
+
+    try:
+        _delete_tab_task_pages(user_id, tab_id, delete_chunk)
+    finally:
+        if deleted:
+            meta = _bump_tab_meta(user_id, tab_id, -deleted, -deleted_completed)
+            _record_change(user_id, change, "tab", tab_id)
+            _publish_change(user_id, reload_tabs=[tab_id], counts=_tab_counts_event(tab_id, meta))
+        else:
+            _release_change(user_id, change)
+    logger.info("Deleted %s tasks for tab '%s' for user %s.", deleted, tab_id, user_id)
+    return deleted
+
+def _delete_tab_task_pages(user_id: str, tab_id: str, delete_chunk: Callable[[List[Dict[str, Any]]], None]) -> None:
+    """ Pages through a tab's tasks (key, 'completed' and search posting inputs) and runs delete_chunk on 25-item slices in a bounded thread pool. """
+    with ThreadPoolExecutor(max_workers=TAB_DELETE_MAX_WORKERS) as pool:
+        in_flight: set = set()
+        query_kwargs: Dict[str, Any] = {
+            "KeyConditionExpression": Key("UserID").eq(user_id) & Key("SK").begins_with(f"TASK#{tab_id}#"),
+            "ProjectionExpression": "SK, #completed, #text, #description, createdAt", # What the task's search postings are derived from
+            "ExpressionAttributeNames": {"#completed": "completed", "#text": "text", "#description": "description"}
+        }
+        while True:
+            response = todo_list_table.query(**query_kwargs)
+            items = response.get("Items", [])
+            for i in range(0, len(items), BATCH_WRITE_CHUNK_SIZE):
+                # Keep at most two chunks per worker queued so memory stays bounded on huge tabs.
+                if len(in_flight) >= TAB_DELETE_MAX_WORKERS * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done: future.result()
+                in_flight.add(pool.submit(contextvars.copy_context().run, delete_chunk, items[i:i + BATCH_WRITE_CHUNK_SIZE]))
+            if "LastEvaluatedKey" not in response:
+                break
+            query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        for future in in_flight:
+            future.result()
+
+@storage_operation
 def delete_user_tab_and_tasks(user_id: str, tab_id_to_delete: str) -> bool:
     if not todo_list_table:
         logger.error("Todo list table not initialized.")
@@ -274,140 +758,713 @@ def delete_user_tab_and_tasks(user_id: str, tab_id_to_delete: str) -> bool:
         logger.warning(f"Attempt to delete 'main' tab by user {user_id} denied.")
         return False
 
+    # 1. Update the PROFILE first so the tab disappears from get_user_tabs immediately
+    if not remove_tab_from_profile(user_id, tab_id_to_delete):
+        return False
+    # 2. Delete all tasks associated with this tab for the user
     try:
-        # 1. Delete all tasks associated with this tab for the user
-        tasks_to_delete_response = todo_list_table.query(
-            KeyConditionExpression=Key("UserID").eq(user_id) & Key("SK").begins_with(f"TASK#{tab_id_to_delete}#")
-        )
-        tasks_to_delete = tasks_to_delete_response.get("Items", [])
-        if tasks_to_delete:
-            with todo_list_table.batch_writer() as batch:
-                for task in tasks_to_delete:
-                    batch.delete_item(Key={"UserID": user_id, "SK": task["SK"]})
-            logger.info(f"Deleted {len(tasks_to_delete)} tasks for tab '{tab_id_to_delete}' for user {user_id}.")
-
-        # 2. Update the PROFILE item: remove from 'tabs' list and 'tabOrder' list
-        profile = get_user_profile(user_id)
-        if not profile:
-            logger.warning(f"No profile found for user {user_id} during tab deletion. Tasks may have been deleted if any.")
-            return True # Tasks are deleted, but profile couldn't be updated
-
-        updated_tabs_list = [t for t in profile.get('tabs', []) if t.get('tabId') != tab_id_to_delete]
-        updated_tab_order = [tid for tid in profile.get('tabOrder', []) if tid != tab_id_to_delete]
-        
-        # If active tab was the one deleted, reset to 'main'
-        new_active_tab_id = profile.get('activeTabId', 'main')
-        if new_active_tab_id == tab_id_to_delete:
-            new_active_tab_id = 'main'
-
-        timestamp = datetime.now().isoformat()
-        todo_list_table.update_item(
-            Key={'UserID': user_id, 'SK': 'PROFILE'},
-            UpdateExpression="SET #tabs = :tabs_val, #tabOrder = :order_val, #activeTab = :active_val, #updatedAt = :ts",
-            ExpressionAttributeNames={
-                '#tabs': 'tabs',
-                '#tabOrder': 'tabOrder',
-                '#activeTab': 'activeTabId',
-                '#updatedAt': 'updatedAt'
-            },
-            ExpressionAttributeValues={
-                ':tabs_val': updated_tabs_list,
-                ':order_val': updated_tab_order,
-                ':active_val': new_active_tab_id,
-                ':ts': timestamp
-            }
-        )
-        logger.info(f"Tab '{tab_id_to_delete}' removed from profile for user {user_id}.")
+        delete_tab_tasks(user_id, tab_id_to_delete)
         return True
     except ClientError as e:
-        logger.error(f"Error deleting tab '{tab_id_to_delete}' for user {user_id}: {e.response['Error']['Message']}")
+        logger.error(f"Error deleting tasks of tab '{tab_id_to_delete}' for user {user_id}: {e.response['Error']['Message']}")
         return False
 
+@storage_operation
 def get_user_active_tab_preference(user_id: str) -> str:
-    """Fetches the user's active tab preference from their PROFILE item."""
+    """Fetches the user's active tab preference: the value waiting to be written, else the one in their PROFILE item."""
+    pending = active_tab_writes.pending(user_id)
+    if pending is not None:
+        return pending
     profile = get_user_profile(user_id)
     if profile and 'activeTabId' in profile:
-        logger.info(f"Retrieved activeTabId '{profile['activeTabId']}' for user {user_id}")
+        logger.info("Retrieved activeTabId '%s' for user %s", profile['activeTabId'], user_id)
         return profile['activeTabId']
-    logger.info(f"No activeTabId preference found for user {user_id}, defaulting to 'main'.")
+    logger.info("No activeTabId preference found for user %s, defaulting to 'main'.", user_id)
     return "main" # Default
 
+@storage_operation
 def set_user_active_tab_preference(user_id: str, active_tab_id: str) -> bool:
-    """Sets the user's active tab preference in their PROFILE item."""
+    """
+    Sets the user's active tab preference. The write is buffered (see the write-behind note above
+    active_tab_writes), so a burst of tab switches becomes one PROFILE update.
+    """
     if not todo_list_table:
         logger.error("Todo list table not initialized. Cannot set active tab preference.")
         return False
+    active_tab_writes.put(user_id, active_tab_id)
+    return True
+
+@storage_operation
+def write_active_tab_preference(user_id: str, active_tab_id: str) -> bool:
+    """
+    Stores the active tab preference in the PROFILE item. Called by active_tab_writes when it flushes.
+    Only applies while the tab is still in 'tabOrder', so a switch buffered here or in another worker
+    never lands after the tab is deleted; such a value is dropped (True, so the buffer does not retry it).
+    """
+    update: Dict[str, Any] = {
+        "Key": {'UserID': user_id, 'SK': 'PROFILE'},
+        "UpdateExpression": "SET #activeTab = :val, #updatedAt = :ts",
+        "ExpressionAttributeNames": {
+            '#activeTab': 'activeTabId',
+            '#updatedAt': 'updatedAt'
+        },
+        "ExpressionAttributeValues": {
+            ':val': active_tab_id,
+            ':ts': datetime.now().isoformat()
+        },
+        # This will create/update the PROFILE item implicitly if UserID is PK and SK='PROFILE'
+        "ReturnValues": "ALL_NEW"
+    }
+    if active_tab_id != "main": # 'main' cannot be deleted
+        update["ConditionExpression"] = "contains(#tabOrder, :val)"
+        update["ExpressionAttributeNames"]['#tabOrder'] = 'tabOrder'
     try:
-        timestamp = datetime.now().isoformat()
-        todo_list_table.update_item(
-            Key={'UserID': user_id, 'SK': 'PROFILE'},
-            UpdateExpression="SET #activeTab = :val, #updatedAt = :ts",
-            ExpressionAttributeNames={
-                '#activeTab': 'activeTabId',
-                '#updatedAt': 'updatedAt'
-            },
-            ExpressionAttributeValues={
-                ':val': active_tab_id,
-                ':ts': timestamp
-            }
-            # This will create/update the PROFILE item implicitly if UserID is PK and SK='PROFILE'
-        )
-        logger.info(f"Set activeTabId to '{active_tab_id}' for user {user_id}")
+        with _change_for_write(user_id) as change:
+            response = todo_list_table.update_item(**update)
+        profile_cache.put(user_id, response.get('Attributes'))
+        _record_change(user_id, change, "profile")
+        _publish_change(user_id, profile=response.get('Attributes'))
+        logger.info("Set activeTabId to '%s' for user %s", active_tab_id, user_id)
         return True
     except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            logger.info("Dropped activeTabId '%s' for user %s: the tab no longer exists", active_tab_id, user_id)
+            return True
         logger.error(f"Error setting active tab preference for user {user_id}: {e.response['Error']['Message']}")
         return False
 
+# Active tab preferences are written behind: every tab click used to update the hot PROFILE item.
+# The buffer keeps the latest value per user and writes it after at most ACTIVE_TAB_FLUSH_SECONDS
+# (and when the process exits); reads of the preference see the pending value first.
+active_tab_writes = WriteBehindBuffer("active_tab", write_active_tab_preference, ACTIVE_TAB_FLUSH_SECONDS)
 
-# --- TASK CRUD OPERATIONS (using todo_list_table) ---
-def add_task(user_id: str, tab_id: str, task_text: str, task_description: str) -> Optional[Dict[str, Any]]:
-    if not todo_list_table:
-        logger.error("Todo list table not initialized. Cannot add task.")
+def flush_pending_writes() -> None:
+    """ Writes buffered preferences now (gunicorn's worker_exit hook calls this). """
+    active_tab_writes.flush()
+
+
+# --- VERSIONS (for ETags) AND TASK COUNTERS ---
+# The PROFILE item carries a 'version' counter, bumped by every tab-list change. Each tab has a
+# TABMETA#<tab_id> item whose 'version' is bumped after every write to the tab's tasks. Bumping
+# after the write means a reader can pair new content with an old version (and simply re-fetch
+# later), but never old content with a new version. The TABMETA item is kept when a tab is
+# deleted, so a tab re-created under the same id never reuses an earlier version.
+#
+# The same update keeps the tab's 'taskCount' and 'completedCount' with atomic ADDs of the
+# write's deltas, so progress can be shown without reading any tasks. Tabs written before the
+# counters existed have no 'countsInitialized' flag; get_tab_counts recounts those once, with a
+# write conditioned on the version it counted at. A counter update that fails after its task write
+# removes the flag (and bumps the version), so those counters are recounted the same way.
+def _tab_meta_key(user_id: str, tab_id: str) -> Dict[str, str]:
+    return {"UserID": user_id, "SK": f"TABMETA#{tab_id}"}
+
+def get_profile_version(profile: Optional[Dict[str, Any]]) -> int:
+    return int((profile or {}).get("version", 0))
+
+@storage_operation
+def get_tab_version(user_id: str, tab_id: str) -> int:
+    """ Strongly consistent read of a tab's task version (0 if the tab has never been written). """
+    response = todo_list_table.get_item(
+        Key=_tab_meta_key(user_id, tab_id), ProjectionExpression="#version",
+        ExpressionAttributeNames={"#version": "version"}, ConsistentRead=True
+    )
+    return int(response.get("Item", {}).get("version", 0))
+
+def _count_delta(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> Tuple[int, int]:
+    """ (taskCount delta, completedCount delta) for a task going from `old` to `new`; None means absent. """
+    return (int(new is not None) - int(old is not None),
+            int(bool(new and new.get("completed"))) - int(bool(old and old.get("completed"))))
+
+def _tab_meta_update_kwargs(user_id: str, tab_id: str, task_delta: int, completed_delta: int) -> Dict[str, Any]:
+    return {
+        "Key": _tab_meta_key(user_id, tab_id),
+        "UpdateExpression": "SET #tabId = :tab, #updatedAt = :ts ADD #version :one, #taskCount :taskDelta, #completedCount :completedDelta",
+        "ExpressionAttributeNames": {"#tabId": "tabId", "#updatedAt": "updatedAt", "#version": "version",
+                                     "#taskCount": "taskCount", "#completedCount": "completedCount"},
+        "ExpressionAttributeValues": {":tab": tab_id, ":ts": datetime.now().isoformat(), ":one": 1,
+                                      ":taskDelta": task_delta, ":completedDelta": completed_delta}
+    }
+
+@storage_operation
+def bump_tab_version(user_id: str, tab_id: str, task_delta: int = 0, completed_delta: int = 0) -> Optional[int]:
+    """
+    Increments a tab's task version and adds the deltas to its task counters (or, if that fails,
+    marks them for a recount). Returns the new version, or None if no update succeeded.
+    """
+    meta = _bump_tab_meta(user_id, tab_id, task_delta, completed_delta)
+    return int(meta["version"]) if meta is not None else None
+
+def _bump_tab_meta(user_id: str, tab_id: str, task_delta: int = 0, completed_delta: int = 0) -> Optional[Dict[str, Any]]:
+    """
+    bump_tab_version, returning the updated TABMETA item (None on failure) so its counters can be published.
+    The task write has already happened, so if the deltas cannot be added the counters are marked
+    for a recount instead (see _invalidate_tab_counts).
+    """
+    try:
+        response = todo_list_table.update_item(
+            ReturnValues="ALL_NEW", **_tab_meta_update_kwargs(user_id, tab_id, task_delta, completed_delta)
+        )
+        return response["Attributes"]
+    except ClientError as e:
+        logger.error(f"Error bumping version of tab '{tab_id}' for user {user_id}: {e.response['Error']['Message']}")
+        return _invalidate_tab_counts(user_id, tab_id)
+    except BotoCoreError as e: # Lost response: the ADD may or may not have applied, and is not resent (see storage_resilience.py)
+        logger.error(f"Error bumping version of tab '{tab_id}' for user {user_id}: {e}")
+        return _invalidate_tab_counts(user_id, tab_id)
+
+def _invalidate_tab_counts(user_id: str, tab_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Removes a tab's 'countsInitialized' flag and bumps its version, so the next get_tab_counts
+    recounts it and cached ETags are not reused. Returns the TABMETA item, or None if this failed too.
+    """
+    try:
+        response = todo_list_table.update_item(
+            Key=_tab_meta_key(user_id, tab_id),
+            UpdateExpression="SET #tabId = :tab, #updatedAt = :ts ADD #version :one REMOVE #countsInitialized",
+            ExpressionAttributeNames={"#tabId": "tabId", "#updatedAt": "updatedAt", "#version": "version",
+                                      "#countsInitialized": "countsInitialized"},
+            ExpressionAttributeValues={":tab": tab_id, ":ts": datetime.now().isoformat(), ":one": 1},
+            ReturnValues="ALL_NEW"
+        )
+        logger.warning(f"Task counters of tab '{tab_id}' for user {user_id} marked for a recount after a failed update.")
+        return response["Attributes"]
+    except (ClientError, BotoCoreError) as e:
+        logger.error(f"Error invalidating task counters of tab '{tab_id}' for user {user_id}; they may stay wrong: {e}")
         return None
+
+def _recount_tab(user_id: str, tab_id: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Counts a tab's tasks and stores the counters, conditioned on the TABMETA version being the one
+    read before counting. Retries if a write lands meanwhile. Returns the TABMETA attributes.
+    """
+    for _ in range(TAB_RECOUNT_MAX_ATTEMPTS):
+        version = meta.get("version")
+        task_count = completed_count = 0
+        query_kwargs: Dict[str, Any] = {
+            "KeyConditionExpression": Key("UserID").eq(user_id) & Key("SK").begins_with(f"TASK#{tab_id}#"),
+            "ProjectionExpression": "#completed", "ExpressionAttributeNames": {"#completed": "completed"},
+            "ConsistentRead": True
+        }
+        while True:
+            response = todo_list_table.query(**query_kwargs)
+            for item in response.get("Items", []):
+                task_count += 1
+                completed_count += int(bool(item.get("completed")))
+            if "LastEvaluatedKey" not in response:
+                break
+            query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+        values: Dict[str, Any] = {":tab": tab_id, ":taskCount": task_count, ":completedCount": completed_count, ":true": True}
+        if version is None:
+            condition = "attribute_not_exists(#version)"
+        else:
+            condition = "#version = :version"
+            values[":version"] = version
+        try:
+            response = todo_list_table.update_item(
+                Key=_tab_meta_key(user_id, tab_id),
+                UpdateExpression="SET #tabId = :tab, #taskCount = :taskCount, #completedCount = :completedCount, #countsInitialized = :true",
+                ConditionExpression=condition,
+                ExpressionAttributeNames={"#tabId": "tabId", "#version": "version", "#taskCount": "taskCount",
+                                          "#completedCount": "completedCount", "#countsInitialized": "countsInitialized"},
+                ExpressionAttributeValues=values, ReturnValues="ALL_NEW"
+            )
+            logger.info("Initialized task counters of tab '%s' for user %s: %s/%s", tab_id, user_id, completed_count, task_count)
+            return response["Attributes"]
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+        meta = todo_list_table.get_item(Key=_tab_meta_key(user_id, tab_id), ConsistentRead=True).get("Item", {})
+        if meta.get("countsInitialized"):
+            return meta
+    logger.warning(f"Tab '{tab_id}' of user {user_id} kept changing while being recounted; serving uncommitted counts.")
+    return {**meta, "taskCount": task_count, "completedCount": completed_count}
+
+@storage_operation
+def get_tab_counts(user_id: str, tab_ids: List[str]) -> Dict[str, Dict[str, int]]:
+    """
+    Returns {tab_id: {"taskCount", "completedCount", "version"}} from the TABMETA items, without
+    reading tasks (except for the one-time recount of a tab whose counters were never initialized).
+    Raises ClientError.
+    """
+    if not todo_list_table or not tab_ids: return {}
+    metas = {item["SK"][len("TABMETA#"):]: item for item in _batch_get_todo_items([_tab_meta_key(user_id, t) for t in tab_ids])}
+    counts = {}
+    for tab_id in tab_ids:
+        meta = metas.get(tab_id, {})
+        if not meta.get("countsInitialized"):
+            meta = _recount_tab(user_id, tab_id, meta)
+        counts[tab_id] = {"taskCount": max(0, int(meta.get("taskCount", 0))),
+                          "completedCount": max(0, int(meta.get("completedCount", 0))),
+                          "version": int(meta.get("version", 0))}
+    return counts
+
+
+# --- CHANGE FEED (delta sync) ---
+# Every mutation takes the next number from the user's CHANGESEQ counter before it writes, and
+# afterwards puts a CHANGE#<seq> row naming what changed: one task (entity 'task'), a whole tab
+# (entity 'tab', for bulk imports and tab deletions) or the tab list (entity 'profile'). Change
+# rows carry an 'expiresAt' epoch for DynamoDB TTL, so task deletions leave tombstones that
+# expire on their own. Sync returns the *current* state of what changed (or a tombstone if a
+# task is gone), so replaying a change twice is harmless and late or reordered writes converge.
+#
+# A change row is written after its mutation, so a sequence number can be briefly missing while
+# the write is in flight. A mutation whose write fails still puts a row for its number (entity
+# 'none', ignored by sync; see _change_for_write), so gaps only come from lost change rows. A
+# sync token never moves past a gap until SYNC_SETTLE_SECONDS have passed; after that the gap is
+# skipped.
+def _change_sk(seq: int) -> str:
+    return f"CHANGE#{seq:015d}"
+
+def _next_change_seq(user_id: str, count: int = 1) -> Tuple[int, int]:
+    """
+    Reserves the user's next `count` change sequence numbers. Returns (first seq, changedAtMs);
+    the block is first..first+count-1. Raises ClientError.
+    """
+    changed_at_ms = int(time.time() * 1000)
+    response = todo_list_table.update_item(
+        Key={"UserID": user_id, "SK": "CHANGESEQ"},
+        UpdateExpression="SET #changedAtMs = :now ADD #seq :count",
+        ExpressionAttributeNames={"#seq": "seq", "#changedAtMs": "changedAtMs"},
+        ExpressionAttributeValues={":count": count, ":now": changed_at_ms},
+        ReturnValues="UPDATED_NEW"
+    )
+    return int(response["Attributes"]["seq"]) - count + 1, changed_at_ms
+
+def _change_item(user_id: str, seq: int, changed_at_ms: int, entity: str, tab_id: Optional[str], task_id: Optional[str]) -> Dict[str, Any]:
+    item = {
+        "UserID": user_id, "SK": _change_sk(seq), "seq": seq, "entity": entity, "changedAtMs": changed_at_ms,
+        "expiresAt": changed_at_ms // 1000 + SYNC_CHANGE_RETENTION_SECONDS
+    }
+    if tab_id is not None: item["tabId"] = tab_id
+    if task_id is not None: item["taskId"] = task_id
+    return item
+
+def _record_change(user_id: str, change: Tuple[int, int], entity: str, tab_id: Optional[str] = None, task_id: Optional[str] = None) -> None:
+    """ Writes the CHANGE# row for a mutation that has already been applied. Failures are logged, not raised. """
+    seq, changed_at_ms = change
+    try:
+        todo_list_table.put_item(Item=_change_item(user_id, seq, changed_at_ms, entity, tab_id, task_id))
+    except ClientError as e:
+        logger.error(f"Error recording change {seq} ({entity}) for user {user_id}: {e.response['Error']['Message']}")
+
+def _release_change(user_id: str, change: Tuple[int, int]) -> None:
+    """ Writes a no-op CHANGE# row for a reserved number whose mutation was not applied, so the feed has no gap there. """
+    _record_change(user_id, change, "none")
+
+@contextlib.contextmanager
+def _change_for_write(user_id: str) -> Iterator[Tuple[int, int]]:
+    """ Reserves a change number for the write inside the block; if the block raises, the number is released. """
+    change = _next_change_seq(user_id)
+    try:
+        yield change
+    except BaseException:
+        _release_change(user_id, change)
+        raise
+
+def _record_task_changes(user_id: str, change: Tuple[int, int], tab_id: str, task_ids: List[str]) -> None:
+    """ Writes one 'task' CHANGE# row per task id, numbered from a block reserved with _next_change_seq(count=len(task_ids)). """
+    first_seq, changed_at_ms = change
+    requests = [{"PutRequest": {"Item": _change_item(user_id, first_seq + i, changed_at_ms, "task", tab_id, task_id)}}
+                for i, task_id in enumerate(task_ids)]
+    for i in range(0, len(requests), BATCH_WRITE_CHUNK_SIZE):
+        try:
+            unprocessed = _batch_write_chunk(requests[i:i + BATCH_WRITE_CHUNK_SIZE])
+        except ClientError as e:
+            logger.error(f"Error recording task changes for user {user_id}: {e.response['Error']['Message']}")
+            continue
+        if unprocessed:
+            logger.error(f"{len(unprocessed)} task changes for user {user_id} were left unprocessed.")
+
+def encode_sync_token(seq: int) -> str:
+    payload = json.dumps({"seq": seq, "at": int(time.time())}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+def decode_sync_token(token: str) -> Tuple[int, int]:
+    """ Returns (seq, issued_at_epoch) from a sync token. Raises ValueError if it is malformed. """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        seq, issued_at = int(payload["seq"]), int(payload["at"])
+    except (ValueError, TypeError, KeyError, UnicodeError) as e:
+        raise ValueError("Invalid sync token.") from e
+    if seq < 0:
+        raise ValueError("Invalid sync token.")
+    return seq, issued_at
+
+@storage_operation
+def get_sync_token(user_id: str) -> str:
+    """
+    A token for a snapshot the caller is about to read. Call it *before* reading the snapshot.
+    It points at the newest settled change, so anything still in flight is delivered by the next sync.
+    """
+    if not todo_list_table: return encode_sync_token(0)
+    current = todo_list_table.get_item(Key={"UserID": user_id, "SK": "CHANGESEQ"}, ConsistentRead=True).get("Item", {})
+    settled_before_ms = (time.time() - SYNC_SETTLE_SECONDS) * 1000
+    query_kwargs: Dict[str, Any] = {
+        "KeyConditionExpression": Key("UserID").eq(user_id) & Key("SK").begins_with("CHANGE#"),
+        "ScanIndexForward": False, "ConsistentRead": True, "Limit": 100,
+        "ProjectionExpression": "#seq, #changedAtMs", "ExpressionAttributeNames": {"#seq": "seq", "#changedAtMs": "changedAtMs"}
+    }
+    response = todo_list_table.query(**query_kwargs)
+    for row in response.get("Items", []):
+        if int(row["changedAtMs"]) <= settled_before_ms:
+            return encode_sync_token(int(row["seq"]))
+    # No settled change in the newest page: re-deliver a bounded window instead.
+    return encode_sync_token(max(0, int(current.get("seq", 0)) - SYNC_MAX_CHANGES))
+
+def _batch_get_todo_items(keys: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """ Fetches items by key with BatchGetItem in 100-key chunks, retrying UnprocessedKeys. """
+    found: List[Dict[str, Any]] = []
+    for i in range(0, len(keys), BATCH_GET_MAX_KEYS):
+        request: Dict[str, Any] = {TODO_LIST_TABLE_NAME: {"Keys": keys[i:i + BATCH_GET_MAX_KEYS], "ConsistentRead": True}}
+        for attempt in range(BATCH_WRITE_MAX_RETRIES + 1):
+            if attempt:
+                time.sleep(BATCH_WRITE_BASE_BACKOFF_SECONDS * (2 ** (attempt - 1)) * (0.5 + random.random()))
+            response = storage_backend.batch_get_item(RequestItems=request)
+            found.extend(response.get("Responses", {}).get(TODO_LIST_TABLE_NAME, []))
+            request = response.get("UnprocessedKeys") or {}
+            if not request:
+                break
+        else:
+            raise ClientError({"Error": {"Code": "UnprocessedKeys", "Message": "BatchGetItem retry limit reached"}}, "BatchGetItem")
+    return found
+
+@storage_operation
+def get_changes_since(user_id: str, token: str) -> Dict[str, Any]:
+    """
+    Delta for a client holding `token`. Returns {"reset": True} when the token is older than the
+    change retention (the client must reload from /api/bootstrap). Otherwise returns
+    {"tasks", "deleted", "reloadTabs", "tabs", "activeTabId", "syncToken", "hasMore"}: changed tasks
+    in full, tombstones as {"tabId", "taskId"}, tabs whose tasks must be reloaded wholesale, and the
+    tab list when it changed (else None). Raises ValueError for a bad token, ClientError on failure.
+    """
+    since, issued_at = decode_sync_token(token)
+    now = time.time()
+    if now - issued_at > SYNC_CHANGE_RETENTION_SECONDS - SYNC_SETTLE_SECONDS:
+        return {"reset": True}
+    response = todo_list_table.query(
+        KeyConditionExpression=Key("UserID").eq(user_id) & Key("SK").between(_change_sk(since + 1), _change_sk(10 ** 15 - 1)),
+        ConsistentRead=True, Limit=SYNC_MAX_CHANGES
+    )
+    rows = response.get("Items", [])
+
+    # Advance the token over contiguous sequence numbers, and over gaps once they have settled.
+    new_since = since
+    settled_before_ms = (now - SYNC_SETTLE_SECONDS) * 1000
+    for row in rows:
+        seq = int(row["seq"])
+        if seq != new_since + 1 and int(row["changedAtMs"]) > settled_before_ms:
+            break
+        new_since = seq
+
+    task_keys: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    reload_tabs: List[str] = []
+    profile_changed = False
+    for row in rows:
+        if row["entity"] == "task":
+            task_keys[(row["tabId"], row["taskId"])] = {"UserID": user_id, "SK": f"TASK#{row['tabId']}#{row['taskId']}"}
+        elif row["entity"] == "tab" and row["tabId"] not in reload_tabs:
+            reload_tabs.append(row["tabId"])
+        elif row["entity"] == "profile":
+            profile_changed = True
+
+    current = {(item["tabId"], item["taskId"]): item for item in _batch_get_todo_items(list(task_keys.values()))}
+    tasks = [current[k] for k in task_keys if k in current and k[0] not in reload_tabs]
+    deleted = [{"tabId": k[0], "taskId": k[1]} for k in task_keys if k not in current and k[0] not in reload_tabs]
+    result: Dict[str, Any] = {
+        "tasks": tasks, "deleted": deleted, "reloadTabs": reload_tabs, "tabs": None, "activeTabId": None,
+        "syncToken": encode_sync_token(new_since),
+        "hasMore": "LastEvaluatedKey" in response and new_since > since # Stuck behind an unsettled gap: more now would not help
+    }
+    if profile_changed:
+        profile = get_user_profile(user_id, use_cache=False)
+        result["tabs"] = _tabs_from_profile(user_id, profile)
+        result["activeTabId"] = active_tab_writes.pending(user_id) or (profile or {}).get("activeTabId", "main")
+    logger.info("Sync for user %s from %s to %s: %s tasks, %s tombstones, %s tab reloads", user_id, since, new_since, len(tasks), len(deleted), len(reload_tabs))
+    return result
+
+
+# --- LIVE EVENTS (pushed to open /api/events streams; see event_bus.py) ---
+# After a mutation has written its change row, the same change is published to the user's event
+# streams in the /api/sync delta format, with the tab's new counters when the write returned them.
+# Events only spare clients a round trip: a client that misses one still gets the change from its
+# next sync.
+def _tab_counts_event(tab_id: str, meta: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    """ {tab_id: counts} from an updated TABMETA item; empty when its counters were never initialized. """
+    if not meta or not meta.get("countsInitialized"):
+        return {}
+    return {tab_id: {"taskCount": max(0, int(meta.get("taskCount", 0))), "completedCount": max(0, int(meta.get("completedCount", 0))),
+                     "version": int(meta.get("version", 0))}}
+
+def _publish_change(user_id: str, tasks: Iterable[Dict[str, Any]] = (), deleted: Iterable[Tuple[str, str]] = (),
+                    reload_tabs: Iterable[str] = (), counts: Optional[Dict[str, Dict[str, int]]] = None,
+                    profile: Optional[Dict[str, Any]] = None) -> None:
+    """ Publishes one change: written tasks, deleted (tab_id, task_id) pairs, tabs to reload, counters, or the new PROFILE. Failures are logged, not raised. """
+    event: Dict[str, Any] = {}
+    tasks = [shape_task(task, TASK_FIELDS) for task in tasks]
+    deleted = [{"tabId": tab_id, "taskId": task_id} for tab_id, task_id in deleted]
+    if tasks: event["tasks"] = tasks
+    if deleted: event["deleted"] = deleted
+    if reload_tabs: event["reloadTabs"] = list(reload_tabs)
+    if counts: event["counts"] = counts
+    if profile is not None:
+        event["tabs"] = _tabs_from_profile(user_id, profile)
+        event["activeTabId"] = profile.get("activeTabId", "main")
+    if not event:
+        return
+    try:
+        event_bus.bus.publish(user_id, event)
+    except Exception as e:
+        logger.error(f"Error publishing change event for user {user_id}: {e}")
+
+
+# --- TASK CRUD OPERATIONS (using todo_list_table) ---
+def _new_task_item(user_id: str, tab_id: str, task_text: str, task_description: str, completed: bool, timestamp: str) -> Dict[str, Any]:
     task_id = str(uuid.uuid4())
-    timestamp = datetime.now().isoformat()
-    task_data = {
+    return {
         "UserID": user_id, "SK": f"TASK#{tab_id}#{task_id}", "tabId": tab_id, "taskId": task_id,
-        "text": task_text, "description": task_description, "completed": False,
+        "text": task_text, "description": task_description, "completed": bool(completed),
         "createdAt": timestamp, "updatedAt": timestamp, "entityType": "TASK",
     }
+
+@storage_operation
+def add_task(user_id: str, tab_id: str, task_text: str, task_description: str, completed: bool = False) -> Optional[Dict[str, Any]]:
+    if not todo_list_table:
+        logger.error("Todo list table not initialized. Cannot add task.")
+        return None
+    task_data = _new_task_item(user_id, tab_id, task_text, task_description, completed, datetime.now().isoformat())
+    task_id = task_data["taskId"]
     try:
-        todo_list_table.put_item(Item=task_data)
-        logger.info(f"Successfully added task {task_id} for user {user_id} in tab {tab_id}")
+        with _change_for_write(user_id) as change:
+            todo_list_table.put_item(Item=task_data)
+        meta = _bump_tab_meta(user_id, tab_id, *_count_delta(None, task_data))
+        _record_change(user_id, change, "task", tab_id, task_id)
+        _update_search_index(user_id, [(None, task_data)])
+        _publish_change(user_id, tasks=[task_data], counts=_tab_counts_event(tab_id, meta))
+        logger.info("Successfully added task %s for user %s in tab %s", task_id, user_id, tab_id)
         return task_data
     except ClientError as e:
         logger.error(f"Error adding task for {user_id} in tab {tab_id}: {e.response['Error']['Message']}")
         return None
 
-def get_task(user_id: str, tab_id: str, task_id: str) -> Optional[Dict[str, Any]]:
+def _batch_write_chunk(requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Sends up to 25 Put/Delete requests with one BatchWriteItem call, re-sending UnprocessedItems
+    with jittered exponential backoff. Returns the requests that could still not be written.
+    """
+    pending = requests
+    for attempt in range(BATCH_WRITE_MAX_RETRIES + 1):
+        if attempt:
+            time.sleep(BATCH_WRITE_BASE_BACKOFF_SECONDS * (2 ** (attempt - 1)) * (0.5 + random.random()))
+        response = storage_backend.batch_write_item(RequestItems={TODO_LIST_TABLE_NAME: pending})
+        pending = response.get("UnprocessedItems", {}).get(TODO_LIST_TABLE_NAME, [])
+        if not pending:
+            return []
+        logger.warning(f"BatchWriteItem left {len(pending)} unprocessed items (attempt {attempt + 1}).")
+    return pending
+
+@storage_operation
+def add_tasks_bulk(user_id: str, tab_id: str, tasks: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Adds many tasks to a tab using BatchWriteItem in 25-item chunks.
+    `tasks` may be a lazy iterable of dicts with 'text', 'description', 'completed' and an
+    optional 'line' number; it is consumed chunk by chunk so large imports are never fully
+    buffered. Returns one result per input: {"line", "success", "task"} or {"line", "success", "error"}.
+    """
+    results: List[Dict[str, Any]] = []
+    if not todo_list_table:
+        logger.error("Todo list table not initialized. Cannot bulk add tasks.")
+        return [{"line": t.get("line"), "success": False, "error": "Server error: Table initialization."} for t in tasks]
+
+    timestamp = datetime.now().isoformat()
+    try:
+        change = _next_change_seq(user_id)
+    except ClientError as e:
+        logger.error(f"Error starting bulk add for {user_id} in tab {tab_id}: {e.response['Error']['Message']}")
+        return [{"line": t.get("line"), "success": False, "error": "Error writing task."} for t in tasks]
+    chunk: List[Any] = [] # (result, item) pairs awaiting a flush; results are filled in place to keep input order
+    written = written_completed = 0
+
+    def flush_chunk():
+        nonlocal written, written_completed
+        items = [item for _, item in chunk]
+        try:
+            unprocessed = [r["PutRequest"]["Item"] for r in _batch_write_chunk([{"PutRequest": {"Item": item}} for item in items])]
+            error_message = "Write throttled; retry limit reached."
+        except ClientError as e:
+            logger.error(f"Error bulk adding tasks for {user_id} in tab {tab_id}: {e.response['Error']['Message']}")
+            unprocessed = items
+            error_message = "Error writing task."
+        failed_sks = {item["SK"] for item in unprocessed}
+        for result, item in chunk:
+            if item["SK"] in failed_sks:
+                result.update({"success": False, "error": error_message})
+            else:
+                result.update({"success": True, "task": item})
+                written += 1
+                written_completed += int(item["completed"])
+        _update_search_index(user_id, [(None, item) for item in items if item["SK"] not in failed_sks])
+        chunk.clear()
+
+    for task in tasks:
+        text = (task.get("text") or "").strip()
+        if not text:
+            results.append({"line": task.get("line"), "success": False, "error": "Missing task text."})
+            continue
+        item = _new_task_item(user_id, tab_id, text, task.get("description") or "", task.get("completed", False), timestamp)
+        result = {"line": task.get("line")}
+        results.append(result)
+        chunk.append((result, item))
+        if len(chunk) == BATCH_WRITE_CHUNK_SIZE:
+            flush_chunk()
+    if chunk:
+        flush_chunk()
+    if written:
+        meta = _bump_tab_meta(user_id, tab_id, written, written_completed)
+        _record_change(user_id, change, "tab", tab_id) # Clients reload the tab rather than receive every imported task
+        _publish_change(user_id, reload_tabs=[tab_id], counts=_tab_counts_event(tab_id, meta))
+    else:
+        _release_change(user_id, change)
+
+    logger.info("Bulk added %s of %s tasks for user %s in tab %s", written, len(results), user_id, tab_id)
+    return results
+
+def parse_task_fields(value: Optional[str]) -> Optional[List[str]]:
+    """
+    Parses a comma-separated fields= value into a list of TASK_FIELDS, always including taskId.
+    None or empty means the whole item. Raises ValueError naming any unknown field.
+    """
+    if not value or not value.strip():
+        return None
+    fields = ["taskId"]
+    for field in (f.strip() for f in value.split(",")):
+        if field and field not in fields:
+            fields.append(field)
+    unknown = [f for f in fields if f not in TASK_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown task fields: {', '.join(unknown)}. Expected any of: {', '.join(TASK_FIELDS)}.")
+    return fields
+
+def _task_projection_kwargs(fields: Optional[List[str]]) -> Dict[str, Any]:
+    """ ProjectionExpression arguments reading only `fields`. Names go through placeholders since several are reserved words. """
+    if not fields:
+        return {}
+    names = {f"#f{i}": field for i, field in enumerate(fields)}
+    return {"ProjectionExpression": ", ".join(names), "ExpressionAttributeNames": names}
+
+def shape_task(task: Dict[str, Any], fields: Optional[List[str]] = None, summary: bool = False) -> Dict[str, Any]:
+    """
+    The client-facing form of a task: only `fields` when given (items written by other code paths
+    may carry more), and with summary=True a description cut to TASK_SUMMARY_DESCRIPTION_CHARS
+    and flagged with descriptionTruncated.
+    """
+    if fields:
+        task = {f: task[f] for f in fields if f in task}
+    description = task.get("description")
+    if summary and isinstance(description, str) and len(description) > TASK_SUMMARY_DESCRIPTION_CHARS:
+        task = {**task, "description": description[:TASK_SUMMARY_DESCRIPTION_CHARS].rstrip() + "\u2026", "descriptionTruncated": True}
+    return task
+
+@storage_operation
+def get_task(user_id: str, tab_id: str, task_id: str, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
     if not todo_list_table: return None
     try:
-        response = todo_list_table.get_item(Key={"UserID": user_id, "SK": f"TASK#{tab_id}#{task_id}"})
+        response = todo_list_table.get_item(Key={"UserID": user_id, "SK": f"TASK#{tab_id}#{task_id}"}, **_task_projection_kwargs(fields))
         item = response.get("Item")
-        if item: logger.info(f"Fetched task {task_id} for user {user_id}")
+        if item: logger.info("Fetched task %s for user %s", task_id, user_id)
         else: logger.warning(f"Task {task_id} not found for user {user_id} in tab {tab_id}")
         return item
     except ClientError as e:
         logger.error(f"Error fetching task {task_id} for user {user_id}: {e.response['Error']['Message']}")
         return None
 
-def get_tasks_for_tab(user_id: str, tab_id: str) -> List[Dict[str, Any]]:
+def encode_cursor(last_evaluated_key: Optional[Dict[str, Any]]) -> Optional[str]:
+    """ Turns a LastEvaluatedKey into an opaque, URL-safe cursor. Only the sort key is kept; the user comes from the session. """
+    if not last_evaluated_key:
+        return None
+    payload = json.dumps({"sk": last_evaluated_key["SK"]}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+def decode_cursor(user_id: str, tab_id: str, cursor: str) -> Dict[str, Any]:
+    """ Rebuilds an ExclusiveStartKey from a cursor. Raises ValueError if it is malformed or belongs to another tab. """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_key = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))["sk"]
+    except (ValueError, TypeError, KeyError, UnicodeError) as e:
+        raise ValueError("Invalid cursor.") from e
+    if not isinstance(sort_key, str) or not sort_key.startswith(f"TASK#{tab_id}#"):
+        raise ValueError("Invalid cursor.")
+    return {"UserID": user_id, "SK": sort_key}
+
+@storage_operation
+def query_tasks_page(user_id: str, tab_id: str, limit: Optional[int] = None, cursor: Optional[str] = None,
+                     fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Runs one task query for a tab and returns (items, next_cursor), reading only `fields` if given.
+    next_cursor is None on the last page. Raises ValueError for a bad cursor and ClientError on DynamoDB failures.
+    """
+    if not todo_list_table: return [], None
+    query_kwargs: Dict[str, Any] = {
+        "KeyConditionExpression": Key("UserID").eq(user_id) & Key("SK").begins_with(f"TASK#{tab_id}#"),
+        **_task_projection_kwargs(fields)
+    }
+    if limit:
+        query_kwargs["Limit"] = max(1, min(int(limit), TASK_PAGE_MAX_LIMIT))
+    if cursor:
+        query_kwargs["ExclusiveStartKey"] = decode_cursor(user_id, tab_id, cursor)
+    response = todo_list_table.query(**query_kwargs)
+    return response.get("Items", []), encode_cursor(response.get("LastEvaluatedKey"))
+
+@storage_operation
+def iter_task_pages(user_id: str, tab_id: str, page_size: Optional[int] = None, fields: Optional[List[str]] = None) -> Iterator[List[Dict[str, Any]]]:
+    """ Yields a tab's tasks one DynamoDB page at a time, following LastEvaluatedKey until exhausted. """
+    cursor = None
+    while True:
+        items, cursor = query_tasks_page(user_id, tab_id, page_size, cursor, fields)
+        if items:
+            yield items
+        if not cursor:
+            return
+
+@storage_operation
+def get_tasks_for_tab(user_id: str, tab_id: str, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
     if not todo_list_table: return []
     try:
-        # Ensure you use boto3.dynamodb.conditions.Key for queries
-        response = todo_list_table.query(
-            KeyConditionExpression=Key("UserID").eq(user_id) & Key("SK").begins_with(f"TASK#{tab_id}#")
-        )
-        items = response.get("Items", [])
-        logger.info(f"Fetched {len(items)} tasks for user {user_id} in tab {tab_id}")
+        items = [item for page in iter_task_pages(user_id, tab_id, fields=fields) for item in page]
+        logger.info("Fetched %s tasks for user %s in tab %s", len(items), user_id, tab_id)
         return items
     except ClientError as e:
         logger.error(f"Error fetching tasks for user {user_id} in tab {tab_id}: {e.response['Error']['Message']}")
         return []
 
-def update_task(user_id: str, tab_id: str, task_id: str, task_text: Optional[str] = None, task_description: Optional[str] = None, completed: Optional[bool] = None) -> Optional[Dict[str, Any]]:
-    if not todo_list_table: return None
-    timestamp = datetime.now().isoformat()
+@storage_operation
+def iter_export_pages(user_id: str, tab_id: Optional[str] = None, page_size: Optional[int] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yields every task of the user (or of one tab) one DynamoDB page at a time, for exports: a single
+    query over the user's TASK# items following LastEvaluatedKey, so only one page is held at once.
+    Tasks come grouped by tab and carry only TASK_FIELDS. Raises ClientError on DynamoDB failures.
+    """
+    if not todo_list_table: return
+    query_kwargs: Dict[str, Any] = {
+        "KeyConditionExpression": Key("UserID").eq(user_id) & Key("SK").begins_with(f"TASK#{tab_id}#" if tab_id else "TASK#"),
+        **_task_projection_kwargs(list(TASK_FIELDS))
+    }
+    if page_size:
+        query_kwargs["Limit"] = max(1, min(int(page_size), TASK_PAGE_MAX_LIMIT))
+    while True:
+        response = todo_list_table.query(**query_kwargs)
+        items = response.get("Items", [])
+        if items:
+            yield items
+        last_evaluated_key = response.get("LastEvaluatedKey")
+        if not last_evaluated_key:
+            return
+        query_kwargs["ExclusiveStartKey"] = last_evaluated_key
+
+def _task_update_expression(task_text: Optional[str], task_description: Optional[str], completed: Optional[bool],
+                            timestamp: str) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+    """ Builds (UpdateExpression, names, values) setting updatedAt plus whichever task fields are given. """
     update_expression_parts = ["SET #updatedAt = :updatedAtVal"]
     expression_attribute_names = {"#updatedAt": "updatedAt"}
     expression_attribute_values = {":updatedAtVal": timestamp}
@@ -423,32 +1480,526 @@ def update_task(user_id: str, tab_id: str, task_id: str, task_text: Optional[str
         update_expression_parts.append("#completed = :completedVal")
         expression_attribute_names["#completed"] = "completed"
         expression_attribute_values[":completedVal"] = completed
-    if len(update_expression_parts) == 1:
+    return ", ".join(update_expression_parts), expression_attribute_names, expression_attribute_values
+
+def _task_after_update(key: Dict[str, Any], old: Optional[Dict[str, Any]], task_text: Optional[str], task_description: Optional[str],
+                       completed: Optional[bool], timestamp: str) -> Dict[str, Any]:
+    """ The item an update leaves behind, given the ALL_OLD attributes it returned (None if it created the item). """
+    task = dict(old or key)
+    task["updatedAt"] = timestamp
+    for name, value in (("text", task_text), ("description", task_description), ("completed", completed)):
+        if value is not None:
+            task[name] = value
+    return task
+
+@storage_operation
+def update_task(user_id: str, tab_id: str, task_id: str, task_text: Optional[str] = None, task_description: Optional[str] = None, completed: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+    if not todo_list_table: return None
+    timestamp = datetime.now().isoformat()
+    if task_text is None and task_description is None and completed is None:
         logger.warning(f"No fields to update for task {task_id} beyond timestamp.")
-    update_expression = ", ".join(update_expression_parts)
+    update_expression, expression_attribute_names, expression_attribute_values = _task_update_expression(
+        task_text, task_description, completed, timestamp
+    )
+    key = {"UserID": user_id, "SK": f"TASK#{tab_id}#{task_id}"}
     try:
-        response = todo_list_table.update_item(
-            Key={"UserID": user_id, "SK": f"TASK#{tab_id}#{task_id}"},
-            UpdateExpression=update_expression, ExpressionAttributeNames=expression_attribute_names,
-            ExpressionAttributeValues=expression_attribute_values, ReturnValues="ALL_NEW",
-        )
-        logger.info(f"Updated task {task_id} for user {user_id} in tab {tab_id}")
-        return response.get("Attributes")
+        with _change_for_write(user_id) as change:
+            # ALL_OLD rather than ALL_NEW: the previous 'completed' value tells whether the tab's counters move.
+            response = todo_list_table.update_item(
+                Key=key, UpdateExpression=update_expression, ExpressionAttributeNames=expression_attribute_names,
+                ExpressionAttributeValues=expression_attribute_values, ReturnValues="ALL_OLD",
+            )
+        old = response.get("Attributes")
+        task = _task_after_update(key, old, task_text, task_description, completed, timestamp)
+        meta = _bump_tab_meta(user_id, tab_id, *_count_delta(old, task))
+        _record_change(user_id, change, "task", tab_id, task_id)
+        if task_text is not None or task_description is not None:
+            _update_search_index(user_id, [(old, task)])
+        _publish_change(user_id, tasks=[task], counts=_tab_counts_event(tab_id, meta))
+        logger.info("Updated task %s for user %s in tab %s", task_id, user_id, tab_id)
+        return task
     except ClientError as e:
         logger.error(f"Error updating task {task_id} for user {user_id}: {e.response['Error']['Message']}")
         return None
 
+@storage_operation
 def delete_task(user_id: str, tab_id: str, task_id: str) -> bool:
     if not todo_list_table: return False
     try:
-        todo_list_table.delete_item(Key={"UserID": user_id, "SK": f"TASK#{tab_id}#{task_id}"})
-        logger.info(f"Deleted task {task_id} for user {user_id} in tab {tab_id}")
+        with _change_for_write(user_id) as change:
+            response = todo_list_table.delete_item(Key={"UserID": user_id, "SK": f"TASK#{tab_id}#{task_id}"}, ReturnValues="ALL_OLD")
+        meta = _bump_tab_meta(user_id, tab_id, *_count_delta(response.get("Attributes"), None))
+        _record_change(user_id, change, "task", tab_id, task_id) # Tombstone until it expires
+        _update_search_index(user_id, [(response.get("Attributes"), None)])
+        _publish_change(user_id, deleted=[(tab_id, task_id)], counts=_tab_counts_event(tab_id, meta))
+        logger.info("Deleted task %s for user %s in tab %s", task_id, user_id, tab_id)
         return True
     except ClientError as e:
         logger.error(f"Error deleting task {task_id} for user {user_id}: {e.response['Error']['Message']}")
         return False
 
+# --- BATCH TASK OPERATIONS ---
+def _task_batch_op_error(operation: Any, seen_task_ids: set) -> Optional[str]:
+    """ Validates one batch operation, returning an error message or None. """
+    if not isinstance(operation, dict):
+        return "Invalid operation."
+    task_id = operation.get("taskId")
+    if not isinstance(task_id, str) or not task_id:
+        return "Missing taskId."
+    if operation.get("action") not in ("update", "delete"):
+        return "Unknown action; expected 'update' or 'delete'."
+    if task_id in seen_task_ids:
+        return "Duplicate taskId in batch."
+    seen_task_ids.add(task_id)
+    if operation["action"] == "update":
+        fields = [f for f in ("text", "description", "completed") if operation.get(f) is not None]
+        if not fields:
+            return "Nothing to update."
+        if "completed" in fields and not isinstance(operation["completed"], bool):
+            return "'completed' must be a boolean."
+        if any(not isinstance(operation[f], str) for f in fields if f != "completed"):
+            return "'text' and 'description' must be strings."
+    return None
+
+def _task_batch_update_kwargs(user_id: str, tab_id: str, operation: Dict[str, Any], timestamp: str) -> Dict[str, Any]:
+    update_expression, names, values = _task_update_expression(
+        operation.get("text"), operation.get("description"), operation.get("completed"), timestamp
+    )
+    return {
+        "Key": {"UserID": user_id, "SK": f"TASK#{tab_id}#{operation['taskId']}"},
+        "UpdateExpression": update_expression, "ConditionExpression": "attribute_exists(SK)", # Never create a missing task
+        "ExpressionAttributeNames": names, "ExpressionAttributeValues": values
+    }
+
+def _apply_task_batch_parallel(user_id: str, tab_id: str, pending: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> Tuple[int, int]:
+    """
+    Deletes in 25-item BatchWriteItem chunks and updates as conditional update_item calls, all on
+    one thread pool. Returns the (taskCount, completedCount) deltas of the operations that applied.
+    """
+    timestamp = datetime.now().isoformat()
+    lock = threading.Lock()
+    task_delta = completed_delta = 0
+
+    def add_deltas(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        nonlocal task_delta, completed_delta
+        tasks, completed = _count_delta(old, new)
+        with lock:
+            task_delta += tasks
+            completed_delta += completed
+
+    def run_update(result: Dict[str, Any], operation: Dict[str, Any]) -> None:
+        kwargs = _task_batch_update_kwargs(user_id, tab_id, operation, timestamp)
+        try:
+            old = todo_list_table.update_item(ReturnValues="ALL_OLD", **kwargs).get("Attributes")
+            task = _task_after_update(kwargs["Key"], old, operation.get("text"), operation.get("description"), operation.get("completed"), timestamp)
+            add_deltas(old, task)
+            result.update({"success": True, "task": task})
+            if operation.get("text") is not None or operation.get("description") is not None:
+                _update_search_index(user_id, [(old, task)])
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                result.update({"success": False, "error": "Task not found."})
+            else:
+                logger.error(f"Error updating task {operation['taskId']} for user {user_id}: {e.response['Error']['Message']}")
+                result.update({"success": False, "error": "Error writing task."})
+
+    def run_deletes(chunk: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> None:
+        requests = [{"DeleteRequest": {"Key": {"UserID": user_id, "SK": f"TASK#{tab_id}#{op['taskId']}"}}} for _, op in chunk]
+        try:
+            # BatchWriteItem returns nothing about deleted items, so read them first to adjust the counters.
+            existing = {item["SK"]: item for item in _batch_get_todo_items([r["DeleteRequest"]["Key"] for r in requests])}
+            unprocessed = {r["DeleteRequest"]["Key"]["SK"] for r in _batch_write_chunk(requests)}
+            error_message = "Write throttled; retry limit reached."
+        except ClientError as e:
+            logger.error(f"Error batch deleting tasks for user {user_id} in tab {tab_id}: {e.response['Error']['Message']}")
+            existing = {}
+            unprocessed = {r["DeleteRequest"]["Key"]["SK"] for r in requests}
+            error_message = "Error writing task."
+        for result, operation in chunk:
+            sort_key = f"TASK#{tab_id}#{operation['taskId']}"
+            if sort_key in unprocessed:
+                result.update({"success": False, "error": error_message})
+            else:
+                result["success"] = True
+                add_deltas(existing.get(sort_key), None)
+        _update_search_index(user_id, [(item, None) for sort_key, item in existing.items() if sort_key not in unprocessed])
+
+    deletes = [(r, op) for r, op in pending if op["action"] == "delete"]
+    updates = [(r, op) for r, op in pending if op["action"] == "update"]
+    with ThreadPoolExecutor(max_workers=TASK_BATCH_MAX_WORKERS) as pool:
+        # Each task runs in a copy of this context so its storage calls keep the operation label.
+        futures = [pool.submit(contextvars.copy_context().run, run_deletes, deletes[i:i + BATCH_WRITE_CHUNK_SIZE])
+                   for i in range(0, len(deletes), BATCH_WRITE_CHUNK_SIZE)]
+        futures += [pool.submit(contextvars.copy_context().run, run_update, result, operation) for result, operation in updates]
+        for future in futures:
+            future.result()
+    return task_delta, completed_delta
+
+def _apply_task_batch_atomic(user_id: str, tab_id: str, pending: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """
+    One TransactWriteItems call: every task must exist, and either all operations apply or none do.
+    The tasks are read first; each write is conditioned on the 'completed' value that was read, and
+    the tab's version and counters are updated inside the same transaction. A transaction returns
+    no attributes, so once it applied the TABMETA item is read back and returned (None otherwise).
+    """
+    timestamp = datetime.now().isoformat()
+    keys = [{"UserID": user_id, "SK": f"TASK#{tab_id}#{op['taskId']}"} for _, op in pending]
+    try:
+        current = {item["SK"]: item for item in _batch_get_todo_items(keys)}
+    except ClientError as e:
+        logger.error(f"Error reading tasks for atomic batch for user {user_id} in tab {tab_id}: {e.response['Error']['Message']}")
+        for result, _ in pending:
+            result.update({"success": False, "error": "Error writing task."})
+        return None
+    if len(current) != len(keys):
+        for (result, _), key in zip(pending, keys):
+            result.update({"success": False, "error": "Task not found." if key["SK"] not in current else "Transaction cancelled."})
+        return None
+
+    transact_items = []
+    updated_tasks: List[Optional[Dict[str, Any]]] = []
+    task_delta = completed_delta = 0
+    for (_, operation), key in zip(pending, keys):
+        old = current[key["SK"]]
+        if "completed" in old:
+            guard, guard_values = "#completed = :previousCompleted", {":previousCompleted": old["completed"]}
+        else:
+            guard, guard_values = "attribute_not_exists(#completed)", {}
+        if operation["action"] == "update":
+            kwargs = _task_batch_update_kwargs(user_id, tab_id, operation, timestamp)
+            kwargs["ConditionExpression"] += f" AND {guard}"
+            kwargs["ExpressionAttributeNames"]["#completed"] = "completed"
+            kwargs["ExpressionAttributeValues"].update(guard_values)
+            transact_items.append({"Update": {"TableName": TODO_LIST_TABLE_NAME, **kwargs}})
+            new = _task_after_update(key, old, operation.get("text"), operation.get("description"), operation.get("completed"), timestamp)
+        else:
+            delete: Dict[str, Any] = {
+                "TableName": TODO_LIST_TABLE_NAME, "Key": key, "ConditionExpression": f"attribute_exists(SK) AND {guard}",
+                "ExpressionAttributeNames": {"#completed": "completed"}
+            }
+            if guard_values:
+                delete["ExpressionAttributeValues"] = guard_values
+            transact_items.append({"Delete": delete})
+            new = None
+        updated_tasks.append(new)
+        tasks, completed = _count_delta(old, new)
+        task_delta += tasks
+        completed_delta += completed
+    transact_items.append({"Update": {"TableName": TODO_LIST_TABLE_NAME, **_tab_meta_update_kwargs(user_id, tab_id, task_delta, completed_delta)}})
+
+    try:
+        storage_backend.transact_write_items(TransactItems=transact_items, ClientRequestToken=str(uuid.uuid4())) # Resent attempts apply once
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            logger.error(f"Error applying atomic task batch for user {user_id} in tab {tab_id}: {e.response['Error']['Message']}")
+            for result, _ in pending:
+                result.update({"success": False, "error": "Error writing task."})
+            return None
+        # The tasks existed when read, so a failed condition means another writer got there first.
+        messages = {"None": "Transaction cancelled.", "ConditionalCheckFailed": "Task changed concurrently; retry."}
+        codes = _transaction_cancel_codes(e)
+        for i, (result, _) in enumerate(pending):
+            code = codes[i] if i < len(codes) else "None"
+            result.update({"success": False, "error": messages.get(code, "Transaction conflict; retry.")})
+        return None
+
+    for (result, _), task in zip(pending, updated_tasks):
+        result["success"] = True
+        if task is not None:
+            result["task"] = task
+    _update_search_index(user_id, [(current[key["SK"]], task) for key, task in zip(keys, updated_tasks)])
+    try:
+        return todo_list_table.get_item(Key=_tab_meta_key(user_id, tab_id), ConsistentRead=True).get("Item")
+    except ClientError as e:
+        logger.warning(f"Error reading counters of tab '{tab_id}' after atomic batch for user {user_id}: {e.response['Error']['Message']}")
+        return None
+
+@storage_operation
+def apply_task_batch(user_id: str, tab_id: str, operations: List[Any], atomic: bool = False) -> List[Dict[str, Any]]:
+    """
+    Applies many operations to one tab's tasks. An operation is {"action": "update", "taskId", and any
+    of "text", "description", "completed"} or {"action": "delete", "taskId"}. Updates never create
+    missing tasks. Returns one result per operation, in order: {"taskId", "action", "success"} plus
+    "task" for updates, or "error". With atomic=True (at most TASK_BATCH_ATOMIC_MAX_OPERATIONS) the
+    batch is one transaction: an invalid operation or a missing task fails every operation.
+    """
+    results = [{"taskId": op.get("taskId") if isinstance(op, dict) else None,
+                "action": op.get("action") if isinstance(op, dict) else None} for op in operations]
+    if not todo_list_table:
+        logger.error("Todo list table not initialized. Cannot apply task batch.")
+        for result in results:
+            result.update({"success": False, "error": "Server error: Table initialization."})
+        return results
+
+    if atomic and len(operations) > TASK_BATCH_ATOMIC_MAX_OPERATIONS:
+        for result in results:
+            result.update({"success": False, "error": f"Atomic batches are limited to {TASK_BATCH_ATOMIC_MAX_OPERATIONS} operations."})
+        return results
+
+    pending = []
+    seen_task_ids: set = set()
+    for result, operation in zip(results, operations):
+        error = _task_batch_op_error(operation, seen_task_ids)
+        if error:
+            result.update({"success": False, "error": error})
+        else:
+            pending.append((result, operation))
+    if atomic and len(pending) != len(operations):
+        for result, _ in pending:
+            result.update({"success": False, "error": "Batch rejected: another operation is invalid."})
+        return results
+    if not pending:
+        return results
+
+    try:
+        change = _next_change_seq(user_id, len(pending))
+    except ClientError as e:
+        logger.error(f"Error starting task batch for user {user_id} in tab {tab_id}: {e.response['Error']['Message']}")
+        for result, _ in pending:
+            result.update({"success": False, "error": "Error writing task."})
+        return results
+
+    meta = None
+    if atomic:
+        meta = _apply_task_batch_atomic(user_id, tab_id, pending) # Updates the tab's version and counters in its transaction
+    else:
+        task_delta, completed_delta = _apply_task_batch_parallel(user_id, tab_id, pending)
+        if any(result["success"] for result, _ in pending):
+            meta = _bump_tab_meta(user_id, tab_id, task_delta, completed_delta)
+    # One change row per reserved number, failed operations included, so the sync feed has no gaps.
+    _record_task_changes(user_id, change, tab_id, [operation["taskId"] for _, operation in pending])
+    _publish_change(user_id, tasks=[result["task"] for result, _ in pending if result["success"] and "task" in result],
+                    deleted=[(tab_id, operation["taskId"]) for result, operation in pending if result["success"] and operation["action"] == "delete"],
+                    counts=_tab_counts_event(tab_id, meta))
+    succeeded = sum(1 for result, _ in pending if result["success"])
+    logger.info("Task batch for user %s in tab %s: %s of %s operations applied (atomic=%s)", user_id, tab_id, succeeded, len(operations), atomic)
+    return results
+
+# --- TASK SEARCH (inverted index; key layout and ranking in search_index.py) ---
+# Every task write also writes the postings it adds and deletes the ones it drops. The PROFILE's
+# 'searchIndexStatus' says whether the index covers all of a user's tasks: new profiles start
+# 'ready'; users whose tasks predate the index are backfilled once by rebuild_search_index.
+# A single-word query ranks its term's postings; a multi-word query starts from its rarest term
+# and checks that term's tasks directly (see _rank_multi_term) rather than intersecting the
+# postings of several common terms.
+def _update_search_index(user_id: str, changes: Iterable[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]) -> int:
+    """
+    Writes the postings that take each task from `old` to `new` in each (old, new) pair; None means
+    the task does not exist on that side. Runs after the task write and never raises: a failed
+    posting is logged and counted, and search re-checks results against the tasks themselves.
+    Returns the number of posting writes that failed.
+    """
+    requests: List[Dict[str, Any]] = []
+    for old, new in changes:
+        puts, deletes = search_index.posting_changes(old, new)
+        requests += [{"PutRequest": {"Item": {"UserID": user_id, "SK": sort_key}}} for sort_key in puts]
+        requests += [{"DeleteRequest": {"Key": {"UserID": user_id, "SK": sort_key}}} for sort_key in deletes]
+    failed = 0
+    for i in range(0, len(requests), BATCH_WRITE_CHUNK_SIZE):
+        chunk = requests[i:i + BATCH_WRITE_CHUNK_SIZE]
+        try:
+            failed += len(_batch_write_chunk(chunk))
+        except ClientError as e:
+            logger.warning(f"Error writing search postings for user {user_id}: {e.response['Error']['Message']}")
+            failed += len(chunk)
+    if failed:
+        logger.warning(f"{failed} of {len(requests)} search posting writes failed for user {user_id}.")
+    return failed
+
+@storage_operation
+def get_search_index_status(user_id: str) -> str:
+    """ 'ready', 'building', 'failed', or 'missing' for users whose index was never built. """
+    profile = get_user_profile(user_id)
+    return (profile or {}).get("searchIndexStatus") or "missing"
+
+@storage_operation
+def claim_search_index_rebuild(user_id: str) -> bool:
+    """
+    Marks the user's index as 'building' unless it is ready or another rebuild is under way.
+    True means the caller owns the rebuild and must run rebuild_search_index.
+    """
+    if not todo_list_table: return False
+    now = datetime.now()
+    try:
+        response = todo_list_table.update_item(
+            Key={"UserID": user_id, "SK": "PROFILE"},
+            UpdateExpression="SET #status = :building, #startedAt = :now",
+            ConditionExpression="attribute_exists(SK) AND (attribute_not_exists(#status) OR #status = :failed "
+                                "OR (#status = :building AND #startedAt < :stale))",
+            ExpressionAttributeNames={"#status": "searchIndexStatus", "#startedAt": "searchIndexStartedAt"},
+            ExpressionAttributeValues={
+                ":building": "building", ":failed": "failed", ":now": now.isoformat(),
+                ":stale": datetime.fromtimestamp(now.timestamp() - SEARCH_REBUILD_STALE_SECONDS).isoformat()
+            },
+            ReturnValues="ALL_NEW"
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            profile_cache.invalidate(user_id) # Our copy was out of date
+            return False
+        logger.error(f"Error claiming search index rebuild for user {user_id}: {e.response['Error']['Message']}")
+        return False
+    profile_cache.put(user_id, response.get("Attributes"))
+    return True
+
+def _set_search_index_status(user_id: str, status: str) -> None:
+    response = todo_list_table.update_item(
+        Key={"UserID": user_id, "SK": "PROFILE"}, UpdateExpression="SET #status = :status REMOVE #startedAt",
+        ExpressionAttributeNames={"#status": "searchIndexStatus", "#startedAt": "searchIndexStartedAt"},
+        ExpressionAttributeValues={":status": status}, ReturnValues="ALL_NEW"
+    )
+    profile_cache.put(user_id, response.get("Attributes"))
+
+@storage_operation
+def rebuild_search_index(user_id: str, on_progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Writes the postings of every task in every tab, then marks the index 'ready' ('failed' if any
+    write failed, so the next search claims a new rebuild). Each page of task keys is re-read with
+    a consistent BatchGetItem right before its postings are put, so tasks deleted since the page
+    was listed get none. Postings are plain puts: a task edited or deleted in the moment between
+    that read and the put may keep a stale posting, which search_tasks filters out.
+    on_progress(indexed_so_far) is called after each page. Returns the number of tasks indexed; raises ClientError if the tasks cannot be read.
+    """
+    if not todo_list_table: return 0
+    indexed = failed = 0
+    try:
+        for tab in get_user_tabs(user_id):
+            for page in iter_task_pages(user_id, tab["tabId"], fields=["SK"]):
+                tasks = _batch_get_todo_items([{"UserID": user_id, "SK": item["SK"]} for item in page])
+                failed += _update_search_index(user_id, [(None, task) for task in tasks])
+                indexed += len(tasks)
+                if on_progress:
+                    on_progress(indexed)
+    except ClientError:
+        _set_search_index_status(user_id, "failed")
+        raise
+    _set_search_index_status(user_id, "failed" if failed else "ready")
+    logger.info("Rebuilt search index for user %s: %s tasks, %s failed posting writes", user_id, indexed, failed)
+    return indexed
+
+def _read_postings(user_id: str, term: str, limit: Optional[int] = None,
+                   start_key: Optional[Dict[str, Any]] = None) -> Tuple[List[str], Optional[Dict[str, Any]]]:
+    """
+    Up to `limit` (default SEARCH_MAX_POSTINGS_PER_TERM) posting keys of the terms starting with
+    `term`, from `start_key` on, and the key to continue from (None when there are no more).
+    """
+    limit = limit or search_index.SEARCH_MAX_POSTINGS_PER_TERM
+    postings: List[str] = []
+    query_kwargs: Dict[str, Any] = {
+        "KeyConditionExpression": Key("UserID").eq(user_id) & Key("SK").begins_with(f"{search_index.POSTING_PREFIX}{term}"),
+        "ProjectionExpression": "SK"
+    }
+    if start_key:
+        query_kwargs["ExclusiveStartKey"] = start_key
+    while True:
+        query_kwargs["Limit"] = limit - len(postings)
+        response = todo_list_table.query(**query_kwargs)
+        postings += [item["SK"] for item in response.get("Items", [])]
+        if "LastEvaluatedKey" not in response or len(postings) >= limit:
+            return postings, response.get("LastEvaluatedKey")
+        query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+def _posting_tasks(postings: List[str]) -> List[Tuple[str, str]]:
+    """ Distinct (tab_id, task_id) of posting keys, in order. """
+    return list(dict.fromkeys(search_index.parse_posting_sk(sort_key)[3:] for sort_key in postings))
+
+def _score_candidates(user_id: str, terms: List[str], rarities: List[float], candidates: List[Tuple[str, str]],
+                      found: Dict[str, Dict[str, Any]]) -> List[Tuple[str, str, float]]:
+    """
+    Reads the candidate tasks with BatchGetItem and scores them from their own text, dropping those
+    that do not match every term. Returns (tab_id, task_id, score), best first; the tasks read are added to `found`.
+    """
+    found.update((item["SK"], item) for item in _batch_get_todo_items(
+        [{"UserID": user_id, "SK": f"TASK#{tab_id}#{task_id}"} for tab_id, task_id in candidates]
+    ))
+    scored = []
+    for tab_id, task_id in candidates:
+        task = found.get(f"TASK#{tab_id}#{task_id}")
+        score = search_index.score_task(task, terms, rarities) if task else 0.0
+        if score:
+            scored.append((tab_id, task_id, score))
+    return sorted(scored, key=lambda entry: -entry[2])
+
+def _rank_multi_term(user_id: str, terms: List[str], wanted: int,
+                     found: Dict[str, Dict[str, Any]]) -> Tuple[List[Tuple[str, str, float]], bool, bool]:
+    """
+    Ranks a multi-word query starting from its rarest term. Returns (ranked, truncated, more):
+    truncated means candidates were left unchecked, more that a later page may still check them. Each term's first SEARCH_PROBE_POSTINGS postings are read
+    in parallel. If every list ended there, they are intersected as is. Otherwise the term with the
+    fewest postings (preferring one whose list ended, then the longest term) drives: its tasks are
+    read in rounds of SEARCH_PROBE_POSTINGS postings and checked directly against their text, after
+    dropping those missing from another term's complete list, until `wanted` matches are found or
+    SEARCH_MAX_POSTINGS_PER_TERM postings were read. Each round is ranked on its own and appended,
+    so the ranking of earlier pages does not change as later pages read more rounds.
+    """
+    with ThreadPoolExecutor(max_workers=len(terms)) as pool:
+        reads = list(pool.map(lambda term: contextvars.copy_context().run(_read_postings, user_id, term, SEARCH_PROBE_POSTINGS), terms))
+    complete = [set(_posting_tasks(postings)) if start_key is None else None for postings, start_key in reads]
+    if any(tasks is not None and not tasks for tasks in complete):
+        return [], False, False # Every term must match
+    if all(tasks is not None for tasks in complete):
+        return search_index.rank(terms, [postings for postings, _ in reads]), False, False
+
+    # A term whose list did not end counts as matching SEARCH_MAX_POSTINGS_PER_TERM tasks.
+    rarities = [search_index.rarity(len(tasks) if tasks is not None else search_index.SEARCH_MAX_POSTINGS_PER_TERM) for tasks in complete]
+    driver = min(range(len(terms)), key=lambda i: (complete[i] is None, len(reads[i][0]), -len(terms[i])))
+    postings, start_key = reads[driver]
+    read = len(postings)
+    checked: set = set()
+    ranked: List[Tuple[str, str, float]] = []
+    while True:
+        candidates = [key for key in _posting_tasks(postings) if key not in checked
+                      and all(tasks is None or key in tasks for i, tasks in enumerate(complete) if i != driver)]
+        checked.update(candidates)
+        ranked += _score_candidates(user_id, terms, rarities, candidates, found)
+        more = start_key is not None and read < search_index.SEARCH_MAX_POSTINGS_PER_TERM
+        if not more or len(ranked) >= wanted:
+            return ranked, start_key is not None, more
+        postings, start_key = _read_postings(user_id, terms[driver], SEARCH_PROBE_POSTINGS, start_key)
+        read += len(postings)
+
+@storage_operation
+def search_tasks(user_id: str, query: str, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Tasks across all tabs whose text or description contains every word of `query` (each as a
+    prefix), best match first. Returns {"items", "nextCursor", "truncated"}; each item is the task
+    plus its "score". truncated means not every posting of a term was considered: a single word
+    matched more than SEARCH_MAX_POSTINGS_PER_TERM tasks, or every word of a multi-word query
+    matched more than SEARCH_PROBE_POSTINGS (see _rank_multi_term). The page's tasks are read with
+    one BatchGetItem. Raises ValueError for a bad cursor and ClientError on failure.
+    """
+    terms = search_index.query_terms(query)
+    offset = search_index.decode_cursor(terms, cursor) if cursor else 0
+    empty = {"items": [], "nextCursor": None, "truncated": False}
+    if not terms or not todo_list_table:
+        return empty
+    limit = max(1, min(int(limit or SEARCH_PAGE_DEFAULT_LIMIT), SEARCH_PAGE_MAX_LIMIT))
+
+    found: Dict[str, Dict[str, Any]] = {}
+    if len(terms) == 1:
+        postings, start_key = _read_postings(user_id, terms[0])
+        ranked, truncated, more = search_index.rank(terms, [postings]), start_key is not None, False
+    else:
+        ranked, truncated, more = _rank_multi_term(user_id, terms, offset + limit, found)
+    if not ranked:
+        return {**empty, "truncated": truncated}
+
+    page = ranked[offset:offset + limit]
+    missing = [{"UserID": user_id, "SK": f"TASK#{tab_id}#{task_id}"} for tab_id, task_id, _ in page
+               if f"TASK#{tab_id}#{task_id}" not in found]
+    found.update((item["SK"], item) for item in _batch_get_todo_items(missing))
+    items = []
+    for tab_id, task_id, score in page:
+        task = found.get(f"TASK#{tab_id}#{task_id}")
+        # Skips postings left behind by a failed index write or a racing rebuild.
+        if task and search_index.score_task(task, terms, [1.0] * len(terms)):
+            items.append({**task, "score": score})
+    next_cursor = search_index.encode_cursor(terms, offset + limit) if more or offset + limit < len(ranked) else None
+    logger.info("Search for user %s: %s terms, %s matches, %s returned", user_id, len(terms), len(ranked), len(items))
+    return {"items": items, "nextCursor": next_cursor, "truncated": truncated}
+
 # --- MAIN FOR TESTING (Ensure tables are initialized before calling) ---
+# Run offline against the local engine with: TASKHIVE_STORAGE=sqlite TASKHIVE_SQLITE_PATH=:memory: python dynamodb_operations.py
 if __name__ == "__main__":
     # Basic logging for script execution
     logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -548,4 +2099,217 @@ if __name__ == "__main__":
         tasks_for_deleted_tab = get_tasks_for_tab(test_user_id, TEST_TAB_ID)
         assert len(tasks_for_deleted_tab) == 0, "Tasks for deleted tab were not all deleted"
 
+        # Test Change Feed (delta sync)
+        logger.info("\n--- TESTING CHANGE FEED ---")
+        sync_user_id = register_user(f"syncuser_{str(uuid.uuid4())[:6]}", test_password)["userId"]
+        def change_rows(user_id):
+            rows = todo_list_table.query(KeyConditionExpression=Key("UserID").eq(user_id) & Key("SK").begins_with("CHANGE#"))["Items"]
+            return [(int(row["seq"]), row["entity"]) for row in rows]
+        def backdate_changes(user_id, up_to_seq):
+            for seq, _ in change_rows(user_id):
+                if seq <= up_to_seq:
+                    todo_list_table.update_item(Key={"UserID": user_id, "SK": _change_sk(seq)}, UpdateExpression="SET changedAtMs = :old",
+                                                ExpressionAttributeValues={":old": 0})
+
+        sync_token = get_sync_token(sync_user_id)
+        assert decode_sync_token(sync_token)[0] == 0, "New user should start at change 0"
+        kept = add_task(sync_user_id, "main", "Kept task", "")
+        dropped = add_task(sync_user_id, "main", "Dropped task", "")
+        update_task(sync_user_id, "main", kept["taskId"], task_text="Kept task, edited")
+        delete_task(sync_user_id, "main", dropped["taskId"])
+        delta = get_changes_since(sync_user_id, sync_token)
+        logger.info(f"Delta after add/update/delete: {delta}")
+        assert [t["text"] for t in delta["tasks"]] == ["Kept task, edited"], "Sync should return the current state of changed tasks"
+        assert delta["deleted"] == [{"tabId": "main", "taskId": dropped["taskId"]}], "Sync should return a tombstone for the deleted task"
+        assert decode_sync_token(delta["syncToken"])[0] == 4 and not delta["hasMore"], "Sync token should cover all four changes"
+        sync_token = delta["syncToken"]
+
+        # A write that fails still writes a no-op row for its reserved number, so the feed has no gap.
+        unstubbed_put_item = todo_list_table.put_item
+        def failing_task_put(**kwargs):
+            if kwargs["Item"]["SK"].startswith("TASK#"):
+                raise ClientError({"Error": {"Code": "InternalServerError", "Message": "Injected failure"}}, "PutItem")
+            return unstubbed_put_item(**kwargs)
+        todo_list_table.put_item = failing_task_put
+        try:
+            assert add_task(sync_user_id, "main", "Never written", "") is None, "add_task should fail with the injected error"
+        finally:
+            todo_list_table.put_item = unstubbed_put_item
+        assert change_rows(sync_user_id)[-1] == (5, "none"), "A failed write should release its change number"
+        delta = get_changes_since(sync_user_id, sync_token)
+        assert not delta["tasks"] and not delta["deleted"] and decode_sync_token(delta["syncToken"])[0] == 5, "Sync should step over a released number"
+        sync_token = delta["syncToken"]
+
+        add_tasks_bulk(sync_user_id, "main", [{"text": "Imported one"}, {"text": "Imported two"}])
+        delta = get_changes_since(sync_user_id, sync_token)
+        assert delta["reloadTabs"] == ["main"] and not delta["tasks"], "A bulk import should ask for the tab to be reloaded"
+        sync_token = delta["syncToken"]
+
+        # Paging: SYNC_MAX_CHANGES rows per call, hasMore until the end.
+        for i in range(3):
+            add_task(sync_user_id, "main", f"Paged task {i}", "")
+        SYNC_MAX_CHANGES = 2
+        try:
+            first_page = get_changes_since(sync_user_id, sync_token)
+            second_page = get_changes_since(sync_user_id, first_page["syncToken"])
+        finally:
+            SYNC_MAX_CHANGES = 500
+        assert first_page["hasMore"] and len(first_page["tasks"]) == 2, "First sync page should report more changes"
+        assert not second_page["hasMore"] and len(second_page["tasks"]) == 1, "Second sync page should be the last"
+        sync_token = second_page["syncToken"]
+        last_seq = decode_sync_token(sync_token)[0]
+
+        # A lost change row holds the token back until it has settled, then is skipped.
+        add_task(sync_user_id, "main", "Behind a gap", "")
+        add_task(sync_user_id, "main", "After the gap", "")
+        todo_list_table.delete_item(Key={"UserID": sync_user_id, "SK": _change_sk(last_seq + 1)})
+        delta = get_changes_since(sync_user_id, sync_token)
+        assert decode_sync_token(delta["syncToken"])[0] == last_seq, "Sync should not pass an unsettled gap"
+        assert not delta["hasMore"], "hasMore should be false while the token cannot advance"
+        backdate_changes(sync_user_id, last_seq + 2)
+        delta = get_changes_since(sync_user_id, sync_token)
+        assert decode_sync_token(delta["syncToken"])[0] == last_seq + 2, "Sync should skip a settled gap"
+        assert [t["text"] for t in delta["tasks"]] == ["After the gap"], "Changes after a settled gap should be delivered"
+
+        # get_sync_token points at the newest settled change.
+        add_task(sync_user_id, "main", "Not settled yet", "")
+        assert decode_sync_token(get_sync_token(sync_user_id))[0] == last_seq + 2, "Sync token should stop at the newest settled change"
+
+        expired_token = base64.urlsafe_b64encode(json.dumps({"seq": 0, "at": 0}).encode("utf-8")).decode("ascii").rstrip("=")
+        assert get_changes_since(sync_user_id, expired_token) == {"reset": True}, "A token past the change retention should ask for a reset"
+
+        # Test Tab Counters (TABMETA taskCount / completedCount)
+        logger.info("\n--- TESTING TAB COUNTERS ---")
+        counter_user_id = register_user(f"countuser_{str(uuid.uuid4())[:6]}", test_password)["userId"]
+        def tab_counts(user_id, tab_id):
+            counts = get_tab_counts(user_id, [tab_id])[tab_id]
+            return counts["taskCount"], counts["completedCount"]
+
+        first = add_task(counter_user_id, "main", "Count me", "")
+        second = add_task(counter_user_id, "main", "Count me too", "", True)
+        add_task(counter_user_id, "main", "And me", "")
+        assert tab_counts(counter_user_id, "main") == (3, 1), "Counts after adds"
+        update_task(counter_user_id, "main", first["taskId"], completed=True)
+        assert tab_counts(counter_user_id, "main") == (3, 2), "Counts after completing a task"
+        delete_task(counter_user_id, "main", second["taskId"])
+        assert tab_counts(counter_user_id, "main") == (2, 1), "Counts after deleting a completed task"
+        add_tasks_bulk(counter_user_id, "main", [{"text": "Bulk open"}, {"text": "Bulk done", "completed": True}])
+        assert tab_counts(counter_user_id, "main") == (4, 2), "Counts after a bulk import"
+
+        # A tab whose counters were never initialized is recounted on first read.
+        todo_list_table.update_item(Key=_tab_meta_key(counter_user_id, "main"), UpdateExpression="SET taskCount = :wrong REMOVE countsInitialized",
+                                    ExpressionAttributeValues={":wrong": 99})
+        assert tab_counts(counter_user_id, "main") == (4, 2), "Uninitialized counters should be recounted"
+        assert todo_list_table.get_item(Key=_tab_meta_key(counter_user_id, "main"))["Item"].get("countsInitialized"), "The recount should be stored"
+
+        # A counter update that fails after its task write marks the counters for a recount.
+        version_before = get_tab_version(counter_user_id, "main")
+        unstubbed_update_item = todo_list_table.update_item
+        def failing_counter_update(**kwargs):
+            if "#taskCount :taskDelta" in kwargs.get("UpdateExpression", ""):
+                raise ClientError({"Error": {"Code": "ValidationException", "Message": "Injected failure"}}, "UpdateItem")
+            return unstubbed_update_item(**kwargs)
+        todo_list_table.update_item = failing_counter_update
+        try:
+            assert add_task(counter_user_id, "main", "Uncounted", "", True), "The task write itself should succeed"
+        finally:
+            todo_list_table.update_item = unstubbed_update_item
+        meta = todo_list_table.get_item(Key=_tab_meta_key(counter_user_id, "main"))["Item"]
+        assert not meta.get("countsInitialized") and int(meta["version"]) == version_before + 1, "Failed counter update should invalidate and bump the version"
+        assert tab_counts(counter_user_id, "main") == (5, 3), "Invalidated counters should be recounted"
+
+        # Test Batch Task Operations (parallel and atomic)
+        logger.info("\n--- TESTING BATCH TASK OPERATIONS ---")
+        batch_user_id = register_user(f"batchuser_{str(uuid.uuid4())[:6]}", test_password)["userId"]
+        batch_tasks = [add_task(batch_user_id, "main", f"Batch task {i}", "") for i in range(4)]
+        batch_ids = [task["taskId"] for task in batch_tasks]
+
+        results = apply_task_batch(batch_user_id, "main", [
+            {"action": "update", "taskId": batch_ids[0], "completed": True},
+            {"action": "delete", "taskId": batch_ids[1]},
+            {"action": "update", "taskId": "no-such-task", "completed": True},
+        ])
+        logger.info(f"Parallel batch results: {results}")
+        assert [r["success"] for r in results] == [True, True, False], "Parallel batch should apply the valid operations"
+        assert results[0]["task"]["completed"] and results[2]["error"] == "Task not found.", "Parallel batch results"
+        assert get_tab_counts(batch_user_id, ["main"])["main"]["taskCount"] == 3, "Parallel batch should adjust the counters"
+        assert get_tab_counts(batch_user_id, ["main"])["main"]["completedCount"] == 1, "Parallel batch should adjust the counters"
+        assert not any(t["taskId"] == "no-such-task" for t in get_tasks_for_tab(batch_user_id, "main")), "Batch updates must not create tasks"
+
+        meta_before = get_tab_counts(batch_user_id, ["main"])["main"]
+        results = apply_task_batch(batch_user_id, "main", [
+            {"action": "update", "taskId": batch_ids[2], "text": "Should not apply"},
+            {"action": "delete", "taskId": batch_ids[1]}, # Already deleted
+        ], atomic=True)
+        assert [r["success"] for r in results] == [False, False] and results[1]["error"] == "Task not found.", "Atomic batch should reject everything"
+        assert get_task(batch_user_id, "main", batch_ids[2])["text"] == "Batch task 2", "A rejected atomic batch must not write"
+        assert get_tab_counts(batch_user_id, ["main"])["main"] == meta_before, "A rejected atomic batch must not touch the counters"
+
+        subscription = event_bus.bus.subscribe(batch_user_id)
+        try:
+            results = apply_task_batch(batch_user_id, "main", [
+                {"action": "update", "taskId": batch_ids[2], "completed": True},
+                {"action": "delete", "taskId": batch_ids[0]},
+            ], atomic=True)
+            event = json.loads(subscription.get(timeout=1) or b"{}")
+        finally:
+            event_bus.bus.unsubscribe(subscription)
+        assert all(r["success"] for r in results), "Atomic batch should apply"
+        counts = get_tab_counts(batch_user_id, ["main"])["main"]
+        assert (counts["taskCount"], counts["completedCount"]) == (2, 1), "Atomic batch should write the counter deltas"
+        assert counts["version"] == meta_before["version"] + 1, "Atomic batch should bump the tab version once"
+        assert event.get("counts", {}).get("main") == counts, "Atomic batch event should carry the new counters"
+
+        # Test Task Search (multi-word intersection, rounds beyond the probe, paging, rebuild)
+        logger.info("\n--- TESTING TASK SEARCH ---")
+        search_user_id = register_user(f"searchuser_{str(uuid.uuid4())[:6]}", test_password)["userId"]
+        search_tasks_added = []
+        for i in range(24):
+            words = ["alpha"] + (["beta"] if i % 2 == 0 else []) + (["gamma"] if i % 8 == 0 else [])
+            search_tasks_added.append(add_task(search_user_id, "main", " ".join(words) + f" item{i}", ""))
+        def search_ids(query, limit):
+            ids, cursor = [], None
+            for _ in range(50): # Bounded, so a cursor that never ends fails instead of hanging
+                page = search_tasks(search_user_id, query, limit=limit, cursor=cursor)
+                ids += [item["taskId"] for item in page["items"]]
+                cursor = page["nextCursor"]
+                if not cursor:
+                    return ids
+            raise AssertionError(f"Search for {query!r} kept returning a nextCursor")
+
+        SEARCH_PROBE_POSTINGS = 5 # Fewer than 'alpha' and 'beta' match, so those queries read rounds
+        try:
+            gamma_ids = search_ids("gamma alpha", 20)
+            assert len(gamma_ids) == 3, "The rarest term's complete list should drive the intersection"
+            assert not search_tasks(search_user_id, "gamma alpha")["truncated"], "A complete rarest list gives complete results"
+            expected = {task["taskId"] for i, task in enumerate(search_tasks_added) if i % 2 == 0}
+            paged = search_ids("alp bet", 4)
+            whole = search_ids("alp bet", 100)
+            logger.info(f"Search 'alp bet': {len(paged)} paged, {len(whole)} in one page")
+            assert len(paged) == len(set(paged)) and set(paged) == expected, "Paging should return every match once"
+            assert paged == whole, "Ranking should not change across cursor pages"
+            assert not search_ids("alpha nomatch", 20), "Every term must match"
+        finally:
+            SEARCH_PROBE_POSTINGS = BATCH_GET_MAX_KEYS
+
+        # Rebuild from scratch; a task deleted while its page is being indexed gets no postings.
+        postings = todo_list_table.query(KeyConditionExpression=Key("UserID").eq(search_user_id) & Key("SK").begins_with(search_index.POSTING_PREFIX))["Items"]
+        for posting in postings:
+            todo_list_table.delete_item(Key={"UserID": search_user_id, "SK": posting["SK"]})
+        assert not search_ids("gamma", 20), "Search should find nothing without postings"
+        unstubbed_batch_get = _batch_get_todo_items
+        def racing_batch_get(keys):
+            todo_list_table.delete_item(Key={"UserID": search_user_id, "SK": f"TASK#main#{search_tasks_added[8]['taskId']}"})
+            return unstubbed_batch_get(keys)
+        _batch_get_todo_items = racing_batch_get
+        try:
+            assert rebuild_search_index(search_user_id) == 23, "Rebuild should index the tasks that still exist"
+        finally:
+            _batch_get_todo_items = unstubbed_batch_get
+        assert get_search_index_status(search_user_id) == "ready", "Rebuild should mark the index ready"
+        assert len(search_ids("gamma", 20)) == 2, "Rebuilt index should cover every remaining task"
+        assert not any(p["SK"].endswith(search_tasks_added[8]["taskId"]) for p in todo_list_table.query(
+            KeyConditionExpression=Key("UserID").eq(search_user_id) & Key("SK").begins_with(search_index.POSTING_PREFIX))["Items"]), \
+            "A task deleted during the rebuild should get no postings"
+
         logger.info("\n--- All tests in dynamodb_operations.py finished ---")
@@ -0,0 +1,289 @@
+"""
+In-process publish/subscribe for live task and tab changes (served as Server-Sent Events by
+GET /api/events in api.py).
+
+dynamodb_operations.py publishes one event per mutation, after the write. An event has the shape
+of a /api/sync delta ({"tasks", "deleted", "reloadTabs", "tabs", "counts"}, each key optional),
+so clients apply it with the same code. Events are hints: a missed or reordered one is repaired
+by the client's next sync, which it runs whenever its stream (re)connects or is told to resync.
+
+Subscribers are per user, each with a bounded queue (EVENTS_QUEUE_MAX_EVENTS). A subscriber that
+falls that far behind has its queue discarded and is told to resync instead, so a slow client
+never holds more than that in memory. Events caused by a client are not sent back to that
+client's own stream: api.py binds the X-Client-ID header of each request with bind_origin().
+
+Other worker processes learn about events through a fan-out backend (TASKHIVE_EVENTS_FANOUT):
+- local (default): none; the in-process stand-in for development, tests and single-worker servers
+- unix: Unix datagram sockets in TASKHIVE_EVENTS_DIR, one per worker process that has
+  subscribers, reaching every worker on the host
+
+A cross-host backend (Redis pub/sub, SNS, ...) implements FanoutBackend the same way.
+"""
+import atexit
+import contextvars
+import errno
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from metrics import registry
+import serialization
+
+EVENTS_FANOUT = os.environ.get("TASKHIVE_EVENTS_FANOUT", "local") # local | unix
+EVENTS_DIR = os.environ.get("TASKHIVE_EVENTS_DIR", "/tmp/taskhive-events") # unix fan-out: one socket per worker process
+EVENTS_QUEUE_MAX_EVENTS = int(os.environ.get("EVENTS_QUEUE_MAX_EVENTS", "256")) # Per subscriber; beyond it the subscriber is told to resync
+EVENTS_MAX_SUBSCRIBERS = int(os.environ.get("EVENTS_MAX_SUBSCRIBERS", "1000")) # Open streams per process
+EVENTS_MAX_MESSAGE_BYTES = 64 * 1024 # Larger events are replaced by a resync hint
+EVENTS_PEER_REFRESH_SECONDS = 1.0 # How long the unix fan-out reuses its listing of peer sockets
+
+logger = logging.getLogger(__name__)
+
+events_total = registry.counter(
+    "taskhive_events_total", "Live events by outcome: published, delivered, overflowed (subscriber told to resync), fanout_dropped.",
+    ("outcome",)
+)
+subscribers_gauge = registry.gauge("taskhive_event_subscribers", "Open event streams in this process.")
+
+_origin: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("event_origin", default=None)
+
+
+# --- Origins (the client a change came from) ---
+def bind_origin(client_id: Optional[str]) -> contextvars.Token:
+    return _origin.set(client_id)
+
+def reset_origin(token: contextvars.Token) -> None:
+    _origin.reset(token)
+
+
+# --- Subscriptions ---
+def encode(event: Dict[str, Any]) -> bytes:
+    return serialization.dumps_json(event)
+
+RESYNC_MESSAGE = encode({"resync": True}) # Tells a subscriber to run a full delta sync instead
+
+class Subscription:
+    """ One open stream: a bounded queue of encoded events for one user. """
+
+    def __init__(self, user_id: str, client_id: Optional[str], max_events: int = EVENTS_QUEUE_MAX_EVENTS):
+        self.user_id = user_id
+        self.client_id = client_id
+        self._queue: "queue.Queue[bytes]" = queue.Queue(maxsize=max_events)
+        self._overflowed = False
+
+    def offer(self, data: bytes) -> None:
+        try:
+            self._queue.put_nowait(data)
+            events_total.inc(outcome="delivered")
+        except queue.Full:
+            self._overflowed = True
+            events_total.inc(outcome="overflowed")
+
+    def get(self, timeout: float) -> Optional[bytes]:
+        """
+        The next encoded event, or None after `timeout` seconds without one. After an overflow the
+        queued events are dropped and the next call returns the resync event.
+        """
+        if self._overflowed:
+            self._overflowed = False
+            with self._queue.mutex:
+                self._queue.queue.clear()
+                self._queue.not_full.notify_all()
+            return RESYNC_MESSAGE
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+# --- Fan-out backends ---
+class FanoutBackend:
+    """ Carries encoded messages to the other worker processes, which hand them to deliver(). """
+    name = "base"
+
+    def start(self, deliver: Callable[[bytes], None]) -> None:
+        """ Starts receiving; called when this process gets its first subscriber. """
+
+    def publish(self, message: bytes) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class LocalFanout(FanoutBackend):
+    """ No other processes: events reach only this process's subscribers. """
+    name = "local"
+
+    def publish(self, message: bytes) -> None:
+        pass
+
+
+class UnixSocketFanout(FanoutBackend):
+    """
+    Same-host fan-out over Unix datagram sockets. A process binds <directory>/<pid>.sock once it
+    has subscribers and reads it on a daemon thread; publishers send each message to every other
+    socket in the directory without blocking. A full peer buffer drops the message (its
+    subscribers resync later); sockets of dead processes are removed when a send finds them.
+    """
+    name = "unix"
+
+    def __init__(self, directory: str = EVENTS_DIR):
+        self.directory = directory
+        self._path: Optional[str] = None
+        self._receiver: Optional[socket.socket] = None
+        self._sender: Optional[socket.socket] = None
+        self._peers: List[str] = []
+        self._peers_listed_at = 0.0
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _reset_after_fork(self) -> None:
+        # Sockets and the reader thread belong to the parent; this process starts its own.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._path = self._receiver = self._sender = None
+            self._peers, self._peers_listed_at = [], 0.0
+
+    def start(self, deliver: Callable[[bytes], None]) -> None:
+        with self._lock:
+            self._reset_after_fork()
+            if self._receiver is not None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"{os.getpid()}.sock")
+            if os.path.exists(path):
+                os.unlink(path) # Left by an earlier process with the same pid
+            receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            receiver.bind(path)
+            self._path, self._receiver = path, receiver
+            atexit.register(self.close)
+        threading.Thread(target=self._receive, args=(receiver, deliver), name="taskhive-events", daemon=True).start()
+        logger.info("Event fan-out listening on %s", path)
+
+    def _receive(self, receiver: socket.socket, deliver: Callable[[bytes], None]) -> None:
+        while True:
+            try:
+                message = receiver.recv(EVENTS_MAX_MESSAGE_BYTES + 1024)
+            except OSError:
+                return # Closed
+            try:
+                deliver(message)
+            except Exception:
+                logger.exception("Could not deliver a fanned-out event")
+
+    def _peer_paths(self) -> List[str]:
+        now = time.monotonic()
+        if now - self._peers_listed_at > EVENTS_PEER_REFRESH_SECONDS:
+            try:
+                self._peers = [entry.path for entry in os.scandir(self.directory)
+                               if entry.name.endswith(".sock") and entry.path != self._path]
+            except FileNotFoundError:
+                self._peers = []
+            self._peers_listed_at = now
+        return self._peers
+
+    def publish(self, message: bytes) -> None:
+        with self._lock:
+            self._reset_after_fork()
+            if self._sender is None:
+                self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                self._sender.setblocking(False)
+            sender = self._sender
+            peers = self._peer_paths()
+        for path in peers:
+            try:
+                sender.sendto(message, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                self._forget(path)
+            except OSError as e:
+                if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.ENOBUFS):
+                    raise
+                events_total.inc(outcome="fanout_dropped")
+
+    def _forget(self, path: str) -> None:
+        try:
+            os.unlink(path) # Nobody is reading it: its process has exited
+        except OSError:
+            pass
+        self._peers_listed_at = 0.0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._receiver is not None and self._pid == os.getpid():
+                self._receiver.close()
+                try:
+                    os.unlink(self._path)
+                except OSError:
+                    pass
+            self._receiver = None
+
+
+def create_fanout_backend(kind: Optional[str] = None) -> FanoutBackend:
+    """ Builds the fan-out named by `kind` or the TASKHIVE_EVENTS_FANOUT environment variable. """
+    kind = (kind or EVENTS_FANOUT).lower()
+    if kind == "local":
+        return LocalFanout()
+    if kind == "unix":
+        return UnixSocketFanout()
+    raise ValueError(f"Unknown event fan-out '{kind}'. Expected 'local' or 'unix'.")
+
+
+# --- Bus ---
+class EventBus:
+    def __init__(self, fanout: Optional[FanoutBackend] = None, max_subscribers: int = EVENTS_MAX_SUBSCRIBERS):
+        self.fanout = fanout or LocalFanout()
+        self.max_subscribers = max_subscribers
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: str, client_id: Optional[str] = None) -> Optional[Subscription]:
+        """ A new subscription for the user's events, or None if this process has max_subscribers open. """
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                return None
+            subscription = Subscription(user_id, client_id)
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+            subscribers_gauge.set(self._count)
+        self.fanout.start(self._deliver)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers and subscription in subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+                self._count -= 1
+                subscribers_gauge.set(self._count)
+
+    def publish(self, user_id: str, event: Dict[str, Any]) -> None:
+        """ Sends `event` to the user's subscribers in every process, except the stream of the client that caused it. """
+        data = encode(event)
+        if len(data) > EVENTS_MAX_MESSAGE_BYTES:
+            data = RESYNC_MESSAGE
+        origin = _origin.get()
+        events_total.inc(outcome="published")
+        self._offer(user_id, origin, data)
+        # user, origin and data in one datagram: "<user>\n<origin>\n<json>"
+        self.fanout.publish(b"\n".join((user_id.encode("utf-8"), (origin or "").encode("utf-8"), data)))
+
+    def _deliver(self, message: bytes) -> None:
+        user_id, origin, data = message.split(b"\n", 2)
+        self._offer(user_id.decode("utf-8"), origin.decode("utf-8") or None, data)
+
+    def _offer(self, user_id: str, origin: Optional[str], data: bytes) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            if origin is None or subscription.client_id != origin:
+                subscription.offer(data)
+
+
+bus = EventBus(create_fanout_backend())
@@ -0,0 +1,113 @@
+"""
+gunicorn settings for serving TaskHive in production:
+
+    gunicorn -c gunicorn.conf.py
+    GUNICORN_WORKER_CLASS=gevent gunicorn -c gunicorn.conf.py   # needs `pip install gevent`
+
+`python api.py` remains the development server. Every setting below can be overridden from the
+environment, so one file serves every deployment.
+
+Workers and threads
+- gthread (default): GUNICORN_WORKERS processes, each with GUNICORN_THREADS request threads.
+  Requests spend most of their time waiting on DynamoDB, so threads well beyond the core count
+  pay off; workers add CPU parallelism (bcrypt already runs in its own process pool).
+- gevent: one greenlet per request, up to GUNICORN_WORKER_CONNECTIONS per worker. Better for
+  many slow or idle connections; the standard library is monkey-patched below, before the app
+  (and with it boto3, urllib3 and ssl) is imported.
+
+DynamoDB connection pool
+The boto3 client's pool is per process and shared by its threads. Unless
+DYNAMODB_MAX_POOL_CONNECTIONS is set explicitly, it is sized to the worker's request
+concurrency plus DYNAMODB_POOL_HEADROOM connections for the fan-out of batch updates
+(TASK_BATCH_MAX_WORKERS) and background tab deletions (TAB_DELETE_MAX_WORKERS). Timeouts are
+set in storage_backends.py; retries and the circuit breaker in storage_resilience.py.
+
+preload_app imports the app once in the master, and when_ready builds the boto3 session and
+loads the service model there (storage otherwise connects lazily on first use). Each forked
+worker then builds its own client from that session and, with STORAGE_PREWARM_CONNECTIONS > 0,
+opens that many pooled connections before taking traffic. Cold-start phases are reported
+per process as taskhive_startup_seconds (see startup.py).
+
+Live event streams (GET /api/events)
+Each open stream holds a request slot for up to EVENTS_STREAM_MAX_SECONDS: a thread under
+gthread, a greenlet under gevent. Unless EVENTS_MAX_SUBSCRIBERS is set, a worker accepts streams
+on at most half its slots (503 beyond that), so ordinary requests always have threads left;
+deployments with many open pages should use gevent. With more than one worker, events are
+fanned out between them over Unix sockets (TASKHIVE_EVENTS_FANOUT=unix, the default here), so
+a change handled by one worker reaches streams held by the others.
+
+Sizing
+Benchmarked with benchmark.py --target against this config on a 1-vCPU host, SQLite storage
+with 5 ms injected latency per call standing in for DynamoDB round trips, 32 client threads
+(tab_list, task_create and task_get; p50 / p99 in ms, throughput in requests/s):
+
+    worker class  workers x threads   tab_list          task_create        task_get
+    gthread       1 x 4               42 / 53    735    201 / 225  158     60 / 73    525
+    gthread       1 x 16              47 / 71    658     92 / 151  338     48 / 78    641
+    gthread       1 x 32              44 / 89    689     81 / 401  304     47 / 105   618
+    gthread       2 x 16              43 / 99    669     79 / 281  319     46 / 104   640
+    gevent        1 (200 conns)        1 / 329   790     81 / 120  389     36 / 96    713
+    gevent        2 (200 conns)        4 / 133   731     84 / 137  356     35 / 92    702
+
+The load generator shared the single vCPU, so the ceiling here is CPU: at 4 threads,
+task_create (several storage calls per request) is latency-bound, and 16 threads double its
+throughput; beyond that, extra threads or workers only add queueing (p99 grows) until more
+vCPUs are available. The SQLite stand-in does not model the HTTP connection pool; against
+DynamoDB, a pool smaller than the thread count shows up as the same kind of p99 growth.
+
+Rules of thumb: start with one worker per vCPU and 16 threads per worker; add threads while
+p99 falls and CPU is below ~70%, add workers (and vCPUs) once CPU is the bottleneck. Keep
+GUNICORN_KEEPALIVE above the load balancer's idle timeout. Point the load balancer's health
+check at /readyz and the orchestrator's liveness probe at /healthz.
+"""
+import multiprocessing
+import os
+
+wsgi_app = "api:app"
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread") # gthread | gevent
+workers = int(os.environ.get("GUNICORN_WORKERS", str(multiprocessing.cpu_count())))
+threads = int(os.environ.get("GUNICORN_THREADS", "16")) # gthread: request threads per worker
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "200")) # gevent: concurrent requests per worker
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60")) # Seconds before a silent worker is restarted
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "75")) # Longer than an ALB's 60 s idle timeout, so the balancer closes first
+preload_app = True
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG") # "-" for stdout; off by default
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+DYNAMODB_POOL_HEADROOM = int(os.environ.get("DYNAMODB_POOL_HEADROOM", "16"))
+
+if worker_class == "gevent":
+    # Must run before preload_app imports the app, or ssl/urllib3 keep their blocking versions.
+    from gevent import monkey
+    monkey.patch_all()
+
+# Read by storage_backends.py when the app is imported, which happens after this file runs.
+os.environ.setdefault(
+    "DYNAMODB_MAX_POOL_CONNECTIONS",
+    str((worker_connections if worker_class == "gevent" else threads) + DYNAMODB_POOL_HEADROOM)
+)
+
+os.environ.setdefault("EVENTS_MAX_SUBSCRIBERS", str(max(1, (worker_connections if worker_class == "gevent" else threads) // 2)))
+if workers > 1:
+    os.environ.setdefault("TASKHIVE_EVENTS_FANOUT", "unix")
+
+
+def when_ready(server):
+    import dynamodb_operations as ddb
+    if ddb.storage_backend:
+        ddb.storage_backend.connect()
+
+
+def post_fork(server, worker):
+    import dynamodb_operations as ddb
+    import startup
+    startup.after_fork()
+    ddb.storage_after_fork()
+    ddb.prewarm_storage()
+
+
+def worker_exit(server, worker):
+    import dynamodb_operations as ddb
+    ddb.flush_pending_writes() # Buffered active-tab preferences (see write_behind.py)
@@ -0,0 +1,168 @@
+"""
+Bounded process pool for bcrypt work.
+
+bcrypt hashing and verification cost hundreds of milliseconds of CPU each. Done inline, a
+login burst ties up the request threads and the worker's CPU and stalls every other route. This module runs them in a small pool of worker processes instead:
+
+- At most PASSWORD_POOL_WORKERS hashes run at once, and at most PASSWORD_POOL_MAX_QUEUE more
+  wait for a worker. Anything beyond that fails fast with PasswordPoolBusy, which the API turns
+  into a 503 with Retry-After, rather than queueing behind work that will not finish in time.
+- BCRYPT_ROUNDS sets the cost factor for new hashes. needs_rehash() tells login_user when a
+  stored hash was made with a different cost so it can be upgraded transparently.
+- Hash time, queue depth and rejections are published on the metrics registry.
+
+PASSWORD_POOL_WORKERS=0 runs bcrypt inline on the calling thread, still subject to the queue
+limit, for environments where subprocesses are unavailable.
+"""
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+import bcrypt
+
+from metrics import registry
+
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+PASSWORD_POOL_WORKERS = int(os.environ.get("PASSWORD_POOL_WORKERS", str(max(1, min(4, os.cpu_count() or 1)))))
+PASSWORD_POOL_MAX_QUEUE = int(os.environ.get("PASSWORD_POOL_MAX_QUEUE", str(PASSWORD_POOL_WORKERS * 8)))
+PASSWORD_POOL_TIMEOUT_SECONDS = float(os.environ.get("PASSWORD_POOL_TIMEOUT_SECONDS", "10"))
+PASSWORD_POOL_RETRY_AFTER_SECONDS = int(os.environ.get("PASSWORD_POOL_RETRY_AFTER_SECONDS", "1"))
+
+logger = logging.getLogger(__name__)
+
+hash_seconds = registry.histogram(
+    "taskhive_password_hash_seconds", "Time spent inside bcrypt per operation.", ("operation",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0)
+)
+wait_seconds = registry.histogram(
+    "taskhive_password_pool_wait_seconds", "Time a password operation spent queued before a worker picked it up.",
+    ("operation",)
+)
+queue_depth = registry.gauge(
+    "taskhive_password_pool_queue_depth", "Password operations admitted to the pool and not yet finished."
+)
+rejected_total = registry.counter(
+    "taskhive_password_pool_rejected_total", "Password operations refused because the pool queue was full.",
+    ("operation",)
+)
+rehashed_total = registry.counter(
+    "taskhive_password_rehashed_total", "Stored password hashes upgraded to the configured bcrypt cost at login."
+)
+
+
+class PasswordPoolBusy(Exception):
+    """ Raised when the pool is at capacity. `retry_after` is a hint in whole seconds. """
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing capacity exhausted, retry later.")
+        self.retry_after = retry_after
+
+
+# Worker-side functions. They return the time spent in bcrypt itself, and the wall-clock start,
+# so the parent can separate hash time from time spent waiting in the queue.
+def _hash_in_worker(password: bytes, rounds: int) -> Tuple[bytes, float, float]:
+    started = time.time()
+    hashed = bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+    return hashed, started, time.time() - started
+
+def _check_in_worker(password: bytes, hashed: bytes) -> Tuple[bool, float, float]:
+    started = time.time()
+    matches = bcrypt.checkpw(password, hashed)
+    return matches, started, time.time() - started
+
+
+class PasswordPool:
+    def __init__(self, workers: int = PASSWORD_POOL_WORKERS, max_queue: int = PASSWORD_POOL_MAX_QUEUE,
+                 timeout_seconds: float = PASSWORD_POOL_TIMEOUT_SECONDS, rounds: int = BCRYPT_ROUNDS):
+        self.workers = workers
+        self.capacity = max(1, workers) + max(0, max_queue)
+        self.timeout_seconds = timeout_seconds
+        self.rounds = rounds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    def hash_password(self, password: str) -> bytes:
+        return self._run("hash", _hash_in_worker, password.encode("utf-8"), self.rounds)
+
+    def verify_password(self, password: str, hashed: bytes) -> bool:
+        return self._run("verify", _check_in_worker, password.encode("utf-8"), hashed)
+
+    def needs_rehash(self, hashed: bytes) -> bool:
+        """ True when `hashed` is a bcrypt hash whose cost differs from the configured rounds. """
+        try:
+            return int(hashed.split(b"$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _admit(self, operation: str) -> None:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                rejected_total.inc(operation=operation)
+                raise PasswordPoolBusy(PASSWORD_POOL_RETRY_AFTER_SECONDS)
+            self._in_flight += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created lazily, and again after a fork: a pool inherited from the parent is unusable.
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _run(self, operation: str, function: Callable, *args):
+        self._admit(operation)
+        submitted = time.time()
+        if self.workers <= 0:
+            try:
+                result, started, elapsed = function(*args)
+            finally:
+                self._release()
+        else:
+            try:
+                executor = self._get_executor()
+                future = executor.submit(function, *args)
+            except Exception:
+                self._release()
+                raise
+            # The slot is freed when the worker finishes, not when we stop waiting, so a timed-out
+            # hash still counts against capacity until it actually leaves the pool.
+            future.add_done_callback(lambda _: self._release())
+            try:
+                result, started, elapsed = future.result(timeout=self.timeout_seconds)
+            except FutureTimeoutError:
+                raise PasswordPoolBusy(PASSWORD_POOL_RETRY_AFTER_SECONDS)
+            except BrokenProcessPool:
+                logger.warning("Password pool worker died, the pool will be restarted on next use.")
+                with self._lock:
+                    if self._executor is executor:
+                        self._executor = None
+                raise
+        hash_seconds.observe(elapsed, operation=operation)
+        wait_seconds.observe(max(0.0, started - submitted), operation=operation)
+        return result
+
+
+password_pool = PasswordPool()
+queue_depth.set_function(lambda: password_pool.in_flight)
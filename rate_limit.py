@@ -0,0 +1,82 @@
+"""
+Per-user token-bucket rate limiting for the task and tab API.
+
+Routes are grouped into classes with their own budget (RATE_LIMITS): each user has one bucket
+per class that refills at `rate` tokens per second up to `burst`, and every request takes one
+token. A request that finds its bucket empty is refused (api.py answers 429 with Retry-After)
+without touching storage, so one runaway client, such as an import loop, spends its own budget
+instead of the table's capacity.
+
+Buckets live in the worker process: with several workers a user's effective budget is up to
+workers x rate, and a restart refills every bucket. At most RATE_LIMIT_MAX_KEYS buckets are
+kept per class; the least recently used is dropped first, which only ever refills it.
+
+- taskhive_rate_limit_total{route_class,outcome}: allowed and limited requests
+"""
+from collections import OrderedDict
+import math
+import os
+import threading
+import time
+from typing import Dict, Tuple
+
+from metrics import registry
+
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") != "0" # 0 turns every limiter off (benchmarks, load tests)
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "100000")) # Buckets kept per route class
+RATE_LIMIT_MAX_RETRY_AFTER_SECONDS = 3600 # Longest Retry-After sent; a class with rate 0 never refills, so its wait is infinite
+RATE_LIMITS: Dict[str, Tuple[float, float]] = { # route class -> (tokens per second, burst)
+    "read": (float(os.environ.get("RATE_LIMIT_READ_PER_SECOND", "50")), float(os.environ.get("RATE_LIMIT_READ_BURST", "100"))),
+    "write": (float(os.environ.get("RATE_LIMIT_WRITE_PER_SECOND", "20")), float(os.environ.get("RATE_LIMIT_WRITE_BURST", "40"))),
+    "bulk": (float(os.environ.get("RATE_LIMIT_BULK_PER_SECOND", "1")), float(os.environ.get("RATE_LIMIT_BULK_BURST", "10"))),
+}
+
+requests_total = registry.counter(
+    "taskhive_rate_limit_total", "Rate-limited requests by route class and outcome: allowed, limited.", ("route_class", "outcome")
+)
+
+
+class TokenBucketLimiter:
+    def __init__(self, name: str, rate: float, burst: float, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict() # key -> [tokens, refilled at]
+        self._lock = threading.Lock()
+        self._allowed = requests_total.labels(name, "allowed")
+        self._limited = requests_total.labels(name, "limited")
+
+    def acquire(self, key: str, cost: float = 1.0) -> float:
+        """ Takes `cost` tokens from the key's bucket. Returns 0.0 if it had them, else the seconds until it will. """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                wait = 0.0
+            else:
+                wait = (cost - bucket[0]) / self.rate if self.rate > 0 else math.inf
+        (self._limited if wait else self._allowed).inc()
+        return wait
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+limiters: Dict[str, TokenBucketLimiter] = {name: TokenBucketLimiter(name, rate, burst) for name, (rate, burst) in RATE_LIMITS.items()}
+
+def acquire(route_class: str, key: str) -> float:
+    """ 0.0 if `key` may make a request of `route_class` now, else the seconds to wait (see TokenBucketLimiter.acquire). """
+    if not RATE_LIMIT_ENABLED:
+        return 0.0
+    return limiters[route_class].acquire(key)
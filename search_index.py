@@ -0,0 +1,173 @@
+"""
+Tokenizing, posting keys and ranking for per-user task search.
+
+The index lives in the todo table next to the tasks it covers. Each task has one posting per
+distinct term of its text and description, an item with nothing but its key:
+
+    UserID=<user>, SK=SEARCH#<term>#<impact><recency>#<tabId>#<taskId>
+
+- Prefix matching is a key range: Query begins_with(SK, "SEARCH#<prefix>") returns the
+  postings of every term starting with <prefix>.
+- <impact> is SEARCH_MAX_WEIGHT minus the term's weight in the task (text occurrences count
+  TEXT_WEIGHT, description occurrences 1) and <recency> the task's createdAt with its digits
+  inverted, so each term's postings come back best-first, then newest-first, and a query that
+  stops after SEARCH_MAX_POSTINGS_PER_TERM keeps the best ones.
+- Posting keys are a pure function of the task, so writers can diff old and new postings
+  without reading the index (see dynamodb_operations._update_search_index).
+
+Ranking: a query matches tasks that contain every query term (as a prefix). A task's score sums,
+per query term, the weight of its best matching posting, halved for a prefix-only match, times
+1 / ln(e + number of tasks matching the term), so rarer terms count more. Ties go to newer tasks.
+A term whose postings were not all read counts as matching SEARCH_MAX_POSTINGS_PER_TERM tasks.
+"""
+import base64
+import json
+import math
+import os
+import re
+import unicodedata
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+SEARCH_MIN_TERM_CHARS = 2 # Shorter tokens are neither indexed nor searched
+SEARCH_MAX_TERM_CHARS = 32 # Longer tokens are cut to this length
+SEARCH_MAX_TERMS_PER_TASK = int(os.environ.get("SEARCH_MAX_TERMS_PER_TASK", "48")) # Bounds the postings written per task; text terms go first
+SEARCH_MAX_QUERY_TERMS = 8
+SEARCH_MAX_POSTINGS_PER_TERM = int(os.environ.get("SEARCH_MAX_POSTINGS_PER_TERM", "1000")) # Postings read per query term; beyond it results are marked truncated
+SEARCH_MAX_WEIGHT = 99
+TEXT_WEIGHT = 3
+PREFIX_MATCH_FACTOR = 0.5
+POSTING_PREFIX = "SEARCH#"
+
+STOPWORDS = frozenset((
+    "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "he", "in", "is", "it", "its", "of",
+    "on", "or", "that", "the", "this", "to", "was", "were", "will", "with",
+))
+
+_TOKEN_PATTERN = re.compile(r"[^\W_]+")
+_INVERT_DIGITS = str.maketrans("0123456789", "9876543210")
+
+
+# --- Tokenizing ---
+def normalize(text: str) -> str:
+    """ Case-folded, with accents removed, so "Café" and "cafe" match. """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """ Indexable tokens of `text`, in order, repeats included. """
+    if not text:
+        return []
+    return [token[:SEARCH_MAX_TERM_CHARS] for token in _TOKEN_PATTERN.findall(normalize(text))
+            if len(token) >= SEARCH_MIN_TERM_CHARS and token not in STOPWORDS]
+
+def task_terms(task: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """ term -> weight for a task item; empty for None. At most SEARCH_MAX_TERMS_PER_TASK terms, text terms first. """
+    weights: Dict[str, int] = {}
+    if not task:
+        return weights
+    for field, weight in (("text", TEXT_WEIGHT), ("description", 1)):
+        for token in tokenize(task.get(field)):
+            if token in weights:
+                weights[token] = min(SEARCH_MAX_WEIGHT, weights[token] + weight)
+            elif len(weights) < SEARCH_MAX_TERMS_PER_TASK:
+                weights[token] = weight
+    return weights
+
+def query_terms(query: str) -> List[str]:
+    """ Distinct search terms of a query string, in order, at most SEARCH_MAX_QUERY_TERMS. """
+    terms: List[str] = []
+    for token in tokenize(query):
+        if token not in terms:
+            terms.append(token)
+    return terms[:SEARCH_MAX_QUERY_TERMS]
+
+# --- Posting keys ---
+def _recency(created_at: Optional[str]) -> str:
+    """ The first 14 digits of an ISO timestamp with each digit inverted, so newer sorts first. """
+    digits = "".join(c for c in created_at or "" if c.isdigit())[:14].ljust(14, "0")
+    return digits.translate(_INVERT_DIGITS)
+
+def posting_sk(term: str, weight: int, created_at: Optional[str], tab_id: str, task_id: str) -> str:
+    impact = SEARCH_MAX_WEIGHT - min(weight, SEARCH_MAX_WEIGHT)
+    return f"{POSTING_PREFIX}{term}#{impact:02d}{_recency(created_at)}#{tab_id}#{task_id}"
+
+def parse_posting_sk(sort_key: str) -> Tuple[str, int, str, str, str]:
+    """ (term, weight, recency, tab_id, task_id) of a posting sort key; a lower recency is newer. """
+    term, order, rest = sort_key[len(POSTING_PREFIX):].split("#", 2)
+    tab_id, task_id = rest.rsplit("#", 1) # Tab ids may contain '#'; task ids never do
+    return term, SEARCH_MAX_WEIGHT - int(order[:2]), order[2:], tab_id, task_id
+
+def task_postings(task: Optional[Dict[str, Any]]) -> List[str]:
+    """ Posting sort keys for a task item (none for None); tab and task ids come from its SK. """
+    if not task:
+        return []
+    tab_id, task_id = task["SK"][len("TASK#"):].rsplit("#", 1)
+    return [posting_sk(term, weight, task.get("createdAt"), tab_id, task_id) for term, weight in task_terms(task).items()]
+
+def posting_changes(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> Tuple[List[str], List[str]]:
+    """ (posting sort keys to put, to delete) taking a task from `old` to `new`; either may be None. """
+    old_postings, new_postings = task_postings(old), task_postings(new)
+    return [p for p in new_postings if p not in old_postings], [p for p in old_postings if p not in new_postings]
+
+
+# --- Ranking ---
+def rarity(matching_tasks: int) -> float:
+    return 1.0 / math.log(math.e + matching_tasks)
+
+def rank(terms: List[str], postings_by_term: List[List[str]]) -> List[Tuple[str, str, float]]:
+    """
+    Ranks the tasks matching every term. postings_by_term[i] holds the posting sort keys read
+    for terms[i]. Returns (tab_id, task_id, score), best first.
+    """
+    scores: Optional[Dict[Tuple[str, str], float]] = None
+    recency: Dict[Tuple[str, str], str] = {}
+    for term, postings in zip(terms, postings_by_term):
+        best: Dict[Tuple[str, str], float] = {}
+        for sort_key in postings:
+            indexed_term, weight, recent, tab_id, task_id = parse_posting_sk(sort_key)
+            key = (tab_id, task_id)
+            value = weight * (1.0 if indexed_term == term else PREFIX_MATCH_FACTOR)
+            if value > best.get(key, 0.0):
+                best[key] = value
+            recency[key] = recent
+        factor = rarity(len(best))
+        if scores is None:
+            scores = {key: value * factor for key, value in best.items()}
+        else:
+            scores = {key: score + best[key] * factor for key, score in scores.items() if key in best}
+        if not scores:
+            return []
+    ranked = sorted((scores or {}).items(), key=lambda entry: (-entry[1], recency[entry[0]], entry[0]))
+    return [(tab_id, task_id, round(score, 4)) for (tab_id, task_id), score in ranked]
+
+def score_task(task: Dict[str, Any], terms: List[str], rarities: List[float]) -> float:
+    """ rank()'s score for one task, computed from its text; 0.0 if some term does not match. """
+    weights = task_terms(task)
+    score = 0.0
+    for term, factor in zip(terms, rarities):
+        best = max((weight * (1.0 if indexed == term else PREFIX_MATCH_FACTOR)
+                    for indexed, weight in weights.items() if indexed.startswith(term)), default=0.0)
+        if not best:
+            return 0.0
+        score += best * factor
+    return round(score, 4)
+
+
+# --- Cursors ---
+def encode_cursor(terms: List[str], offset: int) -> str:
+    """ Opaque cursor for the ranked results from `offset` on; tied to the query's terms. """
+    payload = json.dumps({"o": offset, "q": zlib.crc32("\x1f".join(terms).encode("utf-8"))}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+def decode_cursor(terms: List[str], cursor: str) -> int:
+    """ The offset in a cursor. Raises ValueError if it is malformed or was issued for another query. """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        offset, fingerprint = payload["o"], payload["q"]
+    except (ValueError, TypeError, KeyError, UnicodeError) as e:
+        raise ValueError("Invalid cursor.") from e
+    if not isinstance(offset, int) or offset < 0 or fingerprint != zlib.crc32("\x1f".join(terms).encode("utf-8")):
+        raise ValueError("Invalid cursor.")
+    return offset
@@ -0,0 +1,230 @@
+"""
+Response encoding for the API: DynamoDB type conversion, fast JSON, MessagePack and compression.
+
+boto3 returns every number as a Decimal and sets as Python sets. The encoders here turn
+integral Decimals into ints, other Decimals into floats, sets into sorted lists and Binary
+values into base64 (JSON) or raw bytes (MessagePack), without a separate conversion pass.
+
+JSON is encoded with orjson when it is installed and with the standard library otherwise.
+msgpack and brotli are optional in the same way: without msgpack, clients asking for
+application/msgpack get JSON; without brotli, only gzip is offered.
+
+api.py installs FastJSONProvider as app.json, so every jsonify() goes through this module, and
+finalize_response() as an after_request hook that compresses responses of at least
+COMPRESS_MIN_BYTES (streamed NDJSON is compressed chunk by chunk). Each representation gets its
+own strong ETag: the route's tag plus "-msgpack", "-gzip" or "-br". etag_base() strips these
+so If-None-Match still matches the route's tag.
+"""
+import base64
+import decimal
+import json
+import os
+import time
+import zlib
+from typing import Any, Iterable, Iterator, Optional
+
+from boto3.dynamodb.types import Binary
+from flask import Response, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+from metrics import add_request_phase, registry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024")) # Smaller bodies are not worth the CPU
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "4")) # Levels above ~5 cost far more CPU for little gain on JSON
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPE = "application/msgpack"
+MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, "application/x-msgpack")
+COMPRESSIBLE_MIMETYPES = {JSON_MIMETYPE, MSGPACK_MIMETYPE, "application/x-ndjson", "text/plain", "text/csv"}
+ETAG_SUFFIXES = ("-gzip", "-br", "-msgpack")
+
+response_bytes_total = registry.counter(
+    "taskhive_response_bytes_total", "Response body bytes before and after compression (buffered responses only).",
+    ("encoding", "stage")
+)
+compressed_total = registry.counter(
+    "taskhive_responses_compressed_total", "Responses sent with a Content-Encoding.", ("encoding",)
+)
+
+
+def _decimal_to_number(value: decimal.Decimal):
+    return int(value) if value == value.to_integral_value() else float(value)
+
+def _sorted_list(values) -> list:
+    try:
+        return sorted(values)
+    except TypeError:
+        return list(values)
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, decimal.Decimal):
+        return _decimal_to_number(value)
+    if isinstance(value, (set, frozenset)):
+        return _sorted_list(value)
+    if isinstance(value, Binary):
+        return base64.b64encode(value.value).decode("ascii")
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode("ascii")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, decimal.Decimal):
+        return _decimal_to_number(value)
+    if isinstance(value, (set, frozenset)):
+        return _sorted_list(value)
+    if isinstance(value, Binary):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not MessagePack serializable")
+
+
+def dumps_json(obj: Any) -> bytes:
+    """ Compact UTF-8 JSON for API payloads, including raw DynamoDB items. """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def dumps_msgpack(obj: Any) -> bytes:
+    return msgpack.packb(obj, default=_msgpack_default, use_bin_type=True)
+
+def wants_msgpack() -> bool:
+    """ True when the request prefers MessagePack over JSON and msgpack is installed. """
+    if msgpack is None or not has_request_context():
+        return False
+    return request.accept_mimetypes.best_match((JSON_MIMETYPE,) + MSGPACK_MIMETYPES, default=JSON_MIMETYPE) in MSGPACK_MIMETYPES
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """ Flask JSON provider backed by dumps_json(); jsonify() answers in MessagePack when the client prefers it. """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs: # Options such as indent= are only supported by the standard encoder
+            kwargs.setdefault("default", _json_default)
+            return json.dumps(obj, **kwargs)
+        return dumps_json(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        started = time.perf_counter()
+        if wants_msgpack():
+            body, mimetype = dumps_msgpack(obj), MSGPACK_MIMETYPE
+        else:
+            body, mimetype = dumps_json(obj) + b"\n", self.mimetype
+        add_request_phase("encode", time.perf_counter() - started)
+        return self._app.response_class(body, mimetype=mimetype)
+
+
+# --- Compression ---
+def negotiate_encoding() -> Optional[str]:
+    """ 'br' or 'gzip' from the request's Accept-Encoding (brotli preferred when installed), else None. """
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+class _StreamCompressor:
+    """ Incremental compressor; every chunk is flushed so a streamed response keeps streaming. """
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) # wbits=31: gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+def _compress_stream(chunks: Iterable, encoding: str) -> Iterator[bytes]:
+    compressor = _StreamCompressor(encoding)
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+def etag_base(tag: str) -> str:
+    """ The route's ETag behind a representation tag, i.e. without any -msgpack/-gzip/-br suffixes. """
+    stripped = True
+    while stripped:
+        stripped = False
+        for suffix in ETAG_SUFFIXES:
+            if tag.endswith(suffix):
+                tag, stripped = tag[:-len(suffix)], True
+    return tag
+
+def _suffix_etag(response: Response, suffix: str) -> None:
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{suffix}", weak)
+
+def finalize_response(response: Response) -> Response:
+    """ after_request hook: tags MessagePack bodies and compresses large enough bodies the client accepts. """
+    if response.mimetype == MSGPACK_MIMETYPE:
+        _suffix_etag(response, "msgpack")
+    if response.mimetype in (JSON_MIMETYPE, MSGPACK_MIMETYPE):
+        response.vary.add("Accept")
+    if (response.mimetype not in COMPRESSIBLE_MIMETYPES or response.direct_passthrough or request.method == "HEAD"
+            or not 200 <= response.status_code < 300 or response.status_code == 204 or "Content-Encoding" in response.headers):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate_encoding()
+    if response.is_streamed:
+        if encoding:
+            response.response = _compress_stream(response.response, encoding)
+            response.headers.pop("Content-Length", None)
+            response.headers["Content-Encoding"] = encoding
+            _suffix_etag(response, encoding)
+            compressed_total.inc(encoding=encoding)
+        return response
+
+    data = response.get_data()
+    if not encoding or len(data) < COMPRESS_MIN_BYTES:
+        response_bytes_total.inc(len(data), encoding="identity", stage="sent")
+        return response
+    started = time.perf_counter()
+    body = compress(data, encoding)
+    add_request_phase("compress", time.perf_counter() - started)
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    _suffix_etag(response, encoding)
+    compressed_total.inc(encoding=encoding)
+    response_bytes_total.inc(len(data), encoding=encoding, stage="raw")
+    response_bytes_total.inc(len(body), encoding=encoding, stage="sent")
+    return response
@@ -0,0 +1,952 @@
+"""
+SQLite storage backend: a local stand-in for the two DynamoDB tables.
+
+SQLiteTable implements the part of the boto3 Table API that dynamodb_operations.py uses,
+including DynamoDB condition, key-condition, projection and update expressions, so the
+storage functions run unchanged against it. Items are stored as DynamoDB-typed JSON in one
+SQLite table per DynamoDB table, keyed by (pk, sk). The primary key doubles as the index for
+`UserID = :u AND begins_with(SK, :prefix)` queries, which become range scans.
+
+The database runs in WAL mode. File databases use one connection per thread so readers do
+not block each other. ':memory:' databases share one connection behind a lock. Query pages
+stop at 1 MB like DynamoDB, so LastEvaluatedKey handling runs locally too. latency_seconds
+adds a fixed delay to every call to simulate network round trips.
+"""
+import base64
+from contextlib import contextmanager
+import json
+import math
+import random
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+from boto3.dynamodb.types import Binary, TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+from storage_backends import StorageBackend
+
+QUERY_PAGE_MAX_BYTES = 1024 * 1024 # DynamoDB stops a Query page at 1 MB of data read
+TRANSACT_MAX_ITEMS = 100 # TransactWriteItems limit
+BATCH_GET_MAX_KEYS = 100 # BatchGetItem limit
+_MISSING = object()
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def _client_error(code: str, message: str, operation: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": message}}, operation)
+
+def _validation_error(message: str, operation: str = "") -> ClientError:
+    return _client_error("ValidationException", message, operation)
+
+
+# --- Item encoding ---
+def _av_to_json(av: Dict[str, Any]) -> Dict[str, Any]:
+    (type_tag, value), = av.items()
+    if type_tag == "B":
+        return {"B": base64.b64encode(value).decode("ascii")}
+    if type_tag == "BS":
+        return {"BS": [base64.b64encode(v).decode("ascii") for v in value]}
+    if type_tag == "L":
+        return {"L": [_av_to_json(v) for v in value]}
+    if type_tag == "M":
+        return {"M": {k: _av_to_json(v) for k, v in value.items()}}
+    return av
+
+def _av_from_json(av: Dict[str, Any]) -> Dict[str, Any]:
+    (type_tag, value), = av.items()
+    if type_tag == "B":
+        return {"B": base64.b64decode(value)}
+    if type_tag == "BS":
+        return {"BS": [base64.b64decode(v) for v in value]}
+    if type_tag == "L":
+        return {"L": [_av_from_json(v) for v in value]}
+    if type_tag == "M":
+        return {"M": {k: _av_from_json(v) for k, v in value.items()}}
+    return av
+
+def encode_item(item: Dict[str, Any]) -> str:
+    """ Serializes a Python item to DynamoDB-typed JSON. Rejects floats, as boto3 does. """
+    return json.dumps({k: _av_to_json(_serializer.serialize(v)) for k, v in item.items()}, separators=(",", ":"))
+
+def decode_item(data: str) -> Dict[str, Any]:
+    """ Deserializes stored JSON into the same Python types boto3 returns (Decimal, Binary, set). """
+    return {k: _deserializer.deserialize(_av_from_json(v)) for k, v in json.loads(data).items()}
+
+def normalize_value(value: Any) -> Any:
+    """ Round-trips a value through the DynamoDB type system (int -> Decimal, bytes -> Binary). """
+    return _deserializer.deserialize(_serializer.serialize(value))
+
+
+# --- Expression parsing ---
+_TOKEN_RE = re.compile(r"""\s*(?:
+    (?P<name>\#[A-Za-z0-9_]+)
+  | (?P<value>:[A-Za-z0-9_]+)
+  | (?P<number>\d+)
+  | (?P<op><>|<=|>=|=|<|>|\(|\)|,|\.|\[|\]|\+|-)
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+)""", re.VERBOSE)
+
+_UPDATE_CLAUSES = ("SET", "REMOVE", "ADD", "DELETE")
+
+
+class _Parser:
+    """ Recursive-descent parser for DynamoDB expressions. Produces small tuple-based ASTs. """
+
+    def __init__(self, text: str, names: Optional[Dict[str, str]]):
+        self.names = names or {}
+        self.tokens: List[Tuple[str, str]] = []
+        position = 0
+        text = text.strip()
+        while position < len(text):
+            match = _TOKEN_RE.match(text, position)
+            if not match or match.end() == position:
+                raise _validation_error(f"Invalid expression: unexpected character at '{text[position:position + 10]}'")
+            kind = match.lastgroup
+            self.tokens.append((kind, match.group(kind)))
+            position = match.end()
+            while position < len(text) and text[position].isspace():
+                position += 1
+        self.index = 0
+
+    # Token helpers
+    def peek(self, offset: int = 0) -> Tuple[Optional[str], Optional[str]]:
+        i = self.index + offset
+        return self.tokens[i] if i < len(self.tokens) else (None, None)
+
+    def next(self) -> Tuple[Optional[str], Optional[str]]:
+        token = self.peek()
+        self.index += 1
+        return token
+
+    def at_keyword(self, *keywords: str) -> bool:
+        kind, text = self.peek()
+        return kind == "ident" and text.upper() in keywords
+
+    def expect_op(self, op: str) -> None:
+        kind, text = self.next()
+        if kind != "op" or text != op:
+            raise _validation_error(f"Invalid expression: expected '{op}', got '{text}'")
+
+    def at_op(self, op: str) -> bool:
+        kind, text = self.peek()
+        return kind == "op" and text == op
+
+    def done(self) -> bool:
+        return self.index >= len(self.tokens)
+
+    def ensure_done(self) -> None:
+        if not self.done():
+            raise _validation_error(f"Invalid expression: unexpected token '{self.peek()[1]}'")
+
+    # Paths and operands
+    def attribute_name(self) -> str:
+        kind, text = self.next()
+        if kind == "name":
+            if text not in self.names:
+                raise _validation_error(f"An expression attribute name used in the document path is not defined; attribute name: {text}")
+            return self.names[text]
+        if kind == "ident":
+            return text
+        raise _validation_error(f"Invalid expression: expected an attribute name, got '{text}'")
+
+    def path(self) -> Tuple[str, List[Any]]:
+        elements: List[Any] = [self.attribute_name()]
+        while True:
+            if self.at_op("."):
+                self.next()
+                elements.append(self.attribute_name())
+            elif self.at_op("["):
+                self.next()
+                kind, text = self.next()
+                if kind != "number":
+                    raise _validation_error("Invalid expression: list index must be a number")
+                elements.append(int(text))
+                self.expect_op("]")
+            else:
+                return ("path", elements)
+
+    def operand(self) -> Tuple:
+        kind, text = self.peek()
+        if kind == "value":
+            self.next()
+            return ("value", text)
+        if kind == "ident" and self.peek(1) == ("op", "(") and text.lower() == "size":
+            self.next(); self.next()
+            path = self.path()
+            self.expect_op(")")
+            return ("size", path)
+        return self.path()
+
+    # Conditions
+    def condition(self) -> Tuple:
+        node = self.and_condition()
+        while self.at_keyword("OR"):
+            self.next()
+            node = ("or", node, self.and_condition())
+        return node
+
+    def and_condition(self) -> Tuple:
+        node = self.not_condition()
+        while self.at_keyword("AND"):
+            self.next()
+            node = ("and", node, self.not_condition())
+        return node
+
+    def not_condition(self) -> Tuple:
+        if self.at_keyword("NOT"):
+            self.next()
+            return ("not", self.not_condition())
+        return self.primary_condition()
+
+    def primary_condition(self) -> Tuple:
+        if self.at_op("("):
+            self.next()
+            node = self.condition()
+            self.expect_op(")")
+            return node
+        kind, text = self.peek()
+        if kind == "ident" and self.peek(1) == ("op", "(") and text.lower() != "size":
+            function = text.lower()
+            self.next(); self.next()
+            args = [self.operand()]
+            while self.at_op(","):
+                self.next()
+                args.append(self.operand())
+            self.expect_op(")")
+            if function not in ("attribute_exists", "attribute_not_exists", "attribute_type", "begins_with", "contains"):
+                raise _validation_error(f"Invalid function name; function: {function}")
+            return ("func", function, args)
+        left = self.operand()
+        if self.at_keyword("BETWEEN"):
+            self.next()
+            low = self.operand()
+            if not self.at_keyword("AND"):
+                raise _validation_error("Invalid expression: BETWEEN requires AND")
+            self.next()
+            return ("between", left, low, self.operand())
+        if self.at_keyword("IN"):
+            self.next()
+            self.expect_op("(")
+            options = [self.operand()]
+            while self.at_op(","):
+                self.next()
+                options.append(self.operand())
+            self.expect_op(")")
+            return ("in", left, options)
+        kind, op = self.next()
+        if kind != "op" or op not in ("=", "<>", "<", "<=", ">", ">="):
+            raise _validation_error(f"Invalid expression: expected a comparator, got '{op}'")
+        return ("cmp", op, left, self.operand())
+
+    # Update expressions
+    def update(self) -> Dict[str, List[Tuple]]:
+        clauses: Dict[str, List[Tuple]] = {"SET": [], "REMOVE": [], "ADD": [], "DELETE": []}
+        if self.done():
+            raise _validation_error("Invalid UpdateExpression: empty expression")
+        while not self.done():
+            if not self.at_keyword(*_UPDATE_CLAUSES):
+                raise _validation_error(f"Invalid UpdateExpression: unexpected token '{self.peek()[1]}'")
+            clause = self.next()[1].upper()
+            while True:
+                path = self.path()
+                if clause == "SET":
+                    self.expect_op("=")
+                    clauses["SET"].append((path, self.set_value()))
+                elif clause == "REMOVE":
+                    clauses["REMOVE"].append((path,))
+                else:
+                    clauses[clause].append((path, self.operand()))
+                if not self.at_op(","):
+                    break
+                self.next()
+        return clauses
+
+    def set_value(self) -> Tuple:
+        left = self.set_term()
+        if self.at_op("+") or self.at_op("-"):
+            op = self.next()[1]
+            return ("arith", op, left, self.set_term())
+        return left
+
+    def set_term(self) -> Tuple:
+        kind, text = self.peek()
+        if kind == "ident" and self.peek(1) == ("op", "(") and text.lower() in ("if_not_exists", "list_append"):
+            function = text.lower()
+            self.next(); self.next()
+            first = self.set_term()
+            self.expect_op(",")
+            second = self.set_term()
+            self.expect_op(")")
+            return (function, first, second)
+        return self.operand()
+
+    # Projections
+    def projection(self) -> List[List[Any]]:
+        paths = [self.path()[1]]
+        while self.at_op(","):
+            self.next()
+            paths.append(self.path()[1])
+        self.ensure_done()
+        return paths
+
+
+def parse_condition(text: str, names: Optional[Dict[str, str]]) -> Tuple:
+    parser = _Parser(text, names)
+    node = parser.condition()
+    parser.ensure_done()
+    return node
+
+def parse_update(text: str, names: Optional[Dict[str, str]]) -> Dict[str, List[Tuple]]:
+    return _Parser(text, names).update()
+
+def parse_projection(text: str, names: Optional[Dict[str, str]]) -> List[List[Any]]:
+    return _Parser(text, names).projection()
+
+
+# --- Expression evaluation ---
+def _type_tag(value: Any) -> str:
+    if value is None: return "NULL"
+    if isinstance(value, bool): return "BOOL"
+    if isinstance(value, str): return "S"
+    if isinstance(value, (Binary, bytes)): return "B"
+    if isinstance(value, (list, tuple)): return "L"
+    if isinstance(value, dict): return "M"
+    if isinstance(value, (set, frozenset)):
+        sample = next(iter(value), "")
+        return "SS" if isinstance(sample, str) else "BS" if isinstance(sample, (Binary, bytes)) else "NS"
+    return "N"
+
+def _comparable(value: Any) -> Any:
+    return value.value if isinstance(value, Binary) else value
+
+def _values_equal(left: Any, right: Any) -> bool:
+    if left is _MISSING or right is _MISSING or _type_tag(left) != _type_tag(right):
+        return False
+    return _comparable(left) == _comparable(right)
+
+def resolve_path(item: Dict[str, Any], path: List[Any]) -> Any:
+    current: Any = item
+    for element in path:
+        if isinstance(element, int):
+            if not isinstance(current, list) or element >= len(current):
+                return _MISSING
+        elif not isinstance(current, dict) or element not in current:
+            return _MISSING
+        current = current[element]
+    return current
+
+
+class _Evaluator:
+    def __init__(self, values: Optional[Dict[str, Any]]):
+        self.values = {k: normalize_value(v) for k, v in (values or {}).items()}
+
+    def value(self, name: str) -> Any:
+        if name not in self.values:
+            raise _validation_error(f"An expression attribute value used in expression is not defined; attribute value: {name}")
+        return self.values[name]
+
+    def operand(self, item: Dict[str, Any], node: Tuple) -> Any:
+        kind = node[0]
+        if kind == "value":
+            return self.value(node[1])
+        if kind == "path":
+            return resolve_path(item, node[1])
+        if kind == "size":
+            target = resolve_path(item, node[1][1])
+            if target is _MISSING or not hasattr(_comparable(target), "__len__"):
+                return _MISSING
+            return len(_comparable(target))
+        raise _validation_error(f"Invalid operand: {kind}")
+
+    def condition(self, item: Dict[str, Any], node: Tuple) -> bool:
+        kind = node[0]
+        if kind == "and":
+            return self.condition(item, node[1]) and self.condition(item, node[2])
+        if kind == "or":
+            return self.condition(item, node[1]) or self.condition(item, node[2])
+        if kind == "not":
+            return not self.condition(item, node[1])
+        if kind == "cmp":
+            return self.compare(node[1], self.operand(item, node[2]), self.operand(item, node[3]))
+        if kind == "between":
+            value = self.operand(item, node[1])
+            return self.compare(">=", value, self.operand(item, node[2])) and self.compare("<=", value, self.operand(item, node[3]))
+        if kind == "in":
+            value = self.operand(item, node[1])
+            return any(_values_equal(value, self.operand(item, option)) for option in node[2])
+        if kind == "func":
+            return self.function(item, node[1], node[2])
+        raise _validation_error(f"Invalid condition node: {kind}")
+
+    def compare(self, op: str, left: Any, right: Any) -> bool:
+        if op == "=":
+            return _values_equal(left, right)
+        if op == "<>":
+            return left is not _MISSING and right is not _MISSING and not _values_equal(left, right)
+        if left is _MISSING or right is _MISSING:
+            return False
+        left_tag, right_tag = _type_tag(left), _type_tag(right)
+        if left_tag != right_tag or left_tag not in ("N", "S", "B"):
+            return False
+        left, right = _comparable(left), _comparable(right)
+        return {"<": left < right, "<=": left <= right, ">": left > right, ">=": left >= right}[op]
+
+    def function(self, item: Dict[str, Any], name: str, args: List[Tuple]) -> bool:
+        if name in ("attribute_exists", "attribute_not_exists"):
+            if args[0][0] != "path":
+                raise _validation_error(f"Invalid {name} argument: expected a document path")
+            exists = resolve_path(item, args[0][1]) is not _MISSING
+            return exists if name == "attribute_exists" else not exists
+        target = self.operand(item, args[0])
+        operand = self.operand(item, args[1])
+        if target is _MISSING or operand is _MISSING:
+            return False
+        if name == "attribute_type":
+            return _type_tag(target) == operand
+        if name == "begins_with":
+            target, operand = _comparable(target), _comparable(operand)
+            if isinstance(target, str) and isinstance(operand, str):
+                return target.startswith(operand)
+            if isinstance(target, bytes) and isinstance(operand, bytes):
+                return target.startswith(operand)
+            return False
+        # contains
+        if isinstance(target, str):
+            return isinstance(operand, str) and operand in target
+        if isinstance(target, (set, frozenset, list)):
+            return any(_values_equal(member, operand) for member in target)
+        return False
+
+    def set_value(self, item: Dict[str, Any], node: Tuple) -> Any:
+        kind = node[0]
+        if kind == "if_not_exists":
+            existing = resolve_path(item, node[1][1]) if node[1][0] == "path" else _MISSING
+            return existing if existing is not _MISSING else self.set_value(item, node[2])
+        if kind == "list_append":
+            first, second = self.set_value(item, node[1]), self.set_value(item, node[2])
+            if not isinstance(first, list) or not isinstance(second, list):
+                raise _validation_error("An operand in the update expression has an incorrect data type")
+            return list(first) + list(second)
+        if kind == "arith":
+            left, right = self.set_value(item, node[2]), self.set_value(item, node[3])
+            if _type_tag(left) != "N" or _type_tag(right) != "N":
+                raise _validation_error("An operand in the update expression has an incorrect data type")
+            return left + right if node[1] == "+" else left - right
+        value = self.operand(item, node)
+        if value is _MISSING:
+            raise _validation_error("The provided expression refers to an attribute that does not exist in the item")
+        return value
+
+
+def _assign_path(item: Dict[str, Any], path: List[Any], value: Any) -> None:
+    parent = resolve_path(item, path[:-1]) if len(path) > 1 else item
+    last = path[-1]
+    if isinstance(last, int) and isinstance(parent, list):
+        if last >= len(parent):
+            parent.append(value)
+        else:
+            parent[last] = value
+    elif isinstance(last, str) and isinstance(parent, dict):
+        parent[last] = value
+    else:
+        raise _validation_error("The document path provided in the update expression is invalid for update")
+
+def _remove_paths(item: Dict[str, Any], paths: List[List[Any]]) -> None:
+    # List indexes refer to the list as it was before the update, so remove the highest indexes first.
+    for path in sorted(paths, key=lambda p: p[-1] if isinstance(p[-1], int) else -1, reverse=True):
+        parent = resolve_path(item, path[:-1]) if len(path) > 1 else item
+        last = path[-1]
+        if isinstance(last, int) and isinstance(parent, list) and last < len(parent):
+            del parent[last]
+        elif isinstance(last, str) and isinstance(parent, dict):
+            parent.pop(last, None)
+
+def apply_update(item: Dict[str, Any], clauses: Dict[str, List[Tuple]], evaluator: _Evaluator, key_names: Tuple[str, ...]) -> List[str]:
+    """ Applies a parsed update expression in place and returns the top-level attributes it touched. """
+    touched: List[str] = []
+    all_paths = [action[0][1] for actions in clauses.values() for action in actions]
+    for path in all_paths:
+        if path[0] in key_names:
+            raise _validation_error(f"Cannot update attribute {path[0]}. This attribute is part of the key")
+        touched.append(path[0])
+    # All SET values are computed against the item as it was before the update, then assigned.
+    set_values = [(path[1], evaluator.set_value(item, value)) for path, value in clauses["SET"]]
+    for path, value in set_values:
+        _assign_path(item, path, value)
+    _remove_paths(item, [action[0][1] for action in clauses["REMOVE"]])
+    for (_, path), operand in clauses["ADD"]:
+        delta = evaluator.operand(item, operand)
+        existing = resolve_path(item, path)
+        if existing is _MISSING:
+            _assign_path(item, path, delta)
+        elif _type_tag(existing) == "N" and _type_tag(delta) == "N":
+            _assign_path(item, path, existing + delta)
+        elif isinstance(existing, (set, frozenset)) and isinstance(delta, (set, frozenset)):
+            _assign_path(item, path, set(existing) | set(delta))
+        else:
+            raise _validation_error("An operand in the update expression has an incorrect data type")
+    for (_, path), operand in clauses["DELETE"]:
+        delta = evaluator.operand(item, operand)
+        existing = resolve_path(item, path)
+        if isinstance(existing, (set, frozenset)) and isinstance(delta, (set, frozenset)):
+            remaining = set(existing) - set(delta)
+            if remaining:
+                _assign_path(item, path, remaining)
+            else:
+                _remove_paths(item, [path])
+    return list(dict.fromkeys(touched))
+
+def project_item(item: Dict[str, Any], paths: List[List[Any]]) -> Dict[str, Any]:
+    projected: Dict[str, Any] = {}
+    for path in paths:
+        value = resolve_path(item, path)
+        if value is _MISSING:
+            continue
+        if len(path) == 1:
+            projected[path[0]] = value
+            continue
+        # Nested paths keep their enclosing maps (list positions are compacted, as in DynamoDB).
+        target = projected
+        for element, next_element in zip(path[:-1], path[1:]):
+            container = target.get(element) if isinstance(target, dict) else None
+            if container is None:
+                container = [] if isinstance(next_element, int) else {}
+                if isinstance(target, dict):
+                    target[element] = container
+                else:
+                    target.append(container)
+            target = container
+        if isinstance(target, dict):
+            target[path[-1]] = value
+        else:
+            target.append(value)
+    return projected
+
+
+# --- Expression plumbing shared by table operations ---
+def _resolve_expression(expression: Any, names: Optional[Dict[str, str]], values: Optional[Dict[str, Any]],
+                        builder: ConditionExpressionBuilder, is_key_condition: bool = False) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+    """ Accepts an expression string or a boto3 Key/Attr condition and returns (text, names, values). """
+    names = dict(names or {})
+    values = dict(values or {})
+    if isinstance(expression, ConditionBase):
+        built = builder.build_expression(expression, is_key_condition=is_key_condition)
+        names.update(built.attribute_name_placeholders)
+        values.update(built.attribute_value_placeholders)
+        return built.condition_expression, names, values
+    return expression, names, values
+
+def _capacity_units(size_bytes: int, unit_bytes: int, factor: float = 1.0) -> float:
+    return max(1, math.ceil(size_bytes / unit_bytes)) * factor
+
+
+class _SQLiteStore:
+    """ Connection management: per-thread connections for file databases, one locked connection for ':memory:'. """
+
+    def __init__(self, path: str, latency_seconds: float = 0.0, latency_jitter_seconds: float = 0.0):
+        self.path = path
+        self.latency_seconds = latency_seconds
+        self.latency_jitter_seconds = latency_jitter_seconds
+        self.is_memory = path == ":memory:"
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._shared: Optional[sqlite3.Connection] = self._open() if self.is_memory else None
+
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def simulate_latency(self) -> None:
+        delay = self.latency_seconds + (random.random() * self.latency_jitter_seconds if self.latency_jitter_seconds else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        if self.is_memory:
+            with self._lock:
+                yield self._shared
+            return
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._open()
+        yield connection
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """ BEGIN IMMEDIATE ... COMMIT, so read-modify-write operations are atomic across threads. """
+        with self.connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def after_fork(self) -> None:
+        # Connections must not cross a fork. ':memory:' keeps its copy: it is the only copy of the data.
+        self._local = threading.local()
+
+    def close(self) -> None:
+        if self._shared is not None:
+            self._shared.close()
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+class SQLiteTable:
+    """ A DynamoDB table stored in SQLite, exposing the boto3 Table methods used by dynamodb_operations.py. """
+
+    def __init__(self, store: _SQLiteStore, name: str, hash_key: str, range_key: Optional[str] = None):
+        self.store = store
+        self.name = self.table_name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.key_names = (hash_key,) + ((range_key,) if range_key else ())
+        self._sql_name = '"' + name.replace('"', '""') + '"'
+        with store.connection() as connection:
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self._sql_name} ("
+                "pk TEXT NOT NULL, sk TEXT NOT NULL DEFAULT '', item TEXT NOT NULL, PRIMARY KEY (pk, sk)) WITHOUT ROWID"
+            )
+
+    # Key helpers
+    def _key_tuple(self, key: Dict[str, Any], operation: str) -> Tuple[str, str]:
+        if set(key) != set(self.key_names):
+            raise _validation_error("The provided key element does not match the schema", operation)
+        return str(key[self.hash_key]), str(key[self.range_key]) if self.range_key else ""
+
+    def _key_of(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        return {name: item[name] for name in self.key_names}
+
+    def _load(self, connection: sqlite3.Connection, pk: str, sk: str) -> Optional[Dict[str, Any]]:
+        row = connection.execute(f"SELECT item FROM {self._sql_name} WHERE pk = ? AND sk = ?", (pk, sk)).fetchone()
+        return decode_item(row[0]) if row else None
+
+    def _store_item(self, connection: sqlite3.Connection, item: Dict[str, Any], operation: str) -> int:
+        pk, sk = self._key_tuple(self._key_of(item), operation)
+        data = encode_item(item)
+        connection.execute(f"INSERT OR REPLACE INTO {self._sql_name} (pk, sk, item) VALUES (?, ?, ?)", (pk, sk, data))
+        return len(data)
+
+    def _check_condition(self, item: Optional[Dict[str, Any]], kwargs: Dict[str, Any], operation: str) -> None:
+        expression = kwargs.get("ConditionExpression")
+        if not expression:
+            return
+        text, names, values = _resolve_expression(expression, kwargs.get("ExpressionAttributeNames"),
+                                                  kwargs.get("ExpressionAttributeValues"), ConditionExpressionBuilder())
+        if not _Evaluator(values).condition(item or {}, parse_condition(text, names)):
+            raise _client_error("ConditionalCheckFailedException", "The conditional request failed", operation)
+
+    def _consumed(self, kwargs: Dict[str, Any], units: float) -> Dict[str, Any]:
+        if kwargs.get("ReturnConsumedCapacity") in ("TOTAL", "INDEXES"):
+            return {"ConsumedCapacity": {"TableName": self.name, "CapacityUnits": units}}
+        return {}
+
+    # Table API
+    def get_item(self, **kwargs) -> Dict[str, Any]:
+        self.store.simulate_latency()
+        pk, sk = self._key_tuple(kwargs["Key"], "GetItem")
+        with self.store.connection() as connection:
+            row = connection.execute(f"SELECT item FROM {self._sql_name} WHERE pk = ? AND sk = ?", (pk, sk)).fetchone()
+        response: Dict[str, Any] = self._consumed(kwargs, _capacity_units(len(row[0]) if row else 0, 4096, 1.0 if kwargs.get("ConsistentRead") else 0.5))
+        if row:
+            item = decode_item(row[0])
+            if kwargs.get("ProjectionExpression"):
+                item = project_item(item, parse_projection(kwargs["ProjectionExpression"], kwargs.get("ExpressionAttributeNames")))
+            response["Item"] = item
+        return response
+
+    def execute_write(self, connection: sqlite3.Connection, action: str, params: Dict[str, Any],
+                      operation: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], List[str], int]:
+        """
+        Runs one Put, Update, Delete or ConditionCheck inside an open transaction.
+        Returns (old item, new item, attributes touched by the update, bytes written).
+        """
+        if action == "Put":
+            new_item = {k: normalize_value(v) for k, v in params["Item"].items()}
+            key = self._key_of(new_item)
+        else:
+            key = {k: normalize_value(v) for k, v in params["Key"].items()}
+        pk, sk = self._key_tuple(key, operation)
+        old_item = self._load(connection, pk, sk)
+        self._check_condition(old_item, params, operation)
+        touched: List[str] = []
+        size = 0
+        if action == "Put":
+            size = self._store_item(connection, new_item, operation)
+        elif action == "Update":
+            clauses = parse_update(params["UpdateExpression"], params.get("ExpressionAttributeNames"))
+            new_item = decode_item(encode_item(old_item)) if old_item else dict(key)
+            touched = apply_update(new_item, clauses, _Evaluator(params.get("ExpressionAttributeValues")), self.key_names)
+            size = self._store_item(connection, new_item, operation)
+        elif action == "Delete":
+            new_item = None
+            connection.execute(f"DELETE FROM {self._sql_name} WHERE pk = ? AND sk = ?", (pk, sk))
+            size = len(encode_item(old_item)) if old_item else 0
+        else: # ConditionCheck
+            new_item = old_item
+        return old_item, new_item, touched, size
+
+    def put_item(self, **kwargs) -> Dict[str, Any]:
+        self.store.simulate_latency()
+        with self.store.transaction() as connection:
+            old_item, _, _, size = self.execute_write(connection, "Put", kwargs, "PutItem")
+        response = self._consumed(kwargs, _capacity_units(size, 1024))
+        if kwargs.get("ReturnValues") == "ALL_OLD" and old_item:
+            response["Attributes"] = old_item
+        return response
+
+    def update_item(self, **kwargs) -> Dict[str, Any]:
+        self.store.simulate_latency()
+        with self.store.transaction() as connection:
+            old_item, new_item, touched, size = self.execute_write(connection, "Update", kwargs, "UpdateItem")
+        response = self._consumed(kwargs, _capacity_units(size, 1024))
+        return_values = kwargs.get("ReturnValues", "NONE")
+        if return_values == "ALL_NEW":
+            response["Attributes"] = new_item
+        elif return_values == "ALL_OLD" and old_item:
+            response["Attributes"] = old_item
+        elif return_values == "UPDATED_NEW":
+            response["Attributes"] = {k: new_item[k] for k in touched if k in new_item}
+        elif return_values == "UPDATED_OLD" and old_item:
+            response["Attributes"] = {k: old_item[k] for k in touched if k in old_item}
+        return response
+
+    def delete_item(self, **kwargs) -> Dict[str, Any]:
+        self.store.simulate_latency()
+        with self.store.transaction() as connection:
+            old_item, _, _, size = self.execute_write(connection, "Delete", kwargs, "DeleteItem")
+        response = self._consumed(kwargs, _capacity_units(size, 1024))
+        if kwargs.get("ReturnValues") == "ALL_OLD" and old_item:
+            response["Attributes"] = old_item
+        return response
+
+    def query(self, **kwargs) -> Dict[str, Any]:
+        self.store.simulate_latency()
+        builder = ConditionExpressionBuilder()
+        names = kwargs.get("ExpressionAttributeNames")
+        values = kwargs.get("ExpressionAttributeValues")
+        key_text, key_names, key_values = _resolve_expression(kwargs["KeyConditionExpression"], names, values, builder, is_key_condition=True)
+        key_node = parse_condition(key_text, key_names)
+        evaluator = _Evaluator(key_values)
+        filter_node = None
+        if kwargs.get("FilterExpression") is not None:
+            filter_text, filter_names, filter_values = _resolve_expression(kwargs["FilterExpression"], names, values, builder)
+            filter_node = parse_condition(filter_text, filter_names)
+            evaluator = _Evaluator({**key_values, **filter_values})
+        projection = parse_projection(kwargs["ProjectionExpression"], names) if kwargs.get("ProjectionExpression") else None
+
+        pk, sk_where, sk_params = self._key_condition_sql(key_node, evaluator)
+        forward = kwargs.get("ScanIndexForward", True)
+        start_key = kwargs.get("ExclusiveStartKey")
+        if start_key:
+            start_pk, start_sk = self._key_tuple(start_key, "Query")
+            if start_pk != pk:
+                raise _validation_error("The provided starting key is invalid", "Query")
+            sk_where += " AND sk > ?" if forward else " AND sk < ?"
+            sk_params.append(start_sk)
+        limit = kwargs.get("Limit")
+        sql = (f"SELECT sk, item FROM {self._sql_name} WHERE pk = ?{sk_where} "
+               f"ORDER BY sk {'ASC' if forward else 'DESC'}")
+
+        items: List[Dict[str, Any]] = []
+        scanned = 0
+        bytes_read = 0
+        last_key: Optional[Dict[str, Any]] = None
+        more = False
+        with self.store.connection() as connection:
+            cursor = connection.execute(sql, [pk] + sk_params)
+            for row_sk, data in cursor:
+                if (limit is not None and scanned >= limit) or bytes_read >= QUERY_PAGE_MAX_BYTES:
+                    more = True
+                    break
+                item = decode_item(data)
+                if not evaluator.condition(item, key_node):
+                    continue # Only reachable when a key condition could not be expressed exactly in SQL
+                scanned += 1
+                bytes_read += len(data)
+                last_key = self._key_of(item)
+                if filter_node is not None and not evaluator.condition(item, filter_node):
+                    continue
+                items.append(project_item(item, projection) if projection else item)
+            cursor.close()
+
+        response: Dict[str, Any] = {"Count": len(items), "ScannedCount": scanned}
+        if kwargs.get("Select") != "COUNT":
+            response["Items"] = items
+        if more and last_key:
+            response["LastEvaluatedKey"] = last_key
+        response.update(self._consumed(kwargs, _capacity_units(bytes_read, 4096, 1.0 if kwargs.get("ConsistentRead") else 0.5)))
+        return response
+
+    def _key_condition_sql(self, node: Tuple, evaluator: _Evaluator) -> Tuple[str, str, List[Any]]:
+        """ Translates a key condition into (pk, extra WHERE clause on sk, params) so queries use the primary key index. """
+        parts = [node[1], node[2]] if node[0] == "and" else [node]
+        pk = None
+        sk_where = ""
+        sk_params: List[Any] = []
+        for part in parts:
+            if part[0] == "cmp" and part[1] == "=" and part[2] == ("path", [self.hash_key]):
+                pk = str(evaluator.operand({}, part[3]))
+            elif part[0] == "cmp" and part[2] == ("path", [self.range_key]) and part[1] != "<>":
+                sk_where += f" AND sk {part[1]} ?"
+                sk_params.append(str(evaluator.operand({}, part[3])))
+            elif part[0] == "between" and part[1] == ("path", [self.range_key]):
+                sk_where += " AND sk BETWEEN ? AND ?"
+                sk_params += [str(evaluator.operand({}, part[2])), str(evaluator.operand({}, part[3]))]
+            elif part[0] == "func" and part[1] == "begins_with" and part[2][0] == ("path", [self.range_key]):
+                prefix = str(evaluator.operand({}, part[2][1]))
+                sk_where += " AND sk >= ? AND sk < ?"
+                sk_params += [prefix, prefix + "\U0010ffff"]
+            else:
+                raise _validation_error("Query key condition not supported", "Query")
+        if pk is None:
+            raise _validation_error("Query condition missed key schema element: " + self.hash_key, "Query")
+        return pk, sk_where, sk_params
+
+    def batch_writer(self, overwrite_by_pkeys: Optional[List[str]] = None) -> "SQLiteBatchWriter":
+        return SQLiteBatchWriter(self)
+
+    # Used by SQLiteBackend.batch_write_item
+    def write_batch(self, requests: List[Dict[str, Any]]) -> None:
+        self.store.simulate_latency()
+        with self.store.transaction() as connection:
+            for request in requests:
+                if "PutRequest" in request:
+                    item = {k: normalize_value(v) for k, v in request["PutRequest"]["Item"].items()}
+                    self._store_item(connection, item, "BatchWriteItem")
+                else:
+                    pk, sk = self._key_tuple(request["DeleteRequest"]["Key"], "BatchWriteItem")
+                    connection.execute(f"DELETE FROM {self._sql_name} WHERE pk = ? AND sk = ?", (pk, sk))
+
+
+class SQLiteBatchWriter:
+    """ Mirrors boto3's BatchWriter: buffers puts/deletes and flushes them in 25-request transactions. """
+    flush_amount = 25
+
+    def __init__(self, table: SQLiteTable):
+        self.table = table
+        self._buffer: List[Dict[str, Any]] = []
+
+    def put_item(self, Item: Dict[str, Any]) -> None:
+        self._add({"PutRequest": {"Item": Item}})
+
+    def delete_item(self, Key: Dict[str, Any]) -> None:
+        self._add({"DeleteRequest": {"Key": Key}})
+
+    def _add(self, request: Dict[str, Any]) -> None:
+        self._buffer.append(request)
+        if len(self._buffer) >= self.flush_amount:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._buffer:
+            self.table.write_batch(self._buffer)
+            self._buffer = []
+
+    def __enter__(self) -> "SQLiteBatchWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._flush()
+
+
+class SQLiteBackend(StorageBackend):
+    name = "sqlite"
+
+    def __init__(self, path: str, users_table_name: str, todo_list_table_name: str,
+                 latency_seconds: float = 0.0, latency_jitter_seconds: float = 0.0):
+        self.store = _SQLiteStore(path, latency_seconds, latency_jitter_seconds)
+        self.users_table = SQLiteTable(self.store, users_table_name, "username")
+        self.todo_list_table = SQLiteTable(self.store, todo_list_table_name, "UserID", "SK")
+        self.tables = {table.name: table for table in (self.users_table, self.todo_list_table)}
+
+    def _table(self, name: str, operation: str) -> SQLiteTable:
+        if name not in self.tables:
+            raise _client_error("ResourceNotFoundException", f"Requested resource not found: Table: {name} not found", operation)
+        return self.tables[name]
+
+    def batch_write_item(self, **kwargs) -> Dict[str, Any]:
+        request_items = kwargs["RequestItems"]
+        if sum(len(requests) for requests in request_items.values()) > 25:
+            raise _validation_error("Too many items requested for the BatchWriteItem call", "BatchWriteItem")
+        for table_name, requests in request_items.items():
+            self._table(table_name, "BatchWriteItem").write_batch(requests)
+        return {"UnprocessedItems": {}}
+
+    def batch_get_item(self, **kwargs) -> Dict[str, Any]:
+        request_items = kwargs["RequestItems"]
+        if sum(len(request["Keys"]) for request in request_items.values()) > BATCH_GET_MAX_KEYS:
+            raise _validation_error("Too many items requested for the BatchGetItem call", "BatchGetItem")
+        self.store.simulate_latency()
+        responses: Dict[str, List[Dict[str, Any]]] = {}
+        for table_name, request in request_items.items():
+            table = self._table(table_name, "BatchGetItem")
+            projection = (parse_projection(request["ProjectionExpression"], request.get("ExpressionAttributeNames"))
+                          if request.get("ProjectionExpression") else None)
+            found = responses.setdefault(table_name, [])
+            with self.store.connection() as connection:
+                for key in request["Keys"]:
+                    item = table._load(connection, *table._key_tuple({k: normalize_value(v) for k, v in key.items()}, "BatchGetItem"))
+                    if item is not None:
+                        found.append(project_item(item, projection) if projection else item)
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def transact_write_items(self, **kwargs) -> Dict[str, Any]:
+        """
+        All-or-nothing writes across both tables in one SQLite transaction. Every condition is
+        checked; if any fails the transaction rolls back and TransactionCanceledException carries
+        one CancellationReason per action, as DynamoDB does.
+        """
+        operation = "TransactWriteItems"
+        transact_items = kwargs["TransactItems"]
+        if not 0 < len(transact_items) <= TRANSACT_MAX_ITEMS:
+            raise _validation_error(f"Member must have length between 1 and {TRANSACT_MAX_ITEMS}", operation)
+        actions = []
+        seen_keys = set()
+        for entry in transact_items:
+            (action, params), = entry.items()
+            table = self._table(params["TableName"], operation)
+            key = table._key_of(params["Item"]) if action == "Put" else params["Key"]
+            target = (table.name,) + table._key_tuple(key, operation)
+            if target in seen_keys:
+                raise _validation_error("Transaction request cannot include multiple operations on one item", operation)
+            seen_keys.add(target)
+            actions.append((table, action, params))
+
+        self.store.simulate_latency()
+        reasons = []
+        with self.store.transaction() as connection:
+            for table, action, params in actions:
+                try:
+                    table.execute_write(connection, action, params, operation)
+                    reasons.append({"Code": "None"})
+                except ClientError as e:
+                    if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                        raise
+                    reasons.append({"Code": "ConditionalCheckFailed", "Message": "The conditional request failed"})
+            if any(reason["Code"] != "None" for reason in reasons):
+                codes = ", ".join(reason["Code"] for reason in reasons)
+                raise ClientError({
+                    "Error": {"Code": "TransactionCanceledException",
+                              "Message": f"Transaction cancelled, please refer cancellation reasons for specific reasons [{codes}]"},
+                    "CancellationReasons": reasons
+                }, operation)
+        return {}
+
+    def after_fork(self) -> None:
+        self.store.after_fork()
+
+    def close(self) -> None:
+        self.store.close()
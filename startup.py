@@ -0,0 +1,83 @@
+"""
+Cold-start timing for the current process.
+
+Each phase is published as taskhive_startup_seconds{phase=...} and logged once, together,
+when the process has served its first request:
+
+- import: importing api.py and everything it pulls in (api.py imports this module first)
+- storage_connect: building the boto3 session, resource and tables on first use
+- prewarm: opening pooled storage connections (dynamodb_operations.prewarm_storage)
+- first_request: the first request this process served, end to end
+- time_to_first_request: from process start (fork, for server workers) to the end of that request
+
+Values are per process: a forked worker starts its own first-request clock (after_fork()),
+while phases that ran before the fork, such as import, are inherited from the parent.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+startup_seconds = registry.gauge(
+    "taskhive_startup_seconds", "Duration of each cold-start phase in this process.", ("phase",)
+)
+
+_lock = threading.Lock()
+_phases: Dict[str, float] = {}
+_first_request_pid: Optional[int] = None
+
+
+def _process_age_seconds() -> Optional[float]:
+    """ Seconds since this process started, from /proc (Linux); None elsewhere. """
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19]) # Field 22: starttime, in clock ticks since boot
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return None
+
+_module_loaded_at = time.perf_counter()
+_process_started_at = _module_loaded_at - (_process_age_seconds() or 0.0)
+
+
+def record(phase: str, seconds: float) -> None:
+    with _lock:
+        _phases[phase] = seconds
+    startup_seconds.set(round(seconds, 6), phase=phase)
+
+def import_finished() -> None:
+    """ Called at the end of api.py; the import phase runs from this module's own import. """
+    record("import", time.perf_counter() - _module_loaded_at)
+
+def report() -> Dict[str, float]:
+    """ Phase durations recorded so far in this process. """
+    with _lock:
+        return dict(_phases)
+
+def after_fork() -> None:
+    """ Restarts the process clock in a forked worker so its first request is measured from the fork. """
+    global _process_started_at
+    _process_started_at = time.perf_counter()
+
+def claim_first_request() -> Optional[float]:
+    """ Start time for the first request of this process, or None for every later request. """
+    global _first_request_pid
+    with _lock:
+        if _first_request_pid == os.getpid():
+            return None
+        _first_request_pid = os.getpid()
+    return time.perf_counter()
+
+def first_request_finished(started: float) -> None:
+    finished = time.perf_counter()
+    record("first_request", finished - started)
+    record("time_to_first_request", finished - _process_started_at)
+    summary = ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in report().items())
+    logger.info(f"Startup report (pid {os.getpid()}): {summary}")
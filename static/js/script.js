@@ -1,6 +1,14 @@
 // --- Globals & Constants ---
 const API_BASE_URL = ''; // Adjust if API is on a different origin (e.g., 'http://<your_ec2_ip>:5000')
 const weekday = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"];
+const TASK_PAGE_SIZE = 100; // Tasks requested per page; further pages load as the user scrolls
+const SCROLL_LOAD_THRESHOLD_PX = 300; // Distance from the bottom of the page that triggers the next page
+const TASK_BATCH_SIZE = 500; // Operations per POST /api/tasks/<tab>/batch request
+const CLIENT_ID = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : Math.random().toString(36).slice(2); // Names this page to the server, so our own changes are not pushed back to us
+const EVENTS_RECONNECT_MAX_MS = 60000; // Upper bound of the backoff between event stream reconnects
+const ACTIVE_TAB_SAVE_DELAY_MS = 1000; // Tab switches within this window are saved as one preference update
+const RATE_LIMIT_MAX_RETRIES = 3; // Retries of a request refused with 429 before the error is shown
+const RATE_LIMIT_MAX_WAIT_SECONDS = 10; // Cap on the Retry-After wait between those retries
 let currentUser = null; // To store { userId, username }
 
 // --- DOM Elements ---
@@ -32,15 +40,28 @@ let appData = {
 	tabs: [],       // Array of objects: { tabId: "main", tabName: "Main", ...other props from backend }
 	activeTabId: "main",
 	tasks: {},      // { tabId: [{ taskId, text, description, completed, ... }, ...] }
-	loadedTasksForTabs: new Set() // To track which tabs have had their tasks loaded
+	loadedTasksForTabs: new Set(), // To track which tabs have had their tasks loaded
+	taskCursors: {},  // { tabId: nextCursor } for tabs with more pages on the server
+	loadingMoreTasks: false,
+	syncToken: null,  // Position in the server's change feed; see syncChanges()
+	syncing: false,
+	tabCounts: {}     // { tabId: { taskCount, completedCount } } kept by the server; see loadTabCounts()
 };
 
 // --- API Utility ---
+// Last ETag and body per GET endpoint. Revalidated with If-None-Match; a 304 reuses the cached body.
+const etagCache = new Map();
+
 async function fetchData(endpoint, method = 'GET', body = null, isFormData = false) {
 	const options = {
 		method,
 		credentials: 'include', // Send cookies for session-based auth, even cross-origin (if CORS allows)
+		headers: { 'X-Client-ID': CLIENT_ID },
 	};
+	const cached = method === 'GET' ? etagCache.get(endpoint) : undefined;
+	if (cached) {
+		options.headers['If-None-Match'] = cached.etag;
+	}
 	if (body) {
 		if (isFormData) {
 			options.body = body;
@@ -51,11 +72,24 @@ async function fetchData(endpoint, method = 'GET', body = null, isFormData = fal
 	}
 
 	try {
-		const response = await fetch(`${API_BASE_URL}${endpoint}`, options);
+		let response = await fetch(`${API_BASE_URL}${endpoint}`, options);
+		// Over the per-user rate limit: wait as told and try again a few times before reporting it.
+		for (let retry = 0; response.status === 429 && retry < RATE_LIMIT_MAX_RETRIES; retry++) {
+			const waitSeconds = Math.min(Number(response.headers.get('Retry-After')) || 1, RATE_LIMIT_MAX_WAIT_SECONDS);
+			await new Promise(resolve => setTimeout(resolve, waitSeconds * 1000));
+			response = await fetch(`${API_BASE_URL}${endpoint}`, options);
+		}
 		if (response.status === 204) { // No Content
 			return { success: true, data: null }; // Indicate success for DELETE or no-content PUTs
 		}
+		if (response.status === 304 && cached) { // Not Modified: our copy is current
+			return { success: true, data: structuredClone(cached.data) };
+		}
 		const responseData = await response.json();
+		const etag = response.headers.get('ETag');
+		if (method === 'GET' && response.ok && etag) {
+			etagCache.set(endpoint, { etag, data: structuredClone(responseData) });
+		}
 		if (!response.ok) {
 			const errorMessage = responseData.message || responseData.error || `HTTP error! status: ${response.status}`;
 			console.error(`API Error (${method} ${endpoint}):`, errorMessage, responseData);
@@ -75,12 +109,28 @@ async function fetchData(endpoint, method = 'GET', body = null, isFormData = fal
 
 // --- Authentication ---
 async function checkAuthAndInit() {
-	const result = await fetchData('/api/auth/status');
-	if (result.success && result.data && result.data.isLoggedIn) {
-		currentUser = { userId: result.data.userId, username: result.data.username };
+	// One request returns the session user plus tabs, active tab and its first task page.
+	// It is fetched directly so an expired session redirects without an error alert.
+	let bootstrapData = null;
+	try {
+		const response = await fetch(`${API_BASE_URL}/api/bootstrap?limit=${TASK_PAGE_SIZE}&view=summary`, { credentials: 'include' });
+		if (response.ok) {
+			bootstrapData = await response.json();
+		} else if (response.status !== 401) {
+			console.error(`API Error (GET /api/bootstrap): HTTP ${response.status}`);
+			alert('Failed to load your data. Please try again.');
+			return;
+		}
+	} catch (error) {
+		console.error('Network/Fetch Error (GET /api/bootstrap):', error);
+		alert('A network error occurred. Please try again.');
+		return;
+	}
+	if (bootstrapData && bootstrapData.userId) {
+		currentUser = { userId: bootstrapData.userId, username: bootstrapData.username };
 		console.log('User logged in:', currentUser.username);
 		updateAllUserGreetings(currentUser.username);
-		await initApp();
+		await initApp(bootstrapData);
 	} else {
 		console.log('User not logged in. Redirecting to login page.');
 		window.location.href = 'login.html';
@@ -93,7 +143,7 @@ async function handleLogout() {
 	// The key is to clear client-side state and redirect.
 	currentUser = null;
 	localStorage.removeItem('taskHiveUser'); // Just in case it was used
-	appData = { tabs: [], activeTabId: "main", tasks: {}, loadedTasksForTabs: new Set() };
+	appData = { tabs: [], activeTabId: "main", tasks: {}, loadedTasksForTabs: new Set(), taskCursors: {}, loadingMoreTasks: false, tabCounts: {} };
 	window.location.href = '/login';
 	if (!result.success) { // Log if backend had an issue, but still log out client-side
 		console.warn("Logout API call reported an issue, but proceeding with client-side logout.", result.error);
@@ -108,21 +158,22 @@ function updateAllUserGreetings(username) {
 }
 
 // --- Initialization ---
-async function initApp() {
+async function initApp(bootstrapData) {
 	day();
 	time();
 	setInterval(time, 60000);
 
-	await loadInitialData();
+	await loadInitialData(bootstrapData);
 	addEventListeners(); // All general event listeners
 	addFileImportListeners();
+	addTabDragListeners();
 	updateDeleteTabButtonVisibility();
+	connectEvents();
 }
 
-async function loadInitialData() {
-	const tabsResult = await fetchData('/api/tabs');
-	if (tabsResult.success && tabsResult.data && Array.isArray(tabsResult.data)) {
-		appData.tabs = tabsResult.data;
+async function loadInitialData(bootstrapData) {
+	if (bootstrapData && Array.isArray(bootstrapData.tabs)) {
+		appData.tabs = bootstrapData.tabs;
 		if (!appData.tabs.find(t => t.tabId === 'main')) {
 			appData.tabs.unshift({ tabId: 'main', tabName: 'Main' });
 		}
@@ -131,15 +182,23 @@ async function loadInitialData() {
 		alert('Failed to load tabs. Using default "Main" tab.');
 	}
 	renderTabs();
+	loadTabCounts(); // Not awaited: progress badges fill in when the counts arrive
 
-	const activeTabPrefResult = await fetchData('/api/user/preferences/active-tab');
-	if (activeTabPrefResult.success && activeTabPrefResult.data && activeTabPrefResult.data.activeTabId &&
-		appData.tabs.find(t => t.tabId === activeTabPrefResult.data.activeTabId)) {
-		appData.activeTabId = activeTabPrefResult.data.activeTabId;
+	if (bootstrapData && bootstrapData.activeTabId && appData.tabs.find(t => t.tabId === bootstrapData.activeTabId)) {
+		appData.activeTabId = bootstrapData.activeTabId;
 	} else {
 		appData.activeTabId = 'main';
 	}
 
+	appData.syncToken = bootstrapData ? bootstrapData.syncToken : null;
+
+	// The active tab's first page arrived with the bootstrap response; no separate task request is needed.
+	if (bootstrapData && bootstrapData.activeTabId === appData.activeTabId && Array.isArray(bootstrapData.tasks)) {
+		appData.tasks[appData.activeTabId] = bootstrapData.tasks;
+		setTaskCursor(appData.activeTabId, bootstrapData.nextCursor);
+		appData.loadedTasksForTabs.add(appData.activeTabId);
+	}
+
 	const tabToActivateButton = document.getElementById(appData.activeTabId);
 	if (tabToActivateButton) {
 		try {
@@ -147,17 +206,17 @@ async function loadInitialData() {
 			tab.show(); // This will trigger 'shown.bs.tab' handled in addEventListeners
 		} catch (e) {
 			console.warn("Bootstrap Tab API error on initial load for ID:", appData.activeTabId, e);
-			if (appData.activeTabId !== 'main' && !appData.loadedTasksForTabs.has('main')) {
-				await loadTasksForTab('main'); // Fallback to load main tab's tasks
-			} else if (appData.activeTabId === 'main' && !appData.loadedTasksForTabs.has('main')) {
-				await loadTasksForTab('main'); // Ensure main tasks load if it's active and not loaded
-			}
 		}
 	} else {
 		console.warn("Initial active tab button not found:", appData.activeTabId);
-		if (!appData.loadedTasksForTabs.has('main')) { // Ensure main tab tasks load if preferred not found
-			await loadTasksForTab('main');
-		}
+		appData.activeTabId = 'main';
+	}
+
+	if (appData.loadedTasksForTabs.has(appData.activeTabId)) {
+		renderTasksForTab(appData.activeTabId);
+		maybeLoadMoreTasks();
+	} else {
+		await loadTasksForTab(appData.activeTabId);
 	}
 }
 
@@ -183,9 +242,49 @@ function renderTabs() {
 			}
 		}
 	});
+	orderTabElements();
 	updateDeleteTabButtonVisibility(); // Update after rendering
 }
 
+// Moves the tab elements into appData.tabs order; the "Add Tab" item stays last.
+function orderTabElements() {
+	if (!taskTabsContainer) return;
+	const addTabLi = taskTabsContainer.lastElementChild;
+	appData.tabs.forEach(tab => {
+		const li = document.getElementById(tab.tabId)?.closest('li.nav-item');
+		if (!li) return;
+		li.draggable = true;
+		if (li !== addTabLi) taskTabsContainer.insertBefore(li, addTabLi);
+	});
+}
+
+// Tabs are reordered by dragging; the new order is saved with PUT /api/tabs/order.
+let draggedTabLi = null;
+
+function addTabDragListeners() {
+	if (!taskTabsContainer) return;
+	taskTabsContainer.addEventListener('dragstart', (e) => {
+		draggedTabLi = e.target.closest('li.nav-item[draggable="true"]');
+		if (draggedTabLi) e.dataTransfer.effectAllowed = 'move';
+	});
+	taskTabsContainer.addEventListener('dragover', (e) => {
+		const target = e.target.closest('li.nav-item[draggable="true"]');
+		if (!draggedTabLi || !target || target === draggedTabLi) return;
+		e.preventDefault();
+		const { left, width } = target.getBoundingClientRect();
+		taskTabsContainer.insertBefore(draggedTabLi, e.clientX < left + width / 2 ? target : target.nextSibling);
+	});
+	taskTabsContainer.addEventListener('dragend', async () => {
+		if (!draggedTabLi) return;
+		draggedTabLi = null;
+		const tabOrder = Array.from(taskTabsContainer.querySelectorAll('li.nav-item[draggable="true"] button.nav-link')).map(b => b.id);
+		if (tabOrder.every((tabId, i) => appData.tabs[i] && appData.tabs[i].tabId === tabId)) return;
+		const result = await fetchData('/api/tabs/order', 'PUT', { tabOrder });
+		if (result.success && Array.isArray(result.data)) appData.tabs = result.data;
+		orderTabElements(); // The server's order, or back to ours if the save failed
+	});
+}
+
 function createTabElement(tabName, tabId, activateTab = false) {
 	if (!taskTabsContainer || !tasksTabContent) return;
 	if (document.getElementById(tabId)) {
@@ -196,6 +295,7 @@ function createTabElement(tabName, tabId, activateTab = false) {
 	const li = document.createElement("li");
 	li.classList.add("nav-item");
 	li.role = "presentation";
+	li.draggable = true;
 
 	const button = document.createElement("button");
 	button.classList.add("nav-link", "me-2");
@@ -207,6 +307,10 @@ function createTabElement(tabName, tabId, activateTab = false) {
 	button.setAttribute("aria-controls", `${tabId}-pane`);
 	button.setAttribute("aria-selected", activateTab.toString());
 	button.textContent = tabName;
+	const progressBadge = document.createElement("span");
+	progressBadge.classList.add("badge", "rounded-pill", "text-bg-light", "ms-2", "tab-progress");
+	progressBadge.id = `${tabId}-tab-progress`;
+	button.appendChild(progressBadge);
 	li.appendChild(button);
 	taskTabsContainer.insertBefore(li, taskTabsContainer.lastElementChild); // Insert before "Add Tab" button's li
 
@@ -223,6 +327,10 @@ function createTabElement(tabName, tabId, activateTab = false) {
         <div class="col-12 col-lg-5 p-0 px-lg-3 pb-5 text-center">
           <button class="btn btn-primary justify-item-center rounded-pill px-4 mb-4 mb-sm-0 me-2" data-bs-toggle="modal" data-bs-target="#add-task-modal">Add Task</button>
           <button class="btn btn-dark justify-item-center rounded-pill px-4" data-bs-toggle="modal" data-bs-target="#import-tasks-modal">Import Tasks</button>
+          <div class="mt-3">
+            <button class="btn btn-sm btn-outline-success rounded-pill px-3 me-2 mark-all-done">Mark all done</button>
+            <button class="btn btn-sm btn-outline-secondary rounded-pill px-3 clear-completed">Clear completed</button>
+          </div>
         </div>
         <div class="offset-lg-1 col-lg-5 tasks-section" id="${tabId}-tasks-section">
           <h4 class="fw-bold user-greeting-tab">Hi, ${usernameForGreeting}</h4>
@@ -260,6 +368,7 @@ async function handleTabSubmission() {
 			appData.tabs.push(newTab);
 		}
 		appData.tasks[newTab.tabId] = [];
+		appData.tabCounts[newTab.tabId] = { taskCount: 0, completedCount: 0 };
 		createTabElement(newTab.tabName, newTab.tabId, true);
 		tabNameInput.value = "";
 		bootstrap.Modal.getInstance(addTabModalEl)?.hide();
@@ -281,37 +390,208 @@ async function deleteTab() {
 
 	const result = await fetchData(`/api/tabs/${tabIdToDelete}`, 'DELETE');
 	if (result.success) { // Success for DELETE (even if null data for 204)
-		const tabElement = document.getElementById(tabIdToDelete);
-		const tabContent = document.getElementById(`${tabIdToDelete}-pane`);
-		if (tabElement) tabElement.closest('li.nav-item')?.remove();
-		if (tabContent) tabContent.remove();
+		removeTabLocally(tabIdToDelete);
+		if (result.data && result.data.jobId) {
+			// Large tabs are removed from the profile right away; their tasks are deleted by a background job.
+			pollJob(result.data.jobId);
+		}
+	} else {
+		alert(result.error || "Failed to delete tab.");
+	}
+}
 
-		appData.tabs = appData.tabs.filter(tab => tab.tabId !== tabIdToDelete);
-		delete appData.tasks[tabIdToDelete];
-		appData.loadedTasksForTabs.delete(tabIdToDelete);
+// Drops a tab's elements and cached tasks, switching to 'main' if it was active.
+function removeTabLocally(tabId) {
+	const tabElement = document.getElementById(tabId);
+	const tabContent = document.getElementById(`${tabId}-pane`);
+	if (tabElement) tabElement.closest('li.nav-item')?.remove();
+	if (tabContent) tabContent.remove();
 
+	appData.tabs = appData.tabs.filter(tab => tab.tabId !== tabId);
+	delete appData.tasks[tabId];
+	delete appData.taskCursors[tabId];
+	delete appData.tabCounts[tabId];
+	appData.loadedTasksForTabs.delete(tabId);
+
+	if (appData.activeTabId === tabId) {
 		appData.activeTabId = "main";
 		const mainTabButton = document.getElementById("main");
 		if (mainTabButton) {
 			const tab = new bootstrap.Tab(mainTabButton);
 			tab.show(); // Triggers 'shown.bs.tab'
 		}
-		updateDeleteTabButtonVisibility(); // Update after changing active tab and tabs list
+	}
+	updateDeleteTabButtonVisibility(); // Update after changing active tab and tabs list
+}
+
+const JOB_POLL_INTERVAL_MS = 2000;
+
+async function pollJob(jobId) {
+	const result = await fetchData(`/api/jobs/${jobId}`);
+	if (!result.success || !result.data) return;
+	const job = result.data;
+	if (job.status === 'queued' || job.status === 'running') {
+		setTimeout(() => pollJob(jobId), JOB_POLL_INTERVAL_MS);
+	} else if (job.status === 'failed') {
+		console.error(`Background job ${jobId} (${job.type}) failed:`, job.error);
 	} else {
-		alert(result.error || "Failed to delete tab.");
+		console.log(`Background job ${jobId} (${job.type}) finished:`, job.result);
+	}
+}
+
+// --- Delta Sync ---
+// When the page becomes visible again or the network comes back, fetch only what changed since
+// our sync token instead of reloading every tab.
+async function syncChanges() {
+	if (!appData.syncToken || appData.syncing) return;
+	appData.syncing = true;
+	try {
+		let hasMore = true;
+		while (hasMore) {
+			const result = await fetchData(`/api/sync?since=${encodeURIComponent(appData.syncToken)}`);
+			if (!result.success || !result.data) return;
+			if (result.data.reset) { // Our token outlived the server's change history
+				window.location.reload();
+				return;
+			}
+			await applySyncDelta(result.data);
+			appData.syncToken = result.data.syncToken;
+			hasMore = result.data.hasMore;
+		}
+	} finally {
+		appData.syncing = false;
+	}
+}
+
+async function applySyncDelta(delta, { reloadCounts = true } = {}) {
+	if (Array.isArray(delta.tabs)) {
+		const syncedIds = new Set(delta.tabs.map(t => t.tabId));
+		appData.tabs.filter(t => t.tabId !== 'main' && !syncedIds.has(t.tabId)).forEach(t => removeTabLocally(t.tabId));
+		appData.tabs = delta.tabs;
+		delta.tabs.forEach(t => {
+			if (t.tabId !== 'main' && !document.getElementById(t.tabId)) createTabElement(t.tabName, t.tabId, false);
+		});
+		orderTabElements();
+		updateDeleteTabButtonVisibility();
+	}
+
+	const reloadTabs = new Set(delta.reloadTabs || []);
+	const touchedTabs = new Set();
+	(delta.tasks || []).forEach(task => {
+		const tasks = appData.tasks[task.tabId];
+		if (!appData.loadedTasksForTabs.has(task.tabId) || !tasks) return; // Fetched in full when first opened
+		const index = tasks.findIndex(t => t.taskId === task.taskId);
+		if (index >= 0) {
+			tasks[index] = task;
+		} else if (appData.taskCursors[task.tabId]) {
+			reloadTabs.add(task.tabId); // Unsure which unloaded page a new task belongs to
+		} else {
+			tasks.push(task);
+		}
+		touchedTabs.add(task.tabId);
+	});
+	(delta.deleted || []).forEach(({ tabId, taskId }) => {
+		if (!appData.tasks[tabId]) return;
+		appData.tasks[tabId] = appData.tasks[tabId].filter(t => t.taskId !== taskId);
+		touchedTabs.add(tabId);
+	});
+
+	for (const tabId of reloadTabs) {
+		touchedTabs.delete(tabId);
+		if (!appData.loadedTasksForTabs.has(tabId)) continue;
+		appData.loadedTasksForTabs.delete(tabId);
+		delete appData.tasks[tabId];
+		setTaskCursor(tabId, null);
+		if (tabId === appData.activeTabId) await loadTasksForTab(tabId);
 	}
+	touchedTabs.forEach(tabId => renderTasksForTab(tabId));
+	if (reloadCounts) loadTabCounts(); // Counters of tabs we have not loaded may have moved too
+}
+
+// --- Live Events ---
+// GET /api/events pushes other clients' changes (other tabs, devices) as they happen, in the same
+// shape as a sync delta, so they are applied without re-fetching. The stream is only a shortcut:
+// whenever it (re)connects or the server says we fell behind ("resync"), we run a delta sync.
+let eventSource = null;
+let eventsRetryMs = 1000;
+let liveChanges = Promise.resolve(); // Applied one at a time, in arrival order
+
+function connectEvents() {
+	if (!window.EventSource || eventSource) return;
+	eventSource = new EventSource(`${API_BASE_URL}/api/events?clientId=${encodeURIComponent(CLIENT_ID)}`, { withCredentials: true });
+	eventSource.addEventListener('hello', () => { eventsRetryMs = 1000; syncChanges(); });
+	eventSource.addEventListener('resync', () => syncChanges());
+	eventSource.addEventListener('change', (e) => {
+		const delta = JSON.parse(e.data);
+		liveChanges = liveChanges.then(() => applyLiveChange(delta)).catch(error => console.error('Failed to apply live change:', error));
+	});
+	eventSource.onerror = () => {
+		// The browser retries by itself unless the stream was refused (e.g. 401 or 503); then back off and reconnect.
+		if (eventSource.readyState !== EventSource.CLOSED) return;
+		eventSource = null;
+		setTimeout(connectEvents, eventsRetryMs);
+		eventsRetryMs = Math.min(eventsRetryMs * 2, EVENTS_RECONNECT_MAX_MS);
+	};
+}
+
+async function applyLiveChange(delta) {
+	await applySyncDelta(delta, { reloadCounts: !delta.counts });
+	Object.entries(delta.counts || {}).forEach(([tabId, { taskCount, completedCount, version }]) => {
+		const known = appData.tabCounts[tabId];
+		if (known && known.version !== undefined && known.version >= version) return; // Reordered: we already have newer counters
+		appData.tabCounts[tabId] = { taskCount, completedCount, version };
+		updateCounterForTab(tabId);
+		updateProgressbarForTab(tabId);
+	});
+}
+
+// --- Tab Progress ---
+// Per-tab task counters come from GET /api/tabs?withCounts=1, so every tab's progress shows without
+// loading its tasks. Local mutations adjust them in place; sync and imports re-read them.
+async function loadTabCounts() {
+	const result = await fetchData('/api/tabs?withCounts=1');
+	if (!result.success || !Array.isArray(result.data)) return;
+	result.data.forEach(({ tabId, taskCount, completedCount }) => {
+		appData.tabCounts[tabId] = { taskCount, completedCount };
+		updateCounterForTab(tabId);
+		updateProgressbarForTab(tabId);
+	});
+}
+
+function adjustTabCounts(tabId, taskDelta, completedDelta) {
+	const counts = appData.tabCounts[tabId];
+	if (!counts) return;
+	counts.taskCount = Math.max(0, counts.taskCount + taskDelta);
+	counts.completedCount = Math.max(0, Math.min(counts.taskCount, counts.completedCount + completedDelta));
+}
+
+// { taskCount, completedCount } for a tab: the server's counters when known, else whatever tasks are loaded.
+function getTabCounts(tabId) {
+	if (appData.tabCounts[tabId]) return appData.tabCounts[tabId];
+	const tasksInTab = appData.tasks[tabId] || [];
+	return { taskCount: tasksInTab.length, completedCount: tasksInTab.filter(task => task.completed).length };
+}
+
+function renderTabProgress(tabId) {
+	const badge = document.getElementById(`${tabId}-tab-progress`);
+	if (!badge) return;
+	const counts = appData.tabCounts[tabId];
+	badge.textContent = counts && counts.taskCount > 0 ? `${counts.completedCount}/${counts.taskCount}` : "";
+	badge.title = counts ? `${counts.completedCount} of ${counts.taskCount} tasks done` : "";
 }
 
 // --- Task Management ---
 async function loadTasksForTab(tabId) {
 	if (!tabId) { console.error("loadTasksForTab: tabId is null or undefined"); return; }
 	console.log(`Loading tasks for tab: ${tabId}`);
-	const result = await fetchData(`/api/tasks/${tabId}`);
+	const result = await fetchData(`/api/tasks/${tabId}?limit=${TASK_PAGE_SIZE}&view=summary`);
 
-	if (result.success && result.data && Array.isArray(result.data)) {
-		appData.tasks[tabId] = result.data;
+	if (result.success && result.data && Array.isArray(result.data.items)) {
+		appData.tasks[tabId] = result.data.items;
+		setTaskCursor(tabId, result.data.nextCursor);
 	} else if (result.success && result.data === null) { // Explicitly no tasks, or 204
 		appData.tasks[tabId] = [];
+		setTaskCursor(tabId, null);
 	} else {
 		console.error(`Failed to load tasks for tab ${tabId}. Error: ${result.error}`);
 		if (!appData.tasks[tabId]) appData.tasks[tabId] = []; // Ensure array exists to prevent UI errors
@@ -319,6 +599,65 @@ async function loadTasksForTab(tabId) {
 	}
 	appData.loadedTasksForTabs.add(tabId);
 	renderTasksForTab(tabId);
+	maybeLoadMoreTasks();
+}
+
+function setTaskCursor(tabId, cursor) {
+	if (cursor) {
+		appData.taskCursors[tabId] = cursor;
+	} else {
+		delete appData.taskCursors[tabId];
+	}
+}
+
+async function loadMoreTasksForTab(tabId) {
+	const cursor = appData.taskCursors[tabId];
+	if (!cursor || appData.loadingMoreTasks) return;
+	appData.loadingMoreTasks = true;
+	try {
+		const result = await fetchData(`/api/tasks/${tabId}?limit=${TASK_PAGE_SIZE}&view=summary&cursor=${encodeURIComponent(cursor)}`);
+		if (result.success && result.data && Array.isArray(result.data.items)) {
+			if (!appData.tasks[tabId]) appData.tasks[tabId] = [];
+			appData.tasks[tabId].push(...result.data.items);
+			setTaskCursor(tabId, result.data.nextCursor);
+			const tasksSection = document.getElementById(`${tabId}-tasks-section`);
+			if (tasksSection) {
+				result.data.items.forEach(taskObject => {
+					const taskElement = createTaskElement(tasksSection, taskObject, tabId);
+					tasksSection.appendChild(taskElement); // Later pages go below what is already shown
+				});
+			}
+			updateCounterForTab(tabId);
+			updateProgressbarForTab(tabId);
+		} else {
+			console.error(`Failed to load more tasks for tab ${tabId}. Error: ${result.error}`);
+		}
+	} finally {
+		appData.loadingMoreTasks = false;
+	}
+}
+
+// Loads the next page of the active tab once the user scrolls near the bottom (or the page is not yet scrollable).
+async function maybeLoadMoreTasks() {
+	const tabId = appData.activeTabId;
+	if (!appData.taskCursors[tabId] || appData.loadingMoreTasks) return;
+	const distanceToBottom = document.documentElement.scrollHeight - (window.innerHeight + window.scrollY);
+	if (distanceToBottom <= SCROLL_LOAD_THRESHOLD_PX) {
+		await loadMoreTasksForTab(tabId);
+		if (appData.activeTabId === tabId) maybeLoadMoreTasks();
+	}
+}
+
+// Adds a task to a tab's list, or replaces it if a sync already brought it in. Returns true if it was already there.
+function upsertTask(tabId, task) {
+	if (!appData.tasks[tabId]) appData.tasks[tabId] = [];
+	const index = appData.tasks[tabId].findIndex(t => t.taskId === task.taskId);
+	if (index >= 0) {
+		appData.tasks[tabId][index] = task;
+		return true;
+	}
+	appData.tasks[tabId].push(task);
+	return false;
 }
 
 function renderTasksForTab(tabId) {
@@ -385,6 +724,10 @@ function createTaskElement(tasksContainer, taskObject, currentTabId) {
 		taskCheckLabel.setAttribute("data-bs-toggle", "collapse");
 		taskCheckLabel.setAttribute("data-bs-target", `#${descDivId}`);
 		taskCheckLabel.style.cursor = "pointer";
+		if (taskObject.descriptionTruncated) {
+			// Lists arrive in summary view; fetch the full description the first time it is expanded.
+			taskDescriptionDiv.addEventListener("show.bs.collapse", () => loadFullDescription(taskDescriptionDiv, currentTabId, taskId), { once: true });
+		}
 		formCheck.appendChild(taskDescriptionDiv);
 	}
 	// Append to the tasksContainer (which is tasksSection or a specific part of it)
@@ -412,11 +755,13 @@ async function handleTaskSubmission() {
 	const result = await fetchData('/api/tasks', 'POST', newTaskData);
 	if (result.success && result.data && result.data.taskId) {
 		const createdTask = result.data;
-		if (!appData.tasks[activeTabId]) appData.tasks[activeTabId] = [];
-		appData.tasks[activeTabId].push(createdTask);
+		const alreadySynced = upsertTask(activeTabId, createdTask);
+		if (!alreadySynced) adjustTabCounts(activeTabId, 1, createdTask.completed ? 1 : 0);
 
 		const tasksContainer = document.getElementById(`${activeTabId}-tasks-section`);
-		if (tasksContainer) {
+		if (alreadySynced) {
+			renderTasksForTab(activeTabId);
+		} else if (tasksContainer) {
 			// Use the same logic as renderTasksForTab for appending
 			const progressWrapper = tasksContainer.querySelector('.progress-wrapper');
 			const targetContainer = progressWrapper ? progressWrapper.parentNode : tasksContainer;
@@ -432,6 +777,17 @@ async function handleTaskSubmission() {
 	}
 }
 
+async function loadFullDescription(descriptionElement, tabId, taskId) {
+	const result = await fetchData(`/api/tasks/${tabId}/${taskId}?fields=description`);
+	if (!result.success || !result.data) return;
+	descriptionElement.textContent = result.data.description || "";
+	const task = appData.tasks[tabId]?.find(t => t.taskId === taskId);
+	if (task) {
+		task.description = result.data.description;
+		delete task.descriptionTruncated;
+	}
+}
+
 async function toggleTask(checkboxElement, tabId, taskId) {
 	const isCompleted = checkboxElement.checked;
 	const label = checkboxElement.nextElementSibling;
@@ -442,6 +798,7 @@ async function toggleTask(checkboxElement, tabId, taskId) {
 		if (label) label.style.textDecoration = isCompleted ? "line-through" : "none";
 		const taskIndex = appData.tasks[tabId]?.findIndex(t => t.taskId === taskId);
 		if (taskIndex !== -1 && appData.tasks[tabId]) {
+			if (appData.tasks[tabId][taskIndex].completed !== isCompleted) adjustTabCounts(tabId, 0, isCompleted ? 1 : -1);
 			appData.tasks[tabId][taskIndex].completed = isCompleted;
 			appData.tasks[tabId][taskIndex].updatedAt = updatedTask.updatedAt;
 		}
@@ -459,6 +816,8 @@ async function removeTask(taskElement, tabId, taskId) {
 	if (result.success) { // DELETE returns success even with null data (204)
 		taskElement.remove();
 		if (appData.tasks[tabId]) {
+			const removedTask = appData.tasks[tabId].find(t => t.taskId === taskId);
+			if (removedTask) adjustTabCounts(tabId, -1, removedTask.completed ? -1 : 0);
 			appData.tasks[tabId] = appData.tasks[tabId].filter(t => t.taskId !== taskId);
 		}
 		updateCounterForTab(tabId);
@@ -468,21 +827,52 @@ async function removeTask(taskElement, tabId, taskId) {
 	}
 }
 
+// Sends operations to the batch endpoint in TASK_BATCH_SIZE chunks and returns every per-operation result.
+async function runTaskBatch(tabId, operations) {
+	const results = [];
+	for (let i = 0; i < operations.length; i += TASK_BATCH_SIZE) {
+		const result = await fetchData(`/api/tasks/${tabId}/batch`, 'POST', { operations: operations.slice(i, i + TASK_BATCH_SIZE) });
+		if (!result.data || !Array.isArray(result.data.results)) break; // fetchData already reported the error
+		results.push(...result.data.results);
+	}
+	return results;
+}
+
+async function markAllDone(tabId) {
+	const pendingTasks = (appData.tasks[tabId] || []).filter(t => !t.completed);
+	if (pendingTasks.length === 0) return;
+	const results = await runTaskBatch(tabId, pendingTasks.map(t => ({ action: 'update', taskId: t.taskId, completed: true })));
+	const updated = new Map(results.filter(r => r.success && r.task).map(r => [r.taskId, r.task]));
+	adjustTabCounts(tabId, 0, updated.size);
+	appData.tasks[tabId] = appData.tasks[tabId].map(t => updated.get(t.taskId) || t);
+	renderTasksForTab(tabId);
+}
+
+async function clearCompleted(tabId) {
+	const completedTasks = (appData.tasks[tabId] || []).filter(t => t.completed);
+	if (completedTasks.length === 0) return;
+	if (!confirm(`Remove ${completedTasks.length} completed ${completedTasks.length === 1 ? "task" : "tasks"}?`)) return;
+	const results = await runTaskBatch(tabId, completedTasks.map(t => ({ action: 'delete', taskId: t.taskId })));
+	const removed = new Set(results.filter(r => r.success).map(r => r.taskId));
+	adjustTabCounts(tabId, -removed.size, -removed.size);
+	appData.tasks[tabId] = appData.tasks[tabId].filter(t => !removed.has(t.taskId));
+	renderTasksForTab(tabId);
+}
+
 // --- UI Updates ---
 function updateCounterForTab(tabId) {
 	const counterElement = document.getElementById(`${tabId}-counter`);
 	if (!counterElement) return;
-	const taskCount = appData.tasks[tabId] ? appData.tasks[tabId].length : 0;
+	const { taskCount } = getTabCounts(tabId);
 	counterElement.textContent = `${taskCount} ${taskCount === 1 ? "task" : "tasks"}`;
 }
 
 function updateProgressbarForTab(tabId) {
+	renderTabProgress(tabId);
 	const progressBar = document.getElementById(`${tabId}-progress-bar`);
 	const progressPercentText = document.getElementById(`${tabId}-progress-percent`);
 	if (!progressBar || !progressPercentText) return;
-	const tasksInTab = appData.tasks[tabId] || [];
-	const completedCount = tasksInTab.filter(task => task.completed).length;
-	const totalTasks = tasksInTab.length;
+	const { taskCount: totalTasks, completedCount } = getTabCounts(tabId);
 	const progress = totalTasks > 0 ? Math.round((completedCount / totalTasks) * 100) : 0;
 	progressBar.style.width = `${progress}%`;
 	progressBar.setAttribute("aria-valuenow", progress);
@@ -512,46 +902,35 @@ async function importTasksFromFile() {
 	const markCompleted = document.getElementById("mark-completed")?.checked || false;
 	if (!file) { alert("Please select a file to import."); return; }
 
-	const reader = new FileReader();
-	reader.onload = async function(e) {
-		const contents = e.target.result;
-		const lines = contents.split('\n').filter(line => line.trim() !== '');
-		const activeTabId = appData.activeTabId;
-		let importCount = 0;
-		const allImportPromises = [];
-
-		lines.forEach(line => {
-			const parts = line.split('|').map(part => part.trim());
-			const taskName = parts[0];
-			const description = parts.length > 1 ? parts[1] : '';
-			if (taskName) {
-				const taskData = { tabId: activeTabId, text: taskName, description, completed: markCompleted };
-				allImportPromises.push(fetchData('/api/tasks', 'POST', taskData));
-				importCount++;
-			}
-		});
+	// The server parses the pipe-delimited file and writes it in batches, so one request covers the whole import.
+	const activeTabId = appData.activeTabId;
+	const formData = new FormData();
+	formData.append('file', file);
+	formData.append('tabId', activeTabId);
+	formData.append('completed', markCompleted ? 'true' : 'false');
 
-		if (allImportPromises.length > 0) {
-			const results = await Promise.all(allImportPromises);
-			let successfulImports = 0;
-			results.forEach(result => {
-				if (result.success && result.data && result.data.taskId) {
-					if (!appData.tasks[activeTabId]) appData.tasks[activeTabId] = [];
-					appData.tasks[activeTabId].push(result.data);
-					successfulImports++;
-				} else {
-					console.error("Failed to import a task:", result.error || "Unknown error");
-				}
-			});
-			if (successfulImports > 0) renderTasksForTab(activeTabId);
-			alert(`Successfully imported ${successfulImports} of ${importCount} tasks.`);
+	const result = await fetchData('/api/tasks/bulk', 'POST', formData, true);
+	const results = result.data && Array.isArray(result.data.results) ? result.data.results : [];
+	let successfulImports = 0;
+	results.forEach(lineResult => {
+		if (lineResult.success && lineResult.task) {
+			upsertTask(activeTabId, lineResult.task);
+			successfulImports++;
+		} else {
+			console.error(`Failed to import line ${lineResult.line}:`, lineResult.error || "Unknown error");
 		}
-		bootstrap.Modal.getInstance(importTasksModalEl)?.hide();
-		taskFileInput.value = '';
-		if (document.getElementById("mark-completed")) document.getElementById("mark-completed").checked = false;
-	};
-	reader.onerror = function() { alert('Error reading file'); };
-	reader.readAsText(file);
+	});
+	if (successfulImports > 0) {
+		renderTasksForTab(activeTabId);
+		loadTabCounts();
+	}
+	if (results.length > 0) {
+		alert(`Successfully imported ${successfulImports} of ${results.length} tasks.`);
+	}
+
+	bootstrap.Modal.getInstance(importTasksModalEl)?.hide();
+	taskFileInput.value = '';
+	if (document.getElementById("mark-completed")) document.getElementById("mark-completed").checked = false;
 }
 
 function addFileImportListeners() {
@@ -585,21 +964,64 @@ function addEventListeners() {
 		if (newActiveTabId && appData.activeTabId !== newActiveTabId) {
 			appData.activeTabId = newActiveTabId;
 			console.log("Active tab changed to:", appData.activeTabId);
-			await fetchData('/api/user/preferences/active-tab', 'PUT', { activeTabId: newActiveTabId });
+			saveActiveTabPreference(newActiveTabId);
 			if (!appData.loadedTasksForTabs.has(newActiveTabId)) {
 				await loadTasksForTab(newActiveTabId);
 			} else {
 				updateCounterForTab(newActiveTabId);
 				updateProgressbarForTab(newActiveTabId);
+				maybeLoadMoreTasks();
 			}
 			updateDeleteTabButtonVisibility();
 		}
 	});
 
+	window.addEventListener('scroll', maybeLoadMoreTasks, { passive: true });
+	// Delegated, so the buttons in dynamically created tab panes work too.
+	if (tasksTabContent) {
+		tasksTabContent.addEventListener('click', (e) => {
+			if (e.target.closest('.mark-all-done')) markAllDone(appData.activeTabId);
+			else if (e.target.closest('.clear-completed')) clearCompleted(appData.activeTabId);
+		});
+	}
+	document.addEventListener('visibilitychange', () => {
+		if (document.visibilityState === 'visible') syncChanges();
+		else flushActiveTabPreference(true);
+	});
+	window.addEventListener('pagehide', () => flushActiveTabPreference(true));
+	window.addEventListener('online', syncChanges);
+
 	if (deleteTabGlobalBtn) deleteTabGlobalBtn.addEventListener("click", deleteTab);
 	if (logoutButton) logoutButton.addEventListener("click", handleLogout);
 }
 
+// --- Active Tab Preference ---
+// Saved after the user settles on a tab rather than on every click; a pending save is sent
+// right away (with keepalive, so it survives unload) when the page is hidden or closed.
+let pendingActiveTabId = null;
+let activeTabSaveTimer = null;
+
+function saveActiveTabPreference(tabId) {
+	pendingActiveTabId = tabId;
+	clearTimeout(activeTabSaveTimer);
+	activeTabSaveTimer = setTimeout(() => flushActiveTabPreference(), ACTIVE_TAB_SAVE_DELAY_MS);
+}
+
+function flushActiveTabPreference(keepalive = false) {
+	clearTimeout(activeTabSaveTimer);
+	if (pendingActiveTabId === null) return;
+	const body = { activeTabId: pendingActiveTabId };
+	pendingActiveTabId = null;
+	if (!keepalive) {
+		fetchData('/api/user/preferences/active-tab', 'PUT', body);
+		return;
+	}
+	fetch(`${API_BASE_URL}/api/user/preferences/active-tab`, {
+		method: 'PUT', credentials: 'include', keepalive: true, body: JSON.stringify(body),
+		headers: { 'Content-Type': 'application/json', 'X-Client-ID': CLIENT_ID },
+	}).catch(() => {}); // Best effort: the page is going away
+}
+
 function updateDeleteTabButtonVisibility() {
 	if (deleteTabGlobalBtn) {
 		const isMainActive = appData.activeTabId === "main";
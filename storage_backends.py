@@ -0,0 +1,178 @@
+"""
+Storage backends for TaskHive.
+
+Every function in dynamodb_operations.py talks to two table objects, `users_table` and
+`todo_list_table`, through the boto3 Table API (get_item, put_item, update_item, delete_item,
+query, batch_writer), plus the service-level batch_write_item, batch_get_item and transact_write_items.
+A storage backend supplies those objects:
+
+- DynamoDBBackend is the production backend, backed by boto3.
+- SQLiteBackend (sqlite_backend.py) is a local stand-in that implements the same subset of
+  the Table API and DynamoDB expression syntax on top of SQLite, so the app, the self-test
+  in dynamodb_operations.py and benchmarks can run without AWS.
+
+Select a backend with TASKHIVE_STORAGE=dynamodb|sqlite (default: dynamodb).
+
+The boto3 client keeps a pool of HTTP connections shared by every thread in the process.
+botocore's default of 10 is far below what a threaded or gevent server drives, so requests
+would queue on the pool; DYNAMODB_MAX_POOL_CONNECTIONS and the timeouts below size it instead
+(gunicorn.conf.py derives the pool size from the worker's thread count).
+
+DynamoDBBackend connects lazily: creating the session, resolving credentials and loading the
+service model take a noticeable part of a cold start, so they happen on the first storage call
+(or an explicit connect()), not at import. One boto3 session is shared by the whole process.
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import boto3
+from botocore.config import Config
+
+import startup
+
+DYNAMODB_MAX_POOL_CONNECTIONS = int(os.environ.get("DYNAMODB_MAX_POOL_CONNECTIONS", "50")) # Per process; >= concurrent requests plus fan-out
+DYNAMODB_CONNECT_TIMEOUT_SECONDS = float(os.environ.get("DYNAMODB_CONNECT_TIMEOUT_SECONDS", "2"))
+DYNAMODB_READ_TIMEOUT_SECONDS = float(os.environ.get("DYNAMODB_READ_TIMEOUT_SECONDS", "5")) # botocore default is 60s, far past any request deadline
+DYNAMODB_MAX_ATTEMPTS = int(os.environ.get("DYNAMODB_MAX_ATTEMPTS", "1")) # botocore's own attempts; storage_resilience.py retries throttles and transient errors
+DYNAMODB_RETRY_MODE = os.environ.get("DYNAMODB_RETRY_MODE", "adaptive") # legacy | standard | adaptive (client-side rate limiting on throttles)
+
+
+class StorageBackend:
+    """ Interface shared by all backends. Table objects follow the boto3 Table API. """
+    name = "base"
+    users_table: Any = None
+    todo_list_table: Any = None
+
+    def batch_write_item(self, **kwargs) -> Dict[str, Any]:
+        """ Service-level BatchWriteItem taking RequestItems keyed by table name. """
+        raise NotImplementedError
+
+    def batch_get_item(self, **kwargs) -> Dict[str, Any]:
+        """ Service-level BatchGetItem (up to 100 keys) returning Responses and UnprocessedKeys keyed by table name. """
+        raise NotImplementedError
+
+    def transact_write_items(self, **kwargs) -> Dict[str, Any]:
+        """
+        Service-level TransactWriteItems. TransactItems use Python values (as with the Table API),
+        not DynamoDB-typed attribute values. Raises ClientError TransactionCanceledException with
+        CancellationReasons when any condition fails.
+        """
+        raise NotImplementedError
+
+    def connect(self) -> None:
+        """ Does any deferred setup now instead of on the first storage call. Idempotent and thread-safe. """
+        pass
+
+    def after_fork(self) -> None:
+        """ Called in a freshly forked worker process: drop connections inherited from the parent. """
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+_session: Optional[boto3.session.Session] = None
+_session_lock = threading.Lock()
+
+def get_session() -> boto3.session.Session:
+    """
+    The process-wide boto3 session. It caches botocore's data loaders (service models) and the
+    resolved credentials, so every client built from it skips that work. Creating sessions is
+    not thread-safe, hence the lock. A forked worker inherits its parent's, already loaded.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = boto3.session.Session()
+    return _session
+
+def dynamodb_client_config() -> Config:
+    """ botocore client settings for the DynamoDB resource: pool size, timeouts and retry policy. """
+    return Config(
+        max_pool_connections=DYNAMODB_MAX_POOL_CONNECTIONS,
+        connect_timeout=DYNAMODB_CONNECT_TIMEOUT_SECONDS,
+        read_timeout=DYNAMODB_READ_TIMEOUT_SECONDS,
+        retries={"mode": DYNAMODB_RETRY_MODE, "total_max_attempts": DYNAMODB_MAX_ATTEMPTS},
+        tcp_keepalive=True
+    )
+
+
+class _LazyTable:
+    """ Stands in for a boto3 Table and connects its backend on first use. """
+
+    def __init__(self, backend: "DynamoDBBackend", table_name: str):
+        self._backend = backend
+        self.name = table_name
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._backend.table(self.name), attribute)
+
+
+class DynamoDBBackend(StorageBackend):
+    name = "dynamodb"
+
+    def __init__(self, region_name: str, users_table_name: str, todo_list_table_name: str):
+        self.region_name = region_name
+        self._resource = None
+        self._tables: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.users_table = _LazyTable(self, users_table_name)
+        self.todo_list_table = _LazyTable(self, todo_list_table_name)
+
+    @property
+    def resource(self) -> Any:
+        if self._resource is None:
+            self.connect()
+        return self._resource
+
+    def table(self, table_name: str) -> Any:
+        self.connect()
+        return self._tables[table_name]
+
+    def connect(self) -> None:
+        if self._resource is not None:
+            return
+        with self._lock:
+            if self._resource is not None:
+                return
+            started = time.perf_counter()
+            resource = get_session().resource("dynamodb", region_name=self.region_name, config=dynamodb_client_config())
+            self._tables = {name: resource.Table(name) for name in (self.users_table.name, self.todo_list_table.name)}
+            self._resource = resource
+            startup.record("storage_connect", time.perf_counter() - started)
+
+    def after_fork(self) -> None:
+        # Sockets in the urllib3 pool would otherwise be shared with the parent and the other
+        # workers. Rebuilding reuses the session's loaded service model, so it is cheap.
+        self._lock = threading.Lock()
+        if self._resource is not None:
+            self._resource = None
+            self.connect()
+
+    def batch_write_item(self, **kwargs) -> Dict[str, Any]:
+        return self.resource.batch_write_item(**kwargs)
+
+    def batch_get_item(self, **kwargs) -> Dict[str, Any]:
+        return self.resource.batch_get_item(**kwargs)
+
+    def transact_write_items(self, **kwargs) -> Dict[str, Any]:
+        # The resource's client applies boto3's high-level (de)serialisation, so Python values work here.
+        return self.resource.meta.client.transact_write_items(**kwargs)
+
+
+def create_storage_backend(region_name: str, users_table_name: str, todo_list_table_name: str,
+                           kind: Optional[str] = None) -> StorageBackend:
+    """ Builds the backend named by `kind` or the TASKHIVE_STORAGE environment variable. """
+    kind = (kind or os.environ.get("TASKHIVE_STORAGE", "dynamodb")).lower()
+    if kind == "dynamodb":
+        return DynamoDBBackend(region_name, users_table_name, todo_list_table_name)
+    if kind == "sqlite":
+        from sqlite_backend import SQLiteBackend
+        return SQLiteBackend(
+            os.environ.get("TASKHIVE_SQLITE_PATH", "taskhive.db"), users_table_name, todo_list_table_name,
+            latency_seconds=float(os.environ.get("TASKHIVE_SQLITE_LATENCY_MS", "0")) / 1000.0
+        )
+    raise ValueError(f"Unknown storage backend '{kind}'. Expected 'dynamodb' or 'sqlite'.")
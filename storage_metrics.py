@@ -0,0 +1,195 @@
+"""
+Per-operation metrics for storage calls.
+
+dynamodb_operations.py decorates its public functions with @storage_operation and wraps the
+active backend with instrument_backend(). Every table or service call is then timed and
+labelled with the operation that issued it (the outermost decorated function, e.g.
+get_tasks_for_tab) and the DynamoDB API it used (GetItem, Query, ...):
+
+- taskhive_storage_operation_seconds{operation}: wall time of each operation (a decorated
+  function called from inside another one counts toward the outer operation)
+- taskhive_storage_call_seconds{operation,call}: each storage call
+- taskhive_storage_call_errors_total{operation,call,code}: failed calls by error code
+- taskhive_storage_throttles_total{operation,call}: the throttling subset of those errors
+  (calls that were still throttled after the retries of storage_resilience.py)
+- taskhive_storage_consumed_capacity_total{operation,call,table}: capacity units reported by
+  the backend; ReturnConsumedCapacity=TOTAL is added to every call that accepts it
+
+Calls made outside a decorated function are labelled "unattributed". Storage time is also
+added to the current request's "storage" phase (metrics.add_request_phase).
+"""
+import contextvars
+import functools
+import inspect
+import time
+from typing import Any, Callable, Dict, Optional
+
+from botocore.exceptions import ClientError
+
+from metrics import add_request_phase, registry
+from storage_backends import StorageBackend
+
+UNATTRIBUTED = "unattributed"
+THROTTLE_ERROR_CODES = {"ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded"}
+STORAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+operation_seconds = registry.histogram(
+    "taskhive_storage_operation_seconds", "Wall time of each storage operation (public dynamodb_operations function).",
+    ("operation",), buckets=STORAGE_BUCKETS
+)
+call_seconds = registry.histogram(
+    "taskhive_storage_call_seconds", "Latency of each storage API call, by issuing operation.",
+    ("operation", "call"), buckets=STORAGE_BUCKETS
+)
+call_errors_total = registry.counter(
+    "taskhive_storage_call_errors_total", "Storage API calls that raised, by error code.", ("operation", "call", "code")
+)
+throttles_total = registry.counter(
+    "taskhive_storage_throttles_total", "Storage API calls rejected by throttling.", ("operation", "call")
+)
+consumed_capacity_total = registry.counter(
+    "taskhive_storage_consumed_capacity_total", "Capacity units consumed, as reported by ReturnConsumedCapacity.",
+    ("operation", "call", "table")
+)
+
+_operation: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("storage_operation", default=None)
+
+
+def current_operation() -> str:
+    return _operation.get() or UNATTRIBUTED
+
+def storage_operation(function: Callable) -> Callable:
+    """ Labels the storage calls made inside `function` with its name, unless an outer operation already did. """
+    name = function.__name__
+    histogram = operation_seconds.labels(name)
+
+    if inspect.isgeneratorfunction(function):
+        @functools.wraps(function)
+        def generator_wrapper(*args, **kwargs):
+            # Bound around each step only: between steps the caller's code runs.
+            iterator = function(*args, **kwargs)
+            elapsed = 0.0
+            outermost = False
+            try:
+                while True:
+                    token = _operation.set(name) if _operation.get() is None else None
+                    outermost = outermost or token is not None
+                    started = time.perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                    finally:
+                        elapsed += time.perf_counter() - started
+                        if token is not None:
+                            _operation.reset(token)
+                    yield item
+            finally:
+                iterator.close()
+                if outermost:
+                    histogram.observe(elapsed)
+        return generator_wrapper
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if _operation.get() is not None:
+            return function(*args, **kwargs)
+        token = _operation.set(name)
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - started)
+            _operation.reset(token)
+    return wrapper
+
+
+def _record_capacity(operation: str, call: str, response: Any) -> None:
+    consumed = response.get("ConsumedCapacity") if isinstance(response, dict) else None
+    if not consumed:
+        return
+    for entry in consumed if isinstance(consumed, list) else (consumed,):
+        units = entry.get("CapacityUnits")
+        if units is None:
+            units = (entry.get("ReadCapacityUnits") or 0) + (entry.get("WriteCapacityUnits") or 0)
+        consumed_capacity_total.labels(operation, call, entry.get("TableName", "")).inc(float(units))
+
+def _call(call: str, method: Callable, kwargs: Dict[str, Any]) -> Any:
+    operation = current_operation()
+    kwargs.setdefault("ReturnConsumedCapacity", "TOTAL")
+    started = time.perf_counter()
+    try:
+        response = method(**kwargs)
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code", "Unknown")
+        call_errors_total.labels(operation, call, code).inc()
+        if code in THROTTLE_ERROR_CODES:
+            throttles_total.labels(operation, call).inc()
+        raise
+    except Exception as e:
+        call_errors_total.labels(operation, call, type(e).__name__).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        call_seconds.labels(operation, call).observe(elapsed)
+        add_request_phase("storage", elapsed)
+    _record_capacity(operation, call, response)
+    return response
+
+
+class InstrumentedTable:
+    """ Wraps a boto3-style Table; attributes other than the data-plane calls pass through. """
+
+    def __init__(self, table: Any):
+        self._table = table
+
+    def get_item(self, **kwargs) -> Dict[str, Any]:
+        return _call("GetItem", self._table.get_item, kwargs)
+
+    def put_item(self, **kwargs) -> Dict[str, Any]:
+        return _call("PutItem", self._table.put_item, kwargs)
+
+    def update_item(self, **kwargs) -> Dict[str, Any]:
+        return _call("UpdateItem", self._table.update_item, kwargs)
+
+    def delete_item(self, **kwargs) -> Dict[str, Any]:
+        return _call("DeleteItem", self._table.delete_item, kwargs)
+
+    def query(self, **kwargs) -> Dict[str, Any]:
+        return _call("Query", self._table.query, kwargs)
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._table, attribute)
+
+
+class InstrumentedBackend(StorageBackend):
+    """ A backend whose tables and service-level calls are measured; everything else is delegated. """
+
+    def __init__(self, backend: StorageBackend):
+        self.backend = backend
+        self.name = backend.name
+        self.users_table = InstrumentedTable(backend.users_table)
+        self.todo_list_table = InstrumentedTable(backend.todo_list_table)
+
+    def batch_write_item(self, **kwargs) -> Dict[str, Any]:
+        return _call("BatchWriteItem", self.backend.batch_write_item, kwargs)
+
+    def batch_get_item(self, **kwargs) -> Dict[str, Any]:
+        return _call("BatchGetItem", self.backend.batch_get_item, kwargs)
+
+    def transact_write_items(self, **kwargs) -> Dict[str, Any]:
+        return _call("TransactWriteItems", self.backend.transact_write_items, kwargs)
+
+    def connect(self) -> None:
+        self.backend.connect()
+
+    def after_fork(self) -> None:
+        self.backend.after_fork()
+
+    def close(self) -> None:
+        self.backend.close()
+
+def instrument_backend(backend: Optional[StorageBackend]) -> Optional[StorageBackend]:
+    if backend is None or isinstance(backend, InstrumentedBackend):
+        return backend
+    return InstrumentedBackend(backend)
@@ -0,0 +1,257 @@
+"""
+Retry policy and circuit breaker shared by every storage call.
+
+dynamodb_operations.py wraps the active backend with resilient_backend() (inside the metrics
+wrapper of storage_metrics.py), so each table or service call goes through one RetryPolicy:
+
+- Throttling (ProvisionedThroughputExceededException, ThrottlingException, RequestLimitExceeded,
+  or a transaction cancelled for throttling) and transient failures (5xx error codes, lost
+  connections, timeouts) are retried up to STORAGE_RETRY_MAX_ATTEMPTS attempts in all, with
+  jittered exponential backoff from STORAGE_RETRY_BASE_BACKOFF_SECONDS, capped at
+  STORAGE_RETRY_MAX_BACKOFF_SECONDS. Other errors (failed conditions, validation) are raised at
+  once. botocore's own retries are off by default (DYNAMODB_MAX_ATTEMPTS=1 in
+  storage_backends.py), so attempts are not multiplied.
+- A 5xx or a lost response does not say whether the write was applied. Updates that are not
+  idempotent (an ADD or list_append in the UpdateExpression, see NON_IDEMPOTENT_UPDATE) are
+  therefore only repeated after a throttle or a failure to connect, when nothing was sent.
+  Transactions are repeated with the same ClientRequestToken, which DynamoDB uses to apply them once.
+- A CircuitBreaker counts consecutive calls that ran out of attempts. After
+  STORAGE_BREAKER_FAILURE_THRESHOLD of them it opens: for STORAGE_BREAKER_RESET_SECONDS every
+  call fails at once with ClientError code "CircuitOpen" (callers handle it like any other
+  ClientError) instead of adding load to a table that is already refusing it. Then one trial call
+  is let through; its success closes the breaker, its failure opens it again.
+
+The breaker is per process and per backend: it sees this worker's calls to both tables.
+
+- taskhive_storage_retries_total{operation,call,reason}: attempts repeated, reason throttle|transient
+- taskhive_storage_retries_exhausted_total{operation,call,reason}: calls that failed after every attempt
+- taskhive_storage_circuit_state: 0 closed, 1 half-open, 2 open
+- taskhive_storage_circuit_transitions_total{state}: changes into each state
+- taskhive_storage_circuit_rejected_total{operation,call}: calls refused while the breaker was open
+"""
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from botocore.exceptions import ClientError, ConnectionError as BotocoreConnectionError, HTTPClientError
+
+from metrics import registry
+from storage_backends import StorageBackend
+from storage_metrics import THROTTLE_ERROR_CODES, current_operation
+
+STORAGE_RETRY_MAX_ATTEMPTS = int(os.environ.get("STORAGE_RETRY_MAX_ATTEMPTS", "4")) # Including the first attempt
+STORAGE_RETRY_BASE_BACKOFF_SECONDS = float(os.environ.get("STORAGE_RETRY_BASE_BACKOFF_SECONDS", "0.025"))
+STORAGE_RETRY_MAX_BACKOFF_SECONDS = float(os.environ.get("STORAGE_RETRY_MAX_BACKOFF_SECONDS", "1.0"))
+STORAGE_BREAKER_FAILURE_THRESHOLD = int(os.environ.get("STORAGE_BREAKER_FAILURE_THRESHOLD", "10")) # Consecutive exhausted calls that open the breaker; 0 disables it
+STORAGE_BREAKER_RESET_SECONDS = float(os.environ.get("STORAGE_BREAKER_RESET_SECONDS", "5")) # How long it stays open before a trial call
+TRANSIENT_ERROR_CODES = {"InternalServerError", "ServiceUnavailable", "InternalFailure"}
+TRANSACTION_THROTTLE_REASONS = {"ThrottlingError", "ProvisionedThroughputExceeded", "RequestLimitExceeded"}
+NON_IDEMPOTENT_UPDATE = re.compile(r"\bADD\b|\blist_append\s*\(") # Update expressions that change the item again when repeated
+
+logger = logging.getLogger(__name__)
+
+retries_total = registry.counter(
+    "taskhive_storage_retries_total", "Storage call attempts repeated after a throttle or transient failure.",
+    ("operation", "call", "reason")
+)
+retries_exhausted_total = registry.counter(
+    "taskhive_storage_retries_exhausted_total", "Storage calls that still failed after every retry attempt.",
+    ("operation", "call", "reason")
+)
+circuit_state_gauge = registry.gauge("taskhive_storage_circuit_state", "Storage circuit breaker: 0 closed, 1 half-open, 2 open.")
+circuit_transitions_total = registry.counter(
+    "taskhive_storage_circuit_transitions_total", "Storage circuit breaker state changes, by new state.", ("state",)
+)
+circuit_rejected_total = registry.counter(
+    "taskhive_storage_circuit_rejected_total", "Storage calls refused without being sent while the circuit breaker was open.",
+    ("operation", "call")
+)
+
+
+def retry_reason(error: Exception, idempotent: bool = True) -> Optional[str]:
+    """
+    "throttle" or "transient" if the failed call is worth repeating, else None. For a call that is
+    not idempotent only errors raised before anything was sent (throttles, failed connections) count.
+    """
+    if not idempotent and isinstance(error, BotocoreConnectionError):
+        return "transient" # Includes connect timeouts; the request never reached the service
+    if isinstance(error, ClientError):
+        code = error.response.get("Error", {}).get("Code", "")
+        if code in THROTTLE_ERROR_CODES:
+            return "throttle"
+        if code == "TransactionCanceledException":
+            reasons = {reason.get("Code") for reason in error.response.get("CancellationReasons") or ()}
+            return "throttle" if reasons & TRANSACTION_THROTTLE_REASONS else None
+        if idempotent and (code in TRANSIENT_ERROR_CODES or error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0) >= 500):
+            return "transient"
+        return None
+    if idempotent and isinstance(error, (BotocoreConnectionError, HTTPClientError)):
+        return "transient"
+    return None
+
+
+# --- Circuit breaker ---
+class CircuitBreaker:
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, failure_threshold: int = STORAGE_BREAKER_FAILURE_THRESHOLD, reset_seconds: float = STORAGE_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: str) -> None:
+        # Called with the lock held.
+        if state != self.state:
+            self.state = state
+            circuit_state_gauge.set(self._STATE_VALUES[state])
+            circuit_transitions_total.inc(state=state)
+            if state == self.OPEN:
+                logger.error(f"Storage circuit breaker opened after {self._failures} consecutive failed calls; refusing calls for {self.reset_seconds}s.")
+            elif state == self.CLOSED:
+                logger.info("Storage circuit breaker closed")
+
+    def allow(self) -> bool:
+        """ Whether a call may be sent now. While half-open only the one trial call is allowed. """
+        if self.state == self.CLOSED:
+            return True
+        with self._lock:
+            # Also after a trial call that never reported back (e.g. its thread was killed).
+            if self.state != self.CLOSED and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._opened_at = time.monotonic()
+                self._set_state(self.HALF_OPEN) # This caller makes the trial call
+                return True
+            return self.state == self.CLOSED
+
+    def record_success(self) -> None:
+        if self.state == self.CLOSED and not self._failures:
+            return
+        with self._lock:
+            self._failures = 0
+            self._set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._set_state(self.CLOSED)
+
+
+# --- Retry policy ---
+class RetryPolicy:
+    def __init__(self, breaker: Optional[CircuitBreaker] = None, max_attempts: int = STORAGE_RETRY_MAX_ATTEMPTS,
+                 base_backoff: float = STORAGE_RETRY_BASE_BACKOFF_SECONDS, max_backoff: float = STORAGE_RETRY_MAX_BACKOFF_SECONDS):
+        self.breaker = breaker or CircuitBreaker()
+        self.max_attempts = max(1, max_attempts)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+    def backoff(self, attempt: int) -> float:
+        """ Seconds to wait before repeating a call that failed `attempt` times. """
+        return min(self.max_backoff, self.base_backoff * (2 ** (attempt - 1))) * (0.5 + random.random())
+
+    def call(self, call: str, method: Callable, kwargs: Dict[str, Any], idempotent: bool = True) -> Any:
+        """
+        Runs `method(**kwargs)` under the breaker, repeating it on throttles and transient failures
+        (for idempotent=False only those where nothing was sent, see retry_reason).
+        """
+        if not self.breaker.allow():
+            circuit_rejected_total.inc(operation=current_operation(), call=call)
+            raise ClientError({"Error": {"Code": "CircuitOpen", "Message": "Storage is refusing requests; retry shortly"}}, call)
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = method(**kwargs)
+            except Exception as e:
+                reason = retry_reason(e, idempotent)
+                if reason is None:
+                    self.breaker.record_success() # Storage answered; the request itself was refused
+                    raise
+                if attempt >= self.max_attempts or self.breaker.state == CircuitBreaker.OPEN:
+                    retries_exhausted_total.inc(operation=current_operation(), call=call, reason=reason)
+                    self.breaker.record_failure()
+                    raise
+                retries_total.inc(operation=current_operation(), call=call, reason=reason)
+                time.sleep(self.backoff(attempt))
+                continue
+            self.breaker.record_success()
+            return response
+
+
+# --- Backend wrapper ---
+class ResilientTable:
+    """ Wraps a boto3-style Table; the data-plane calls go through the retry policy. """
+
+    def __init__(self, table: Any, policy: RetryPolicy):
+        self._table = table
+        self._policy = policy
+
+    def get_item(self, **kwargs) -> Dict[str, Any]:
+        return self._policy.call("GetItem", self._table.get_item, kwargs)
+
+    def put_item(self, **kwargs) -> Dict[str, Any]:
+        return self._policy.call("PutItem", self._table.put_item, kwargs)
+
+    def update_item(self, **kwargs) -> Dict[str, Any]:
+        idempotent = not NON_IDEMPOTENT_UPDATE.search(kwargs.get("UpdateExpression", ""))
+        return self._policy.call("UpdateItem", self._table.update_item, kwargs, idempotent)
+
+    def delete_item(self, **kwargs) -> Dict[str, Any]:
+        return self._policy.call("DeleteItem", self._table.delete_item, kwargs)
+
+    def query(self, **kwargs) -> Dict[str, Any]:
+        return self._policy.call("Query", self._table.query, kwargs)
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._table, attribute)
+
+
+class ResilientBackend(StorageBackend):
+    """ A backend whose table and service-level calls share one RetryPolicy; everything else is delegated. """
+
+    def __init__(self, backend: StorageBackend, policy: Optional[RetryPolicy] = None):
+        self.backend = backend
+        self.name = backend.name
+        self.policy = policy or RetryPolicy()
+        self.users_table = ResilientTable(backend.users_table, self.policy)
+        self.todo_list_table = ResilientTable(backend.todo_list_table, self.policy)
+
+    def batch_write_item(self, **kwargs) -> Dict[str, Any]:
+        return self.policy.call("BatchWriteItem", self.backend.batch_write_item, kwargs)
+
+    def batch_get_item(self, **kwargs) -> Dict[str, Any]:
+        return self.policy.call("BatchGetItem", self.backend.batch_get_item, kwargs)
+
+    def transact_write_items(self, **kwargs) -> Dict[str, Any]:
+        return self.policy.call("TransactWriteItems", self.backend.transact_write_items, kwargs)
+
+    def connect(self) -> None:
+        self.backend.connect()
+
+    def after_fork(self) -> None:
+        self.policy.breaker = CircuitBreaker(self.policy.breaker.failure_threshold, self.policy.breaker.reset_seconds)
+        self.backend.after_fork()
+
+    def close(self) -> None:
+        self.backend.close()
+
+def resilient_backend(backend: Optional[StorageBackend]) -> Optional[StorageBackend]:
+    if backend is None or isinstance(backend, ResilientBackend):
+        return backend
+    return ResilientBackend(backend)
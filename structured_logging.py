@@ -0,0 +1,215 @@
+"""
+Structured, asynchronous logging for TaskHive.
+
+configure_logging() gives the root logger a single handler that only puts records on a queue;
+a QueueListener thread formats and writes them. The request thread never waits for stderr or a
+log shipper, so logging I/O stays off the request path. Along the way:
+
+- Request ids: api.py binds one per request (the X-Request-ID header, or a new one) with
+  bind_request_id(); every record logged while it is bound carries it as "requestId".
+- Lazy formatting: call sites pass %-style arguments, and the message is only rendered in the
+  listener thread, for records that survive the level check and sampling.
+- Sampling: LOG_SAMPLE_RATES ("logger=rate,...", e.g. "api=0.1") keeps that fraction of a
+  logger's INFO and DEBUG records (child loggers included). The decision is made per request id,
+  so a sampled request keeps all of its lines. Warnings and errors are never sampled.
+- Redaction: values under sensitive keys (password, hash, token, secret, cookie, ...) in a
+  record's arguments and extra fields, and anything shaped like a bcrypt hash in the rendered
+  message, are replaced with "[REDACTED]" before the record is written.
+- Output: one JSON object per line (LOG_FORMAT=json, the default) or the classic text format
+  (LOG_FORMAT=text) for local development.
+
+If the queue is full (LOG_QUEUE_MAX_RECORDS), records are dropped and counted rather than
+blocking the request. The listener restarts itself in forked children (gunicorn workers).
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from metrics import registry
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json") # json | text
+LOG_SAMPLE_RATES = os.environ.get("LOG_SAMPLE_RATES", "") # e.g. "api=0.1,dynamodb_operations=0.1"
+LOG_QUEUE_MAX_RECORDS = int(os.environ.get("LOG_QUEUE_MAX_RECORDS", "10000")) # Beyond this, records are dropped, not waited on
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+REDACTED = "[REDACTED]"
+SENSITIVE_KEY_PATTERN = re.compile(r"password|passwd|passphrase|hash|secret|token|cookie|authorization|credential|session", re.IGNORECASE)
+BCRYPT_HASH_PATTERN = re.compile(r"\$2[abxy]?\$\d{2}\$[./A-Za-z0-9]{53}")
+
+# Attributes every LogRecord has; anything else on a record came from extra={...}.
+_RECORD_ATTRIBUTES = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime", "request_id"}
+
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+records_total = registry.counter(
+    "taskhive_log_records_total", "Log records by outcome: queued, sampled out, or dropped on a full queue.",
+    ("outcome",)
+)
+
+
+# --- Request ids ---
+def bind_request_id(request_id: str) -> contextvars.Token:
+    return _request_id.set(request_id)
+
+def reset_request_id(token: contextvars.Token) -> None:
+    _request_id.reset(token)
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+# --- Filters (run on the calling thread, so they stay cheap) ---
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    rates = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        name, _, rate = entry.partition("=")
+        rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+class RequestContextFilter(logging.Filter):
+    """ Stamps the caller's request id on the record; it cannot be read later from the listener thread. """
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """ Keeps a configured fraction of INFO/DEBUG records per logger, decided per request id. """
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def _rate(self, logger_name: str) -> float:
+        name = logger_name
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not self.rates:
+            return True
+        rate = self._rate(record.name)
+        if rate >= 1.0:
+            return True
+        request_id = getattr(record, "request_id", None)
+        draw = zlib.crc32(request_id.encode("utf-8")) / 0xFFFFFFFF if request_id else random.random()
+        if draw < rate:
+            return True
+        records_total.inc(outcome="sampled_out")
+        return False
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues the record itself: unlike the stock QueueHandler it does not render the message on
+    the calling thread, and a full queue drops the record instead of raising.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            records_total.inc(outcome="queued")
+        except queue.Full:
+            records_total.inc(outcome="dropped")
+
+
+# --- Formatting and redaction (run on the listener thread) ---
+def redact(value: Any, depth: int = 0) -> Any:
+    """ A copy of `value` with sensitive keys' values replaced; containers are walked a few levels deep. """
+    if depth > 4:
+        return value
+    if isinstance(value, dict):
+        return {k: REDACTED if isinstance(k, str) and SENSITIVE_KEY_PATTERN.search(k) else redact(v, depth + 1)
+                for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(redact(v, depth + 1) for v in value)
+    if isinstance(value, (bytes, bytearray)) and BCRYPT_HASH_PATTERN.search(bytes(value).decode("latin-1")):
+        return REDACTED
+    return value
+
+def _render_message(record: logging.LogRecord) -> str:
+    args = record.args
+    if args:
+        args = redact(args) if isinstance(args, dict) else tuple(redact(a) for a in args)
+    try:
+        message = str(record.msg) % args if args else str(record.msg)
+    except (TypeError, ValueError):
+        message = f"{record.msg} {args!r}"
+    return BCRYPT_HASH_PATTERN.sub(REDACTED, message)
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname, "logger": record.name, "message": _render_message(record),
+            "requestId": getattr(record, "request_id", None), "pid": record.process, "thread": record.threadName,
+        }
+        extra = {k: v for k, v in record.__dict__.items() if k not in _RECORD_ATTRIBUTES}
+        if extra:
+            entry.update(redact(extra))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class RedactingTextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        record.message = _render_message(record)
+        record.asctime = self.formatTime(record, self.datefmt)
+        text = self._style._fmt % {**record.__dict__, "request_id": getattr(record, "request_id", None) or "-"}
+        if record.exc_info:
+            text += "\n" + self.formatException(record.exc_info)
+        return text
+
+
+# --- Pipeline ---
+_handler: Optional[_NonBlockingQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def _start_listener() -> None:
+    global _listener
+    output = logging.StreamHandler()
+    output.setFormatter(JSONFormatter() if LOG_FORMAT == "json" else RedactingTextFormatter(TEXT_FORMAT))
+    _handler.queue = queue.Queue(maxsize=LOG_QUEUE_MAX_RECORDS)
+    _listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+def _restart_after_fork() -> None:
+    # The listener thread does not survive fork(), and the inherited queue's lock may be held.
+    if _handler is not None:
+        _start_listener()
+
+def stop_logging() -> None:
+    """ Flushes queued records and stops the listener thread. """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def configure_logging(level: str = LOG_LEVEL) -> None:
+    """ Installs the queue pipeline on the root logger. Safe to call more than once. """
+    global _handler
+    if _handler is not None:
+        return
+    _handler = _NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_MAX_RECORDS))
+    _handler.addFilter(RequestContextFilter())
+    _handler.addFilter(SamplingFilter(parse_sample_rates(LOG_SAMPLE_RATES)))
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(_handler)
+    root.setLevel(level)
+    _start_listener()
+    atexit.register(stop_logging)
+    os.register_at_fork(after_in_child=_restart_after_fork)
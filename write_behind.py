@@ -0,0 +1,130 @@
+"""
+Write-behind buffering for last-value-wins writes (e.g. the user's active tab preference).
+
+A WriteBehindBuffer holds at most one pending value per key. put() replaces a value that has not
+been written yet, so a burst of updates to one key costs a single write. A daemon thread hands
+the pending values to the write function every `interval` seconds, and flush() (also run at
+interpreter exit, i.e. when a gunicorn worker shuts down) writes them immediately. Readers that
+must see their own writes check pending() before reading storage.
+
+A write that fails is put back for the next flush, unless a newer value arrived meanwhile, up to
+WRITE_BEHIND_MAX_ATTEMPTS attempts. Beyond WRITE_BEHIND_MAX_PENDING keys, new keys are written
+through. Pending values live in one process: another worker reads the stored value until the
+flush, at most `interval` seconds later.
+
+- taskhive_write_behind_total{buffer,outcome}: buffered (first pending value for a key),
+  coalesced (replaced a pending value, saving a write), flushed (written), failed, dropped
+  (failed WRITE_BEHIND_MAX_ATTEMPTS times) and written_through (buffer full)
+"""
+import atexit
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from metrics import registry
+
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get("WRITE_BEHIND_MAX_PENDING", "10000")) # Keys per buffer; more are written through
+WRITE_BEHIND_MAX_ATTEMPTS = 3 # Flushes that may fail for one value before it is dropped
+
+logger = logging.getLogger(__name__)
+
+writes_total = registry.counter(
+    "taskhive_write_behind_total", "Write-behind buffer activity by outcome: buffered, coalesced, flushed, failed, dropped, written_through.",
+    ("buffer", "outcome")
+)
+
+
+class WriteBehindBuffer:
+    def __init__(self, name: str, write: Callable[[str, Any], bool], interval: float, max_pending: int = WRITE_BEHIND_MAX_PENDING):
+        """ `write(key, value)` stores one value and returns False (or raises) on failure. interval <= 0 writes through. """
+        self.name = name
+        self.write = write
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending: Dict[str, Any] = {}
+        self._attempts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        atexit.register(self.flush)
+        os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self) -> None:
+        # The parent flushes what it had pending; the child starts empty with its own thread.
+        self._pending, self._attempts = {}, {}
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def put(self, key: str, value: Any) -> None:
+        if self.interval <= 0:
+            self._write(key, value)
+            return
+        with self._lock:
+            if key in self._pending:
+                outcome = "coalesced"
+                self._attempts.pop(key, None) # A new value gets its own attempts
+            elif len(self._pending) < self.max_pending:
+                outcome = "buffered"
+            else:
+                outcome = None
+            if outcome:
+                self._pending[key] = value
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._run, name=f"write-behind-{self.name}", daemon=True)
+                    self._flusher.start()
+        if outcome:
+            writes_total.inc(buffer=self.name, outcome=outcome)
+        else:
+            writes_total.inc(buffer=self.name, outcome="written_through")
+            self._write(key, value)
+
+    def pending(self, key: str, default: Any = None) -> Any:
+        """ The value waiting to be written for `key`, or `default`. """
+        with self._lock:
+            return self._pending.get(key, default)
+
+    def discard(self, key: str, value: Any) -> None:
+        """ Drops the pending value for `key` if it is `value` (e.g. a preference for something just deleted). """
+        with self._lock:
+            if self._pending.get(key) == value:
+                del self._pending[key]
+                self._attempts.pop(key, None)
+
+    def flush(self) -> int:
+        """ Writes every pending value now. Returns the number written. """
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        written = 0
+        for key, value in batch.items():
+            if self._write(key, value):
+                written += 1
+                with self._lock:
+                    self._attempts.pop(key, None)
+                continue
+            with self._lock:
+                attempts = self._attempts.get(key, 0) + 1
+                if key in self._pending:
+                    continue # Superseded while we were writing
+                if attempts >= WRITE_BEHIND_MAX_ATTEMPTS:
+                    self._attempts.pop(key, None)
+                    logger.error(f"Write-behind buffer '{self.name}' dropped the value for {key} after {attempts} failed writes.")
+                    writes_total.inc(buffer=self.name, outcome="dropped")
+                else:
+                    self._attempts[key] = attempts
+                    self._pending[key] = value
+        return written
+
+    def _write(self, key: str, value: Any) -> bool:
+        try:
+            ok = bool(self.write(key, value))
+        except Exception:
+            logger.exception(f"Write-behind buffer '{self.name}' failed to write {key}.")
+            ok = False
+        writes_total.inc(buffer=self.name, outcome="flushed" if ok else "failed")
+        return ok
+
+    def _run(self) -> None:
+        stop = threading.Event() # Never set: sleeps interruptibly, also under gevent
+        while True:
+            stop.wait(self.interval)
+            self.flush()